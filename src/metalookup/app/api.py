@@ -8,7 +8,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import HttpUrl
 
 import metalookup.lib.settings
-from metalookup.app.models import Error, Input, LRMISuggestions, MetadataTags, Output, Ping, StarCase
+from metalookup.app.models import Error, Input, LRMISuggestions, MetadataTags, Output, Ping, StarCase, Status
 from metalookup.caching.backends import DatabaseBackend
 from metalookup.caching.cache import cache
 from metalookup.caching.warmup import warmup
@@ -42,6 +42,11 @@ async def initialize():
         await cache_backend.setup()
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    await manager.shutdown()
+
+
 @app.middleware("http")
 async def caching_and_response_time(request: Request, call_next):
     with runtime() as t:
@@ -57,7 +62,8 @@ async def caching_and_response_time(request: Request, call_next):
 )
 @cache(
     expire=24 * 60 * 60 * 28,
-    key=lambda input, request, response, extra: f"{input.url}-{extra}",
+    # results based on snapshots given by the client are not cached, as they may differ from the live page.
+    key=lambda input, request, response, extra: f"{input.url}-{extra}" if input.snapshot is None else None,
     backend=cache_backend,
 )
 # request and response arguments are needed for the cache wrapper.
@@ -66,13 +72,32 @@ async def extract(input: Input, request: Request, response: Response, extra: boo
 
     result = await manager.extract(input, extra=extra)
 
-    # prevent caching of responses that do not contain a full set of metadata information.
-    if any(not isinstance(getattr(result, extractor.key), MetadataTags) for extractor in manager.extractors):
+    # prevent caching of responses that do not contain a full set of metadata information, or that were extracted from
+    # a truncated page (see Output.degraded).
+    if result.degraded or any(
+        not isinstance(getattr(result, extractor.key), MetadataTags) for extractor in manager.extractors
+    ):
         response.headers.append("Cache-Control", "no-cache")
         response.headers.append("Cache-Control", "no-store")
     return result
 
 
+if metalookup.lib.settings.SNAPSHOT_STORE:
+
+    @app.post(
+        "/replay",
+        response_model=Output,
+        description="""
+        Extract the metadata again from the latest stored snapshot of the url (e.g. after the rule lists were updated),
+        i.e. without fetching or rendering the page. Responds with a 404 if there is no snapshot of the url. Extractors
+        that need the live page (e.g. accessibility) are skipped. The result is not cached.
+        """,
+    )
+    async def replay(input: Input, extra: bool = False):
+        logger.info(f"Received replay request for {input.url}")
+        return await manager.replay(input, extra=extra)
+
+
 @app.post(
     "/suggestions",
     response_model=LRMISuggestions,
@@ -81,7 +106,7 @@ async def extract(input: Input, request: Request, response: Response, extra: boo
 @cache(
     expire=24 * 60 * 60 * 28,
     # Note, we simply modify the cache key here to use the same codebase as for the extract endpoint.
-    key=lambda input, request, response: f"{input.url}-suggestions",
+    key=lambda input, request, response: f"{input.url}-suggestions" if input.snapshot is None else None,
     backend=cache_backend,
 )
 # request and response arguments are needed for the cache wrapper.
@@ -90,6 +115,11 @@ async def suggest(input: Input, request: Request, response: Response):
 
     result = await manager.extract(input, extra=True)
 
+    # suggestions deduced from a truncated page are not cached, see extract.
+    if result.degraded:
+        response.headers.append("Cache-Control", "no-cache")
+        response.headers.append("Cache-Control", "no-store")
+
     def combine(*fields: str) -> Union[MetadataTags, Error]:
         """
         Combines the extractors' MetaDataTags for given extractors (the field names used in the Output model).
@@ -203,6 +233,15 @@ async def ping():
     return {"status": "ok"}
 
 
+@app.get(
+    "/_status",
+    description="Utilization of the rendering resources, e.g. the saturation of the browser context pool.",
+    response_model=Status,
+)
+async def status():
+    return manager.status()
+
+
 # Developer endpoints
 if metalookup.lib.settings.ENABLE_CACHE_CONTROL_ENDPOINTS:
     # fixme: Not sure if this would work if the service is running with multiple uvicorn replications.
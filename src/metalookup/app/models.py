@@ -174,6 +174,12 @@ class Output(BaseModel):
         description="Information about the potential licence of the content. Determined by scanning the content for"
         " common licence names.",
     )
+    degraded: Optional[dict[str, str]] = Field(
+        default=None,
+        description="Set if the page exceeded the resource limits of a single page and was truncated: Which limits"
+        " were exceeded and how the page was truncated. All results are based on the truncated page, i.e. have a"
+        " reduced confidence.",
+    )
 
 
 class LRMISuggestions(BaseModel):
@@ -188,8 +194,64 @@ class LRMISuggestions(BaseModel):
         allow_population_by_field_name = True
 
 
+class SnapshotCookie(BaseModel):
+    """A cookie set while loading the page, in the format used by playwright."""
+
+    name: str
+    value: str
+    domain: str = Field(default="", description="The domain of the cookie, the host of the page if empty.")
+    path: str = "/"
+    expires: float = Field(default=-1, description="Unix timestamp (seconds), -1 for session cookies.")
+    httpOnly: bool = False
+    secure: bool = False
+    sameSite: str = "Lax"
+
+
+class SnapshotRequest(BaseModel):
+    """A (sub resource) request issued while loading the page."""
+
+    url: str
+    method: str = "GET"
+    resource_type: str = Field(default="other", description="As reported by the browser, e.g. script or image.")
+    headers: dict[str, str] = Field(default={}, description="The request headers.")
+    status: Optional[int] = Field(default=None, description="The status of the response, if one was received.")
+    response_headers: dict[str, str] = Field(default={}, description="The headers of the response, if any.")
+
+
+class PageSnapshot(BaseModel):
+    """
+    The page as already fetched (or rendered) by the client, e.g. a crawler. The extraction is based on the snapshot,
+    i.e. the page is neither fetched nor rendered again.
+    """
+
+    html: str = Field(..., description="The html of the page, preferably as rendered by a browser.")
+    status: Optional[int] = Field(
+        default=None, description="The status of the main response. Defaults to the har (if any), otherwise to 200."
+    )
+    headers: Optional[dict[str, str]] = Field(
+        default=None, description="The headers of the main response. Defaults to the har (if any)."
+    )
+    cookies: Optional[list[SnapshotCookie]] = Field(
+        default=None, description="The cookies set while loading the page. Defaults to the har (if any)."
+    )
+    requests: Optional[list[SnapshotRequest]] = Field(
+        default=None, description="The requests issued while loading the page. Defaults to the har (if any)."
+    )
+    har: Optional[dict[str, Any]] = Field(
+        default=None,
+        description="A HAR log (http archive, version 1.2) of loading the page. The main response (the end of the"
+        " redirect chain of the url), the requests and the cookies are taken from its entries, unless given"
+        " explicitly.",
+    )
+
+
 class Input(BaseModel):
     url: HttpUrl = Field(..., description="The URL where the content was crawled from.")
+    snapshot: Optional[PageSnapshot] = Field(
+        default=None,
+        description="The page as already fetched by the client. If given, the page is not fetched (or rendered)"
+        " again, extractors that need the live page (e.g. accessibility) are skipped and the result is not cached.",
+    )
 
 
 class Ping(BaseModel):
@@ -197,3 +259,77 @@ class Ping(BaseModel):
         default="not ok",
         description="Ping output. Should be 'ok' in happy case.",
     )
+
+
+class BrowserPoolStatus(BaseModel):
+    """Saturation of the pool of browser contexts used to render content."""
+
+    size: int = Field(description="The maximum number of browser contexts.")
+    leased: int = Field(description="The number of browser contexts currently used for rendering.")
+    idle: int = Field(description="The number of pre-created browser contexts ready to be used.")
+    waiting: int = Field(description="The number of fetches currently waiting for a free browser context.")
+    acquired: int = Field(description="The total number of handed out browser contexts.")
+    waited: int = Field(description="The total number of fetches that had to wait for a free browser context.")
+    created: int = Field(description="The total number of created browser contexts.")
+    discarded: int = Field(
+        description="The total number of closed browser contexts (exceeded reuse count, idle or failed reset)."
+    )
+
+
+class RenderQueueStatus(BaseModel):
+    """Utilization of the admission control in front of the page renders."""
+
+    concurrency: int = Field(description="The maximum number of concurrent renders.")
+    queue_size: int = Field(description="The maximum number of renders waiting for a free slot.")
+    running: int = Field(description="The number of currently running renders.")
+    queued: int = Field(description="The number of renders currently waiting for a free slot.")
+    admitted: int = Field(description="The total number of admitted renders.")
+    rejected: int = Field(description="The total number of renders rejected because the queue was full.")
+    average_queue_time: float = Field(description="The average time (seconds) admitted renders waited for a slot.")
+    average_render_time: float = Field(description="The average time (seconds) of a completed render.")
+
+
+class StaticFetchStatus(BaseModel):
+    """Effectiveness of the static fetch, i.e. how many renders were avoided."""
+
+    fetched: int = Field(description="The total number of static fetches.")
+    served: int = Field(description="The number of static fetches that were used without rendering.")
+    escalated: int = Field(description="The number of static fetches that were considered client side rendered.")
+    failed: int = Field(description="The number of static fetches that failed and were rendered instead.")
+    hit_rate: float = Field(description="The fraction of static fetches that were used without rendering.")
+
+
+class BrowserStatus(BaseModel):
+    """Health and utilization of a single playwright endpoint."""
+
+    endpoint: str = Field(description="The endpoint (without query parameters, which may contain credentials).")
+    healthy: bool = Field(description="Whether the endpoint is in rotation.")
+    outstanding: int = Field(description="The number of currently running renders.")
+    renders: int = Field(description="The total number of renders.")
+    connection_errors: int = Field(description="The total number of failed attempts to obtain a page.")
+    render_errors: int = Field(description="The total number of renders that failed after a page was obtained.")
+    average_latency: float = Field(description="The average time (seconds) of a successful render.")
+    pool: BrowserPoolStatus = Field(description="Saturation of the browser context pool of the endpoint.")
+
+
+class AssetCacheStatus(BaseModel):
+    """Effectiveness of the disk cache for sub resources shared between renders."""
+
+    entries: int = Field(description="The number of cached sub resources.")
+    size: int = Field(description="The total size (bytes) of the cached sub resources.")
+    hits: int = Field(description="The number of requests answered from the cache.")
+    misses: int = Field(description="The number of cacheable requests that were not (or no longer) cached.")
+    stored: int = Field(description="The number of responses stored in the cache.")
+    served_bytes: int = Field(description="The total number of bytes answered from the cache.")
+    hit_rate: float = Field(description="The fraction of cacheable requests answered from the cache.")
+
+
+class Status(BaseModel):
+    browsers: list[BrowserStatus] = Field(description="Health and utilization of the playwright endpoints.")
+    render_queue: RenderQueueStatus = Field(description="Utilization of the render admission control.")
+    static_fetch: Optional[StaticFetchStatus] = Field(
+        description="Effectiveness of the static fetch. Only present if the static fetch mode is enabled."
+    )
+    asset_cache: Optional[AssetCacheStatus] = Field(
+        description="Effectiveness of the sub resource cache. Only present if the cache is enabled."
+    )
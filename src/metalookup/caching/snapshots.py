@@ -0,0 +1,80 @@
+import gzip
+import hashlib
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+from metalookup.app.models import PageSnapshot
+from metalookup.lib.settings import SNAPSHOT_STORE_DIRECTORY
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class SnapshotStore:
+    """
+    A persistent store of the pages as captured by the Content (html, main response, cookies and requests), such that
+    they can be replayed, i.e. extracted again (e.g. after the rule lists or the extractors changed) without rendering.
+
+    The snapshots are stored content addressed as compressed json ("objects/<sha256 of the json>.json.gz"), i.e. an
+    unchanged page is stored only once, no matter how often it is captured. For every url, the address of its latest
+    snapshot is stored in a small file named by the hash of the url ("urls/<sha256 of the url>"), such that looking up
+    the snapshot of a url does not need any index in memory. All files are written atomically (i.e. concurrent
+    readers never see partial files), hence the store may be shared by multiple processes.
+    """
+
+    def __init__(self, directory: Union[str, Path] = SNAPSHOT_STORE_DIRECTORY, compression: int = 6):
+        """
+        :param directory: Where the snapshots are stored, created if necessary.
+        :param compression: The gzip compression level (1 is fastest, 9 is smallest).
+        """
+        self.directory = Path(directory)
+        self.compression = compression
+        (self.directory / "objects").mkdir(parents=True, exist_ok=True)
+        (self.directory / "urls").mkdir(parents=True, exist_ok=True)
+
+    def _object(self, digest: str) -> Path:
+        return self.directory / "objects" / f"{digest}.json.gz"
+
+    def _url(self, url: str) -> Path:
+        return self.directory / "urls" / _digest(url.encode())
+
+    def _write(self, path: Path, data: bytes):
+        temporary = path.with_name(f".{path.name}.{os.getpid()}.{time.monotonic_ns()}")
+        temporary.write_bytes(data)
+        os.replace(temporary, path)
+
+    def put(self, url: str, snapshot: PageSnapshot) -> str:
+        """Store the snapshot as the latest snapshot of given url. Returns the address of the snapshot."""
+        data = snapshot.json(exclude_none=True).encode()
+        digest = _digest(data)
+        if not self._object(digest).exists():
+            self._write(self._object(digest), gzip.compress(data, compresslevel=self.compression, mtime=0))
+        self._write(self._url(url), digest.encode())
+        logger.debug(f"Stored snapshot {digest} of {url} ({len(data)} bytes uncompressed)")
+        return digest
+
+    def address(self, url: str) -> Optional[str]:
+        """The address of the latest snapshot of given url, None if there is none."""
+        try:
+            return self._url(url).read_text()
+        except FileNotFoundError:
+            return None
+
+    def load(self, digest: str) -> Optional[PageSnapshot]:
+        """The snapshot with given address, None if there is none."""
+        try:
+            data = gzip.decompress(self._object(digest).read_bytes())
+        except FileNotFoundError:
+            return None
+        return PageSnapshot.parse_raw(data)
+
+    def get(self, url: str) -> Optional[PageSnapshot]:
+        """The latest snapshot of given url, None if there is none."""
+        digest = self.address(url)
+        return self.load(digest) if digest is not None else None
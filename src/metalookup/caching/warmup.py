@@ -39,10 +39,17 @@ def warmup(urls: list[HttpUrl], n_tasks: int = metalookup.lib.settings.CACHE_WAR
                     url = queue.pop()
                     logging.info(f"Task {id} [{len(queue) / initial_queue_size:2.1%}]: Warming up {url}")
                     try:
-                        await client.post(
+                        response = await client.post(
                             url=f"http://localhost:{metalookup.lib.settings.API_PORT}/extract?extra=true",
                             json=Input(url=url).dict(),
                         )
+                        if response.status == 503:
+                            # The service is saturated: Put the url back to the end of the queue and back off as
+                            # advised by the service, instead of adding even more load.
+                            retry_after = int(response.headers.get("Retry-After", 1))
+                            logging.info(f"Task {id}: Service saturated, retrying {url} in {retry_after}s")
+                            queue.appendleft(url)
+                            await asyncio.sleep(retry_after)
                     except ClientError:
                         logging.exception(f"Failed to warmup cache for {url}. Continuing with next in queue.")
                     # See: https://github.com/aio-libs/aiohttp/issues/5582
@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from playwright.async_api import BrowserContext, Request, Response, Route
+
+from metalookup.app.models import AssetCacheStatus
+from metalookup.lib.settings import (
+    PLAYWRIGHT_ASSET_CACHE_DIRECTORY,
+    PLAYWRIGHT_ASSET_CACHE_MAX_ENTRY_SIZE,
+    PLAYWRIGHT_ASSET_CACHE_MAX_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Only sub resources are cached - the documents themselves are always loaded from the network.
+_CACHEABLE_RESOURCE_TYPES = frozenset({"script", "stylesheet", "font", "image", "media"})
+# Headers that do not apply to the (decoded) body served from the cache.
+_DROPPED_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding", "connection", "set-cookie"})
+_MAX_AGE = re.compile(r"(?:^|,)\s*max-age\s*=\s*(\d+)")
+_CONTENT_LENGTH = re.compile(r"\s*(\d+)\s*")
+# How many requests answered from the cache are remembered (until their response arrives). The responses of requests
+# that are aborted or fail never arrive, hence the oldest ones are forgotten instead of keeping them forever.
+_MAX_SERVED = 10_000
+
+
+class _Entry(NamedTuple):
+    size: int
+    expires: float
+
+
+def _key(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def max_age(headers: dict[str, str]) -> Optional[int]:
+    """
+    The number of seconds the response may be cached by a shared cache, None if it must not be cached.
+    Responses that set cookies (or vary by cookie) are never cached, such that serving them from the cache cannot
+    change which cookies a page sets.
+    """
+    cache_control = headers.get("cache-control", "").lower()
+    if "set-cookie" in headers or "cookie" in headers.get("vary", "").lower():
+        return None
+    if any(directive in cache_control for directive in ("no-store", "no-cache", "private")):
+        return None
+    match = _MAX_AGE.search(cache_control)
+    return int(match.group(1)) if match and int(match.group(1)) > 0 else None
+
+
+class AssetCache:
+    """
+    A disk cache for sub resources (scripts, stylesheets, fonts, images) that is shared by all browser contexts.
+
+    Most pages load the same CDN hosted libraries, fonts and analytics scripts. As every render uses a clean browser
+    context, the browser would download them over and over again. Instead, cacheable responses (according to their
+    cache-control header) are stored on disk and subsequent requests for the same URL are answered from there.
+    Responses that set cookies are never stored, hence the cookies of every page are the same as without the cache.
+    The least recently used entries are evicted once the cache exceeds its maximum size.
+    """
+
+    def __init__(
+        self,
+        directory: str = PLAYWRIGHT_ASSET_CACHE_DIRECTORY,
+        max_size: int = PLAYWRIGHT_ASSET_CACHE_MAX_SIZE,
+        max_entry_size: int = PLAYWRIGHT_ASSET_CACHE_MAX_ENTRY_SIZE,
+    ):
+        """
+        :param directory: Where the cached responses are stored.
+        :param max_size: The maximum total size (bytes) of the cached bodies.
+        :param max_entry_size: The maximum size (bytes) of a single cached body.
+        """
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.max_entry_size = max_entry_size
+        # the cached entries in the order of their last use
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._size = 0
+        # the requests that were answered from the cache (oldest first), such that their responses are not stored again
+        self._served: OrderedDict[Request, None] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._stored = 0
+        self._served_bytes = 0
+
+    def status(self) -> AssetCacheStatus:
+        requests = self._hits + self._misses
+        return AssetCacheStatus(
+            entries=len(self._entries),
+            size=self._size,
+            hits=self._hits,
+            misses=self._misses,
+            stored=self._stored,
+            served_bytes=self._served_bytes,
+            hit_rate=self._hits / requests if requests else 0,
+        )
+
+    def load(self):
+        """Index the entries that are already stored in the cache directory (e.g. from a previous run)."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path in sorted(self.directory.glob("*.json"), key=os.path.getmtime):
+            try:
+                meta = json.loads(path.read_text())
+                self._add(path.stem, _Entry(size=meta["size"], expires=meta["expires"]))
+            except (OSError, ValueError, KeyError):
+                logger.warning(f"Ignoring invalid asset cache entry {path}")
+        logger.info(f"Loaded asset cache with {len(self._entries)} entries ({self._size / 2**20:.1f}MiB)")
+
+    def _add(self, key: str, entry: _Entry):
+        if key in self._entries:
+            self._size -= self._entries.pop(key).size
+        self._entries[key] = entry
+        self._size += entry.size
+        while self._size > self.max_size and self._entries:
+            evicted, old = self._entries.popitem(last=False)
+            self._size -= old.size
+            self._remove(evicted)
+
+    def _remove(self, key: str):
+        for suffix in (".json", ".body"):
+            (self.directory / f"{key}{suffix}").unlink(missing_ok=True)
+
+    async def install(self, context: BrowserContext):
+        """Serve the requests of given browser context from the cache and store its cacheable responses."""
+        await context.route("**/*", self.handle)
+        context.on("response", self.store)
+
+    async def handle(self, route: Route):
+        request = route.request
+        if request.method != "GET" or request.resource_type not in _CACHEABLE_RESOURCE_TYPES:
+            await route.fallback()
+            return
+
+        key = _key(request.url)
+        entry = self._entries.get(key)
+        if entry is None or entry.expires < time.time():
+            self._misses += 1
+            await route.fallback()
+            return
+
+        try:
+            meta, body = await asyncio.to_thread(self._read, key)
+        except (OSError, ValueError):
+            logger.warning(f"Failed to read asset cache entry for {request.url}")
+            self._entries.pop(key, None)
+            self._size -= entry.size
+            self._misses += 1
+            await route.fallback()
+            return
+
+        self._entries.move_to_end(key)
+        self._hits += 1
+        self._served_bytes += len(body)
+        self._served[request] = None
+        if len(self._served) > _MAX_SERVED:
+            self._served.popitem(last=False)
+        await route.fulfill(status=meta["status"], headers=meta["headers"], body=body)
+
+    async def store(self, response: Response):
+        request = response.request
+        if request in self._served:
+            del self._served[request]
+            return
+        if request.method != "GET" or request.resource_type not in _CACHEABLE_RESOURCE_TYPES or response.status != 200:
+            return
+
+        headers = await response.all_headers()
+        if (age := max_age(headers)) is None:
+            return
+        if "content-length" in headers:
+            # responses with an invalid content length are not stored, the body may not be what the header announced
+            match = _CONTENT_LENGTH.fullmatch(headers["content-length"])
+            if match is None or int(match.group(1)) > self.max_entry_size:
+                return
+        try:
+            body = await response.body()
+        except Exception:
+            # e.g. the page was closed before the body was received
+            return
+        if len(body) > self.max_entry_size:
+            return
+
+        key = _key(request.url)
+        meta = {
+            "url": request.url,
+            "status": response.status,
+            "headers": {k: v for k, v in headers.items() if k not in _DROPPED_HEADERS},
+            "size": len(body),
+            "expires": time.time() + age,
+        }
+        try:
+            await asyncio.to_thread(self._write, key, meta, body)
+        except OSError:
+            logger.exception(f"Failed to store {request.url} in the asset cache")
+            return
+        self._stored += 1
+        self._add(key, _Entry(size=meta["size"], expires=meta["expires"]))
+
+    def _read(self, key: str) -> tuple[dict, bytes]:
+        meta = json.loads((self.directory / f"{key}.json").read_text())
+        return meta, (self.directory / f"{key}.body").read_bytes()
+
+    def _write(self, key: str, meta: dict, body: bytes):
+        # Write the body first: An entry is only considered valid once its meta data exists.
+        (self.directory / f"{key}.body").write_bytes(body)
+        (self.directory / f"{key}.json").write_text(json.dumps(meta))
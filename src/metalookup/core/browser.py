@@ -0,0 +1,439 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import AsyncExitStack, asynccontextmanager, suppress
+from typing import AsyncIterator, Optional
+from urllib.parse import urlparse, urlunparse
+
+from playwright.async_api import Browser, BrowserContext, Error, Page, Playwright, Request, async_playwright
+
+from metalookup.app.models import BrowserPoolStatus, BrowserStatus
+from metalookup.core.asset_cache import AssetCache
+from metalookup.lib.settings import (
+    PLAYWRIGHT_CONTEXT_IDLE_TIMEOUT,
+    PLAYWRIGHT_CONTEXT_MAX_REUSE,
+    PLAYWRIGHT_CONTEXT_POOL_SIZE,
+    PLAYWRIGHT_ENDPOINT_MAX_FAILURES,
+    PLAYWRIGHT_ENDPOINT_PROBE_INTERVAL,
+    PLAYWRIGHT_WS_ENDPOINTS,
+)
+from metalookup.lib.tools import runtime
+
+logger = logging.getLogger(__name__)
+
+# The storage types that are cleared for every origin a page visited before its browser context is reused.
+# Cookies are cleared separately for the whole context.
+_STORAGE_TYPES = "local_storage,indexeddb,websql,service_workers,cache_storage,file_systems"
+
+
+class _PooledContext:
+    """A browser context that is kept open together with the bookkeeping required to reuse it."""
+
+    def __init__(self, browser: Browser, context: BrowserContext):
+        self.browser = browser
+        self.context = context
+        self.uses = 0
+        self.idle_since = time.monotonic()
+        # the origins of all requests issued from within the context since its last reset
+        self.origins: set[str] = set()
+
+        def on_request(request: Request):
+            url = urlparse(request.url)
+            if url.scheme in ("http", "https"):
+                self.origins.add(f"{url.scheme}://{url.netloc}")
+
+        context.on("request", on_request)
+
+
+class BrowserContextPool:
+    """
+    A bounded pool of pre-created browser contexts.
+
+    Creating a new browser context for every fetch is comparatively expensive and, if the context is not closed
+    afterwards, leaks resources within the playwright container. The pool instead hands out an open context with a
+    fresh page and resets the context (cookies, storage, permissions) once the page is returned. The page itself is
+    closed on return, which also removes all listeners registered on it.
+    """
+
+    def __init__(
+        self,
+        size: int = PLAYWRIGHT_CONTEXT_POOL_SIZE,
+        max_reuse: int = PLAYWRIGHT_CONTEXT_MAX_REUSE,
+        idle_timeout: int = PLAYWRIGHT_CONTEXT_IDLE_TIMEOUT,
+        asset_cache: Optional[AssetCache] = None,
+    ):
+        """
+        :param size: The maximal number of contexts, i.e. also the maximal number of concurrently rendered pages.
+        :param max_reuse: After how many uses a context is closed instead of being reset.
+        :param idle_timeout: After how many seconds an unused context is closed.
+        :param asset_cache: The (shared) cache for sub resources that is installed in every context, if any.
+        """
+        self.size = size
+        self.max_reuse = max_reuse
+        self.idle_timeout = idle_timeout
+        self.asset_cache = asset_cache
+        self._idle: deque[_PooledContext] = deque()
+        self._leases: dict[Page, _PooledContext] = {}
+        self._semaphore = asyncio.Semaphore(size)
+        self._waiting = 0
+        self._acquired = 0
+        self._waited = 0
+        self._created = 0
+        self._discarded = 0
+
+    def status(self) -> BrowserPoolStatus:
+        return BrowserPoolStatus(
+            size=self.size,
+            leased=len(self._leases),
+            idle=len(self._idle),
+            waiting=self._waiting,
+            acquired=self._acquired,
+            waited=self._waited,
+            created=self._created,
+            discarded=self._discarded,
+        )
+
+    async def prewarm(self, browser: Browser):
+        """Fill the pool with fresh contexts, such that the first fetches need not wait for context creation."""
+        missing = self.size - len(self._leases) - len(self._idle)
+        contexts = await asyncio.gather(*[self._create(browser) for _ in range(missing)], return_exceptions=True)
+        self._idle.extend(c for c in contexts if isinstance(c, _PooledContext))
+
+    async def _create(self, browser: Browser) -> _PooledContext:
+        context = _PooledContext(browser=browser, context=await browser.new_context())
+        if self.asset_cache is not None:
+            await self.asset_cache.install(context.context)
+        self._created += 1
+        return context
+
+    async def _discard(self, pooled: _PooledContext):
+        self._discarded += 1
+        with suppress(Error):
+            await pooled.context.close()
+
+    async def _evict(self, browser: Browser):
+        """Close idle contexts that were not used for too long or that belong to a no longer connected browser."""
+        now = time.monotonic()
+        for pooled in list(self._idle):
+            if (
+                pooled.browser is not browser
+                or not browser.is_connected()
+                or now - pooled.idle_since > self.idle_timeout
+            ):
+                self._idle.remove(pooled)
+                await self._discard(pooled)
+
+    async def _reset(self, pooled: _PooledContext, page: Page):
+        if pooled.origins:
+            session = await pooled.context.new_cdp_session(page)
+            for origin in pooled.origins:
+                await session.send("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": _STORAGE_TYPES})
+            await session.detach()
+            pooled.origins.clear()
+        await page.close()
+        await pooled.context.clear_cookies()
+        await pooled.context.clear_permissions()
+
+    async def acquire(self, browser: Browser) -> Page:
+        """
+        Provide a new page within a clean browser context of given browser. Waits if all contexts are in use.
+        Every acquired page must be returned to the pool with the release method.
+        """
+        if self._semaphore.locked():
+            self._waited += 1
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        try:
+            await self._evict(browser)
+            pooled = self._idle.pop() if self._idle else await self._create(browser)
+            try:
+                page = await pooled.context.new_page()
+            except BaseException:
+                await self._discard(pooled)
+                raise
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+        self._leases[page] = pooled
+        self._acquired += 1
+        return page
+
+    async def release(self, page: Page):
+        """Close the page and reset its browser context, such that the context can be reused."""
+        pooled = self._leases.pop(page)
+        pooled.uses += 1
+        reusable = False
+        try:
+            await self._reset(pooled, page)
+            reusable = pooled.uses < self.max_reuse and pooled.browser.is_connected()
+        except Exception:
+            logger.exception("Failed to reset browser context. Closing it instead.")
+        finally:
+            # A context that failed to reset (or whose reset was cancelled) is closed, the next acquire creates a new
+            # one. The slot is released in any case, such that the pool never shrinks.
+            try:
+                if reusable:
+                    pooled.idle_since = time.monotonic()
+                    self._idle.append(pooled)
+                else:
+                    await self._discard(pooled)
+            finally:
+                self._semaphore.release()
+
+
+class BrowserSession:
+    """
+    A long-lived connection to the playwright (browserless) container.
+
+    Starting the playwright driver and connecting to the browser via CDP takes several hundred milliseconds. Hence, the
+    session keeps both open and hands out a page within an isolated browser context for every fetch. If the connection
+    is lost (e.g. because the browserless container was restarted), the session transparently reconnects on the next
+    use. The browser contexts are taken from a BrowserContextPool and reset after use.
+
+    The session can also be used as an async context manager, in which case it is closed on exit.
+    """
+
+    def __init__(
+        self,
+        endpoint: str = PLAYWRIGHT_WS_ENDPOINTS[0],
+        pool: Optional[BrowserContextPool] = None,
+        prewarm: bool = True,
+    ):
+        """
+        :param endpoint: The CDP websocket endpoint of the playwright container.
+        :param pool: The pool from which browser contexts are taken. If None, a pool with default settings is used.
+        :param prewarm: Whether the pool is filled upon connecting. Otherwise, the contexts are created on demand, e.g.
+            for a session that only serves a single fetch.
+        """
+        self.endpoint = endpoint
+        self.pool = pool or BrowserContextPool()
+        self.prewarm = prewarm
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        # Serializes (re)connection attempts, such that concurrent fetches do not open multiple connections.
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "BrowserSession":
+        await self.setup()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def setup(self):
+        """
+        Start the playwright driver. Calling this method multiple times is safe.
+        The connection to the browser itself is established lazily upon first use.
+        """
+        async with self._lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+
+    async def close(self):
+        async with self._lock:
+            if self._browser is not None:
+                with suppress(Error):
+                    await self._browser.close()
+                self._browser = None
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+    async def connect(self) -> Browser:
+        """Return the connected browser, (re)connecting if the connection is not yet or no longer established."""
+        if self._browser is not None and self._browser.is_connected():
+            return self._browser
+
+        await self.setup()
+        async with self._lock:
+            # Another task may have reconnected while we were waiting for the lock.
+            if self._browser is None or not self._browser.is_connected():
+                if self._browser is not None:
+                    logger.warning(f"Lost connection to playwright at {self.endpoint}. Reconnecting.")
+                self._browser = await self._playwright.chromium.connect_over_cdp(endpoint_url=self.endpoint)
+                logger.info(f"Connected to playwright at {self.endpoint}")
+                if self.prewarm:
+                    await self.pool.prewarm(self._browser)
+            return self._browser
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """
+        Provide a fresh page within an isolated browser context (cookies, storage). The page is closed and the context
+        is reset once the surrounding with block is left.
+        """
+        browser = await self.connect()
+        try:
+            page = await self.pool.acquire(browser)
+        except Error:
+            # The connection may have died without us noticing yet (e.g. browserless restarted between two requests).
+            # In that case retry exactly once with a new connection, otherwise pass on the error.
+            if browser.is_connected():
+                raise
+            browser = await self.connect()
+            page = await self.pool.acquire(browser)
+        try:
+            yield page
+        finally:
+            await self.pool.release(page)
+
+
+class _Endpoint:
+    """A browser session together with the bookkeeping of its health and utilization."""
+
+    def __init__(self, session: BrowserSession):
+        self.session = session
+        self.outstanding = 0
+        self.renders = 0
+        self.connection_errors = 0
+        self.render_errors = 0
+        self.latency = 0.0
+        # The number of connection failures since the last successful connection.
+        self.failures = 0
+        # The time the endpoint was taken out of rotation, None if it is healthy.
+        self.unhealthy_since: Optional[float] = None
+        self.probe: Optional[asyncio.Task] = None
+
+    def status(self) -> BrowserStatus:
+        successful = self.renders - self.render_errors
+        return BrowserStatus(
+            endpoint=urlunparse(urlparse(self.session.endpoint)._replace(query="")),
+            healthy=self.unhealthy_since is None,
+            outstanding=self.outstanding,
+            renders=self.renders,
+            connection_errors=self.connection_errors,
+            render_errors=self.render_errors,
+            average_latency=self.latency / successful if successful > 0 else 0,
+            pool=self.session.pool.status(),
+        )
+
+
+class BrowserBalancer:
+    """
+    Balance the renders between multiple playwright containers.
+
+    Every page is obtained from the healthy endpoint with the fewest outstanding renders. An endpoint is taken out of
+    rotation after a number of consecutive connection failures and is probed in the background until a connection can
+    be established again. If no endpoint is healthy, all endpoints are tried anyway.
+
+    The balancer provides the same interface as a BrowserSession, hence it can be used wherever a session is expected.
+    """
+
+    def __init__(
+        self,
+        endpoints: list[str] = PLAYWRIGHT_WS_ENDPOINTS,
+        max_failures: int = PLAYWRIGHT_ENDPOINT_MAX_FAILURES,
+        probe_interval: int = PLAYWRIGHT_ENDPOINT_PROBE_INTERVAL,
+        asset_cache: Optional[AssetCache] = None,
+        prewarm: bool = True,
+    ):
+        """
+        :param endpoints: The CDP websocket endpoints of the playwright containers.
+        :param max_failures: After how many consecutive connection failures an endpoint is taken out of rotation.
+        :param probe_interval: After how many seconds an endpoint that is out of rotation is probed again.
+        :param asset_cache: The cache for sub resources shared by the browser contexts of all endpoints, if any.
+        :param prewarm: Whether the context pools are filled upon connecting, see BrowserSession.
+        """
+        if not endpoints:
+            raise ValueError("At least one playwright endpoint is required.")
+        self.max_failures = max_failures
+        self.probe_interval = probe_interval
+        self.sessions = [
+            BrowserSession(endpoint=endpoint, pool=BrowserContextPool(asset_cache=asset_cache), prewarm=prewarm)
+            for endpoint in endpoints
+        ]
+        self._endpoints = [_Endpoint(session) for session in self.sessions]
+
+    async def __aenter__(self) -> "BrowserBalancer":
+        await self.setup()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def setup(self):
+        await asyncio.gather(*[session.setup() for session in self.sessions])
+
+    async def close(self):
+        for endpoint in self._endpoints:
+            if endpoint.probe is not None:
+                endpoint.probe.cancel()
+        await asyncio.gather(*[session.close() for session in self.sessions])
+
+    def status(self) -> list[BrowserStatus]:
+        return [endpoint.status() for endpoint in self._endpoints]
+
+    def _failed(self, endpoint: _Endpoint):
+        endpoint.connection_errors += 1
+        endpoint.failures += 1
+        if endpoint.unhealthy_since is None and endpoint.failures >= self.max_failures:
+            logger.warning(f"Taking playwright endpoint {endpoint.session.endpoint} out of rotation.")
+            endpoint.unhealthy_since = time.monotonic()
+
+    def _recovered(self, endpoint: _Endpoint):
+        endpoint.failures = 0
+        if endpoint.unhealthy_since is not None:
+            logger.info(f"Putting playwright endpoint {endpoint.session.endpoint} back into rotation.")
+            endpoint.unhealthy_since = None
+
+    async def _probe(self, endpoint: _Endpoint):
+        """Try to connect to an unhealthy endpoint until it succeeds."""
+        while endpoint.unhealthy_since is not None:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                await endpoint.session.connect()
+            except Error:
+                endpoint.failures += 1
+            else:
+                self._recovered(endpoint)
+        endpoint.probe = None
+
+    def _candidates(self) -> list[_Endpoint]:
+        """The endpoints to try in the order of preference."""
+        healthy = [e for e in self._endpoints if e.unhealthy_since is None]
+        for endpoint in self._endpoints:
+            if endpoint.unhealthy_since is not None and endpoint.probe is None:
+                endpoint.probe = asyncio.create_task(self._probe(endpoint))
+        if not healthy:
+            # Better try the unhealthy endpoints (the longest unhealthy first) than fail right away.
+            return sorted(self._endpoints, key=lambda e: e.unhealthy_since)
+        return sorted(healthy, key=lambda e: (e.outstanding, e.renders))
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """
+        Provide a fresh page from the least busy healthy endpoint. If a page cannot be obtained, the remaining
+        endpoints are tried in turn. See BrowserSession.page.
+        """
+        async with AsyncExitStack() as stack:
+            candidates = self._candidates()
+            for i, endpoint in enumerate(candidates):
+                # count the endpoint as busy already while waiting for a page
+                endpoint.outstanding += 1
+                try:
+                    page = await stack.enter_async_context(endpoint.session.page())
+                    break
+                except Error as e:
+                    endpoint.outstanding -= 1
+                    self._failed(endpoint)
+                    if i == len(candidates) - 1:
+                        raise
+                    logger.warning(f"Failed to obtain page from {endpoint.session.endpoint}: {e}. Trying next.")
+
+            self._recovered(endpoint)
+            endpoint.renders += 1
+            try:
+                with runtime() as t:
+                    yield page
+                endpoint.latency += t()
+            except BaseException:
+                endpoint.render_errors += 1
+                raise
+            finally:
+                endpoint.outstanding -= 1
@@ -1,21 +1,54 @@
 import asyncio
 import logging
-import re
-from asyncio import Task
-from typing import Optional
+import time
+from asyncio import Future, Task
+from concurrent.futures import Executor
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import AsyncIterator, Optional, Union
+from urllib.parse import urlparse
 
 from bs4 import BeautifulSoup
 from fastapi import HTTPException
-from playwright.async_api import Cookie, Request, Response, async_playwright
+from playwright.async_api import Cookie, Page, Request, Response, TimeoutError
 from pydantic import HttpUrl
 from tldextract.tldextract import TLDExtract
 
-from metalookup.lib.settings import PLAYWRIGHT_PAGE_LOAD_TIMEOUT, PLAYWRIGHT_WS_ENDPOINT
-from metalookup.lib.tools import get_unique_list, runtime
+from metalookup.app.models import PageSnapshot, SnapshotCookie, SnapshotRequest
+from metalookup.core.browser import BrowserBalancer, BrowserSession
+from metalookup.core.har import har_cookies, har_records, main_response
+from metalookup.core.interception import Interceptor
+from metalookup.core.links import LinkTable, build_link_table
+from metalookup.core.page_index import PageIndex
+from metalookup.core.parser import Parser, create_parser
+from metalookup.core.records import RequestRecord, ResponseRecord, record_request, record_response
+from metalookup.core.scheduler import RenderScheduler
+from metalookup.core.settle import Settled, SettleStrategy, create_settle_strategy
+from metalookup.core.static import StaticFetcher
+from metalookup.lib.adblock import AdblockLists
+from metalookup.lib.matching import KeywordMatcher, Matches
+from metalookup.lib.settings import (
+    ADBLOCK_ENGINE_CACHE,
+    ADBLOCK_ENGINE_CACHE_DIRECTORY,
+    CONTENT_MAX_HTML_SIZE,
+    CONTENT_MAX_NETWORK_RECORDS,
+    PLAYWRIGHT_PAGE_LOAD_TIMEOUT,
+)
+from metalookup.lib.tools import runtime
 
 logger = logging.getLogger(__file__)
 
-_SCRIPT = "script"
+
+class Stage(str, Enum):
+    """
+    The readiness stages of the rendered content, in the order they are reached.
+    The values of DOM_CONTENT_LOADED and LOAD correspond to the load states of playwright.
+    """
+
+    RESPONSE = "response"  # The main response (status and headers) is received.
+    DOM_CONTENT_LOADED = "domcontentloaded"
+    LOAD = "load"
+    SETTLED = "settled"  # As decided by the settle strategy. The DOM, requests and cookies are available.
 
 
 class Content:
@@ -23,6 +56,8 @@ class Content:
     The main access point to the content for the different Extractor classes.
 
     This class provides access to the rendered DOM, the involved http requests and cookies of a URL.
+    If a StaticFetcher is given, the document is first fetched with a plain http request and only rendered if it looks
+    like a client side rendered page, or if rendered data (e.g. the requests issued by the page) is accessed.
 
     All features are exposed via async functions, that lazily fetch the content via playwright once accessed. Hence,
     different Extractors can access the features concurrently and independently, but the caching of the features will
@@ -30,20 +65,154 @@ class Content:
     """
 
     tld_extractor: TLDExtract = TLDExtract(cache_dir=None)
-
-    def __init__(self, url: HttpUrl):
+    interceptor: Interceptor = Interceptor()
+    settle: SettleStrategy = create_settle_strategy()
+    parser: Parser = create_parser()
+    # The keywords of all extractors that search for keywords, registered by the extractors during their setup.
+    keywords: KeywordMatcher = KeywordMatcher()
+    # The ad-block lists of all ad-block based extractors, registered by the extractors during their setup.
+    adblock_lists: AdblockLists = AdblockLists(ADBLOCK_ENGINE_CACHE_DIRECTORY if ADBLOCK_ENGINE_CACHE else None)
+    # The limits of a single page, beyond which the content is truncated (see degraded). The limit of the number of
+    # elements is enforced by the parser.
+    max_html_size: int = CONTENT_MAX_HTML_SIZE
+    max_network_records: int = CONTENT_MAX_NETWORK_RECORDS
+
+    def __init__(
+        self,
+        url: HttpUrl,
+        browser: Optional[Union[BrowserSession, BrowserBalancer]] = None,
+        scheduler: Optional[RenderScheduler] = None,
+        fetcher: Optional[StaticFetcher] = None,
+        executor: Optional[Executor] = None,
+    ):
+        """
+        :param url: The URL of the content.
+        :param browser: The (shared) browser session, or balancer over multiple playwright endpoints, used to render
+                        the content. If None, a transient balancer over the configured endpoints is started for the
+                        fetch and closed afterwards, which is considerably slower.
+        :param scheduler: The (shared) admission control the render has to pass. If None, the content is rendered
+                          immediately.
+        :param fetcher: The (shared) fetcher used to try a static fetch first. If None, the content is always rendered.
+        :param executor: The executor in which the document is parsed, such that the event loop is not blocked by large
+                         documents. If None, the default (thread) executor of the event loop is used.
+        """
         self.url = url
+        self.browser = browser
+        self.scheduler = scheduler
+        self.fetcher = fetcher
+        self.executor = executor
+        # Whether the content was (so far) only fetched statically, i.e. without rendering.
+        self.static = False
+        self._rendering_required = fetcher is None
+        # The time (seconds) the render waited for a free slot of the scheduler.
+        self.queue_time: float = 0
+        # Why waiting for the page to settle ended, see metalookup.core.settle.
+        self.settle_reason: Optional[str] = None
+        # Which limits the (pathologically large) page exceeded and how the content was truncated, i.e. why the results
+        # of the extractors have a reduced confidence. Empty if the content is complete.
+        self.degraded: dict[str, str] = {}
         self._task: Optional[Task] = None
+        self._stages: Optional[dict[Stage, Future]] = None
         self._domain: Optional[str] = None
-        self._soup: Optional[BeautifulSoup] = None
-        self._responses: Optional[list[Response]] = None
-        self._requests: Optional[list[Request]] = None
-        self._response: Optional[Response] = None
+        self._soup: Optional[Future[BeautifulSoup]] = None
+        self._responses: Optional[list[ResponseRecord]] = None
+        self._requests: Optional[list[RequestRecord]] = None
+        self._response: Optional[ResponseRecord] = None
         self._html: Optional[str] = None
         self._cookies: Optional[list[Cookie]] = None
-        self._raw_links: Optional[list[str]] = None
-
-    async def _fetch(self):
+        self._page_index: Optional[Future[tuple[PageIndex, list[str], LinkTable]]] = None
+        self._keyword_matches: Optional[Future[Matches]] = None
+        self._blocked_links: Optional[Future[tuple[float, dict[str, set[str]]]]] = None
+        # Whether the content was built from a snapshot given by the client, see from_snapshot.
+        self.snapshot = False
+
+    @classmethod
+    def from_snapshot(cls, url: HttpUrl, snapshot: PageSnapshot, executor: Optional[Executor] = None) -> "Content":
+        """
+        Build the content from a snapshot of the page (e.g. as fetched by a crawler), i.e. without fetching or
+        rendering the page. Features missing from the snapshot are taken from its HAR log (if any) or are empty.
+        :param executor: See __init__.
+        """
+        content = cls(url=url, executor=executor)
+        content.snapshot = True
+        records = har_records(snapshot.har or {})
+
+        def lower(headers: dict[str, str]) -> dict[str, str]:
+            return {name.lower(): value for name, value in headers.items()}
+
+        if snapshot.requests is not None:
+            requests = [
+                RequestRecord(r.url, r.method, r.resource_type, lower(r.headers), started=0) for r in snapshot.requests
+            ]
+            responses = [
+                ResponseRecord(r.url, r.status, lower(r.response_headers), request, elapsed=0)
+                for r, request in zip(snapshot.requests, requests)
+                if r.status is not None
+            ]
+        else:
+            requests, responses = [record.request for record in records], records
+
+        main = main_response(url, records) or ResponseRecord(
+            url, 200, {}, RequestRecord(url, "GET", "document", {}, started=0), elapsed=0
+        )
+        content._response = main._replace(
+            status=snapshot.status or main.status,
+            headers=lower(snapshot.headers) if snapshot.headers is not None else main.headers,
+        )
+        limit = content.max_network_records
+        if len(requests) > limit or len(responses) > limit:
+            content.degraded["network_records"] = (
+                f"recorded the first {limit} network requests and responses, dropped "
+                f"{max(len(requests) - limit, 0)} requests and {max(len(responses) - limit, 0)} responses"
+            )
+        content._requests, content._responses = requests[:limit], responses[:limit]
+        content._cookies = (
+            [
+                Cookie(**{**cookie.dict(), "domain": cookie.domain or urlparse(url).hostname})
+                for cookie in snapshot.cookies
+            ]
+            if snapshot.cookies is not None
+            else har_cookies(snapshot.har or {})
+        )
+        content._html = content._limit(snapshot.html)
+        return content
+
+    async def to_snapshot(self) -> PageSnapshot:
+        """
+        The page as captured (see from_snapshot), e.g. to store it for a later replay.
+        Only includes the requests if the page was rendered, i.e. does not trigger a render.
+        """
+        html, response, cookies = await self.html(), await self.response(), await self.cookies()
+        responses = {id(record.request): record for record in self._responses or []}
+        requests = None
+        if self._requests is not None:
+            requests = [
+                SnapshotRequest(
+                    url=request.url,
+                    method=request.method,
+                    resource_type=request.resource_type,
+                    headers=request.headers,
+                    status=record.status if record is not None else None,
+                    response_headers=record.headers if record is not None else {},
+                )
+                for request in self._requests
+                for record in [responses.get(id(request))]
+            ]
+        return PageSnapshot(
+            html=html,
+            status=response.status,
+            headers=response.headers,
+            cookies=[SnapshotCookie(**cookie) for cookie in cookies],
+            requests=requests,
+        )
+
+    async def _fetch(self, stage: Stage = Stage.SETTLED, rendered: bool = False):
+        """
+        Wait until the content reached given readiness stage, starting the fetch if necessary.
+        Errors of the fetch are passed on, unless the requested stage was reached before the error occurred.
+        :param stage: The readiness stage to wait for.
+        :param rendered: Whether the content must be rendered, i.e. whether a static fetch is not sufficient.
+        """
         # A pretty primitive implementation of "request deduplication".
         # If fetch is called, we check if there is already a coroutine waiting
         # for fetch to be completed.
@@ -51,54 +220,164 @@ class Content:
         #   instead of  issuing a new one (that's why tasks are used - instead of plain
         #   awaitables - one can await a task multiple times).
         # - If not, then a new respective task is created and waited for.
+        # Every stage has its own future that is resolved by the task as soon as the stage is reached. This way, e.g.
+        # the header based extractors need not wait until the whole page is rendered.
 
         async def _task():
-            with runtime() as t:
-                async with async_playwright() as p:
-                    self._responses = []
-                    self._requests = []
-                    browser = await p.chromium.connect_over_cdp(endpoint_url=PLAYWRIGHT_WS_ENDPOINT)
-                    page = await browser.new_page()
-
-                    # Fixme: we need to await the all_headers in the callbacks, probably because we leak the response
-                    #        out of the async_playwright context and it seems we cannot access the all_headers after the
-                    #        async_playwright context is closed.
-                    #        Eventually turn the content class into a context, i.e. keep the async_context open as long
-                    #        as the content class is in use!
-
-                    async def on_request(request: Request):
-                        self._requests.append(request)
-                        await request.all_headers()
-
-                    async def on_response(response: Response):
-                        self._responses.append(response)
-                        await response.all_headers()
-
-                    page.on("request", on_request)
-                    page.on("response", on_response)
-
-                    # waits for page to fully load (= no network traffic for 500ms) or a max timeout
-                    self._response = await page.goto(
-                        self.url, wait_until="networkidle", timeout=PLAYWRIGHT_PAGE_LOAD_TIMEOUT * 1000
-                    )
-                    self._html = await page.content()
-
-                    # playwright offers the cookies in three different ways:
-                    #  - via the cookies of the context
-                    #  - via the all_header() dictionary where cookies are merged into one "set-cookie" header where
-                    #    individual cookies are separated via newlines.
-                    #  - via the headers_array() list where the cookies will be separated into individual entries.
-                    # Using page.context.cookies() avoids a lot of hassle:
-                    #  - no need to parse the new line separated all_headers content.
-                    #  - no need to deduplicate (e.g. multiple request may set the same cookie)
-                    #  - no need to validate and parse individual cookies
-                    self._cookies = await page.context.cookies()
-            logger.info(f"Fetched {self.url} in {t():5.2f}s")
-
-        if self._task is None:
+            if not self._rendering_required:
+                with runtime() as t:
+                    snapshot = await self.fetcher.fetch(self.url)
+                if snapshot is not None:
+                    self.static = True
+                    self._response, self._html, self._cookies = snapshot.response, snapshot.html, snapshot.cookies
+                    self._html = self._limit(self._html)
+                    self._reached(Stage.SETTLED)
+                    logger.info(f"Fetched {self.url} statically in {t():5.2f}s")
+                    return
+
+            self.static = False
+            async with self._slot():
+                with runtime() as t:
+                    if self.browser is None:
+                        # serves this single fetch, hence creates no more than the one browser context needed
+                        async with BrowserBalancer(prewarm=False) as browser:
+                            await self._render(browser)
+                    else:
+                        await self._render(self.browser)
+            logger.info(
+                f"Fetched {self.url} in {t():5.2f}s (queued for {self.queue_time:5.2f}s, settled: {self.settle_reason})"
+            )
+
+        if rendered:
+            self._rendering_required = True
+
+        if self._task is None or (rendered and self.static and self._task.done()):
+            loop = asyncio.get_running_loop()
+            self._stages = {s: loop.create_future() for s in Stage}
             self._task = asyncio.create_task(_task(), name=self.url)
 
-        await self._task
+        reached = self._stages[stage]
+        await asyncio.wait([reached, self._task], return_when=asyncio.FIRST_COMPLETED)
+        if not reached.done():
+            # The task finished without reaching the stage, i.e. it failed: Raise the respective exception.
+            await self._task
+
+        if rendered and self.static:
+            # Rendering was required while the static fetch was already running: Render now.
+            await self._fetch(stage=stage, rendered=True)
+
+    def _reached(self, stage: Stage):
+        """Resolve the future of given stage (and of all previous stages, in case they were skipped)."""
+        for s in Stage:
+            if not self._stages[s].done():
+                self._stages[s].set_result(None)
+            if s == stage:
+                break
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        """Hold a render slot of the scheduler (if any). Raises an HTTPException (503) if the service is saturated."""
+        if self.scheduler is None:
+            yield
+        else:
+            async with self.scheduler.slot() as queue_time:
+                self.queue_time = queue_time
+                yield
+
+    async def _render(self, browser: Union[BrowserSession, BrowserBalancer]):
+        # Only compact records of the requests and responses are kept, such that nothing refers to the page (or
+        # browser) once the render is done and the page is returned to the pool.
+        # Beyond the limit, only the first requests and responses are recorded.
+        requests: dict[Request, RequestRecord] = {}
+        responses: list[ResponseRecord] = []
+        dropped = {"requests": 0, "responses": 0}
+
+        def on_request(request: Request):
+            if len(requests) < self.max_network_records:
+                requests[request] = record_request(request)
+            else:
+                dropped["requests"] += 1
+
+        def on_response(response: Response):
+            if len(responses) < self.max_network_records:
+                responses.append(record_response(response, requests.get(response.request)))
+            else:
+                dropped["responses"] += 1
+
+        async with browser.page() as page:
+            page.on("request", on_request)
+            page.on("response", on_response)
+            await self.interceptor.install(page)
+            settled = await self.settle.watch(page)
+
+            deadline = time.monotonic() + PLAYWRIGHT_PAGE_LOAD_TIMEOUT
+
+            def timeout() -> float:
+                """The remaining time (milliseconds) of the overall page load timeout."""
+                return max(deadline - time.monotonic(), 0) * 1000
+
+            # returns as soon as the main response was received and the navigation is committed
+            response = await page.goto(self.url, wait_until="commit", timeout=timeout())
+            self._response = response and record_response(response, requests.get(response.request))
+            self._reached(Stage.RESPONSE)
+
+            await page.wait_for_load_state(Stage.DOM_CONTENT_LOADED.value, timeout=timeout())
+            self._reached(Stage.DOM_CONTENT_LOADED)
+            # waits for page to become stable (e.g. no network traffic for 500ms) or a max timeout
+            self.settle_reason = await self._load_and_settle(page, settled, timeout())
+            self._html = self._limit(await page.content())
+
+            # playwright offers the cookies in three different ways:
+            #  - via the cookies of the context
+            #  - via the all_header() dictionary where cookies are merged into one "set-cookie" header where
+            #    individual cookies are separated via newlines.
+            #  - via the headers_array() list where the cookies will be separated into individual entries.
+            # Using page.context.cookies() avoids a lot of hassle:
+            #  - no need to parse the new line separated all_headers content.
+            #  - no need to deduplicate (e.g. multiple request may set the same cookie)
+            #  - no need to validate and parse individual cookies
+            self._cookies = await page.context.cookies()
+            self._requests = list(requests.values())
+            self._responses = responses
+            if any(dropped.values()):
+                self.degraded["network_records"] = (
+                    f"recorded the first {self.max_network_records} network requests and responses, dropped "
+                    f"{dropped['requests']} requests and {dropped['responses']} responses"
+                )
+            self._reached(Stage.SETTLED)
+
+    async def _load_and_settle(self, page: Page, settled: Settled, timeout: float) -> str:
+        """
+        Wait for the load event and for the page to settle, returning the reason why settling ended.
+        The settle strategy bounds the wait for the load event: E.g. a page whose load event never fires (due to a
+        hanging sub resource) is considered as settled by the adaptive strategy, instead of failing with a TimeoutError.
+        """
+        load = asyncio.ensure_future(page.wait_for_load_state(Stage.LOAD.value, timeout=timeout))
+        settling = asyncio.ensure_future(settled(timeout))
+        try:
+            await asyncio.wait([load, settling], return_when=asyncio.FIRST_COMPLETED)
+            if load.done() and not isinstance(load.exception(), TimeoutError):
+                load.result()  # raises any other error
+                self._reached(Stage.LOAD)
+            # If the load event did not fire in time, the settle strategy decides whether this is an error.
+            return await settling
+        finally:
+            for task in (load, settling):
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # i.e. not logged as never retrieved
+
+    def _limit(self, html: str) -> str:
+        """Truncate the html to the first max_html_size bytes (utf-8), flagging the content as degraded."""
+        if len(html) * 4 <= self.max_html_size:
+            return html  # cannot exceed the limit, even if every character took 4 bytes
+        encoded = html.encode("utf-8", errors="replace")
+        if len(encoded) <= self.max_html_size:
+            return html
+        self.degraded["html_size"] = f"truncated the html to the first {self.max_html_size} of {len(encoded)} bytes"
+        # drop a character that is cut in half by the limit
+        return encoded[: self.max_html_size].decode("utf-8", errors="ignore")
 
     async def cookies(self) -> list[Cookie]:
         """
@@ -109,31 +388,41 @@ class Content:
             await self._fetch()
         return self._cookies
 
-    async def request(self) -> Request:
+    async def request(self) -> RequestRecord:
         """
         The request for the primary resource.
         - Redirects will be resolved.
         """
         return (await self.response()).request
 
-    async def response(self) -> Response:
+    async def response(self) -> ResponseRecord:
         """
         The response of the primary resource.
+        Available as soon as the main response is received, i.e. long before the page is fully rendered.
         """
         if self._response is None:
-            await self._fetch()
+            await self._fetch(Stage.RESPONSE)
         return self._response
 
-    async def responses(self) -> list[Response]:
+    async def responses(self) -> list[ResponseRecord]:
+        """All responses received while rendering the page. Requires the page to be rendered."""
         if self._responses is None:
-            await self._fetch()
+            await self._fetch(rendered=True)
         return self._responses
 
-    async def requests(self) -> list[Request]:
+    async def requests(self) -> list[RequestRecord]:
+        """All requests issued while rendering the page. Requires the page to be rendered."""
         if self._requests is None:
-            await self._fetch()
+            await self._fetch(rendered=True)
         return self._requests
 
+    def require_rendering(self):
+        """
+        Make sure the content is rendered by the browser, even if a static fetch would be sufficient.
+        Must be called before any of the features is accessed.
+        """
+        self._rendering_required = True
+
     async def headers(self) -> dict[str, str]:
         """
         The response headers of the main response.
@@ -179,55 +468,84 @@ class Content:
         return self._domain
 
     async def soup(self) -> BeautifulSoup:
+        """The BeautifulSoup tree of the html, parsed in a thread (as the tree cannot be sent between processes)."""
+        # Note: The position where we await on the html is actually critical:
+        #       If multiple tasks enter this method, they will all be suspended before the if block.
+        #       Once one of the tasks resumes, it will initialize self._soup, and once the remaining
+        #       tasks resume, they will skip the if block and await the very same future. If the await statement
+        #       would be before the assignment within the if block, all tasks would suspend within the if block and
+        #       hence after resumption would _all_ perform the same rather expensive computation!
+        html = await self.html()
         if self._soup is None:
-            self._soup = BeautifulSoup(await self.html(), "lxml")
-        return self._soup
+            self._soup = asyncio.get_running_loop().run_in_executor(None, BeautifulSoup, html, "lxml")
+        return await self._soup
+
+    async def page_index(self) -> PageIndex:
+        """
+        The index over the elements of the page, shared by all extractors that inspect the DOM.
+        Built by the configured parser in the executor, i.e. does neither block the event loop nor require the soup.
+        """
+        index, _, _ = await self._index()
+        return index
 
     async def raw_links(self) -> list[str]:
-        # Note: The position where we await on the soup is actually critical:
-        #       If multiple tasks enter this method, they will all be suspended before the if block.
-        #       Once one of the tasks resumes, it will initialize self._raw_links, and once the remaining
-        #       tasks resume, they will skip the (expensive) if block. If the await statement would be within
-        #       the if block, all tasks would suspend within the if block and hence after resumption would _all_
-        #       perform the same rather expensive computation!
-        soup = await self.soup()
-        if self._raw_links is None:
-
-            def extract_raw_links(soup: BeautifulSoup, image_links: list[str]) -> list[str]:
-                source_regex = re.compile(r"src\=[\"|\']([\w\d\:\/\.\-\?\=]+)[\"|\']")
-                logger.debug("extracting raw links")
-                unique_tags = get_unique_list([tag.name for tag in soup.find_all()])
-                logger.debug(f"unique_tags: {unique_tags}")
-                if _SCRIPT in unique_tags:
-                    unique_tags.remove(_SCRIPT)
-                    source_regex = source_regex.findall
-                    script_links = [
-                        link
-                        for element in soup.find_all(_SCRIPT)
-                        for link in source_regex(str(element).replace("\n", ""))
-                        if link
-                    ]
-                else:
-                    script_links = []
-
-                attributes = [
-                    "href",
-                    "src",
-                    "srcset",
-                    "img src",
-                    "data-src",
-                    "data-srcset",
-                ]
-                links = [
-                    element.attrs.get(attribute)
-                    for tag in unique_tags
-                    for element in get_unique_list(soup.find_all(tag))
-                    for attribute in attributes
-                    if element.has_attr(attribute)
-                ]
-                logger.debug(f"Found {len(links)} links")
-                return get_unique_list(links + [el for el in image_links if el is not None] + script_links)
-
-            image_links = [image.attrs.get("src") for image in soup.findAll("img")]
-            self._raw_links = extract_raw_links(soup=soup, image_links=image_links)
-        return self._raw_links
+        """All (unique) links referenced by the page via one of the link attributes or within a script element."""
+        _, links, _ = await self._index()
+        return links
+
+    async def links(self) -> LinkTable:
+        """
+        The raw links, each parsed once (e.g. resolved against the url of the page), shared by all extractors that
+        inspect links.
+        Built together with the page index in the executor.
+        """
+        _, _, table = await self._index()
+        return table
+
+    async def _index(self) -> tuple[PageIndex, list[str], LinkTable]:
+        # See soup for the reasoning behind the position of the await statements.
+        html = await self.html()
+        if self._page_index is None:
+            self._page_index = asyncio.get_running_loop().run_in_executor(
+                self.executor, _index, self.parser, self.url, html
+            )
+        index, links, table = await self._page_index
+        if index.truncated:
+            self.degraded["elements"] = f"indexed the first {index.max_elements} elements of the document"
+        return index, links, table
+
+    async def keyword_matches(self) -> Matches:
+        """
+        The occurrences of the registered keywords (see KeywordMatcher) in the html, found with a single scan of the
+        html (in the executor) for all extractors. The html is lower-cased in the executor as well, as sending the
+        lower-cased html to (and back from) the executor would cost more than lower-casing it there.
+        """
+        # See soup for the reasoning behind the position of the await statements.
+        html = await self.html()
+        if self._keyword_matches is None:
+            self._keyword_matches = asyncio.get_running_loop().run_in_executor(self.executor, self.keywords.match, html)
+        return await self._keyword_matches
+
+    async def blocked_links(self) -> tuple[float, dict[str, set[str]]]:
+        """
+        The links blocked by each of the registered ad-block lists (see AdblockLists) and the computation time taken,
+        found with a single pass over the (resolved) links (in the executor) for all lists.
+        """
+        # See soup for the reasoning behind the position of the await statements.
+        domain, links = await self.domain(), await self.links()
+        if self._blocked_links is None:
+            self._blocked_links = asyncio.ensure_future(
+                self.adblock_lists.match(self.executor, domain, list(links.url), list(links.third_party))
+            )
+        return await self._blocked_links
+
+
+def _index(parser: Parser, url: str, html: str) -> tuple[PageIndex, list[str], LinkTable]:
+    """
+    Build the page index, extract the raw links of given html and parse them into the link table.
+    Runs in an executor, hence only returns the (compact) results, but not the parsed tree.
+    """
+    index = parser.index(html)
+    links = [value for values in index.attributes.values() for value in values] + index.script_links
+    table = build_link_table(url, links, Content.tld_extractor)
+    return index, list(table.raw), table
@@ -19,6 +19,12 @@ T = TypeVar("T")
 
 class Extractor(Generic[T]):
     key: str  # The name of the extracted metadatum
+    # Whether the extractor relies on the page as rendered by the browser (e.g. on script generated content), i.e.
+    # whether the static fetch mode of the Content must not be used.
+    requires_rendering: bool = False
+    # Whether the extractor inspects the live page itself (e.g. with an external service) instead of the Content, i.e.
+    # whether it is skipped if the Content is built from a snapshot given by the client.
+    requires_live_page: bool = False
 
     @abc.abstractmethod
     async def setup(self):
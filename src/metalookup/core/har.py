@@ -0,0 +1,98 @@
+import logging
+from datetime import datetime
+from typing import Any, Optional
+from urllib.parse import urljoin, urlparse
+
+from playwright.async_api import Cookie
+
+from metalookup.core.records import RequestRecord, ResponseRecord
+
+logger = logging.getLogger(__name__)
+
+_REDIRECT_STATUS = frozenset({301, 302, 303, 307, 308})
+
+
+def _headers(headers: list[dict[str, str]]) -> dict[str, str]:
+    """Lower case and merge the headers like playwright does (multiple set-cookie headers are separated by newlines)."""
+    merged: dict[str, str] = {}
+    for header in headers:
+        name = header["name"].lower()
+        separator = "\n" if name == "set-cookie" else ", "
+        merged[name] = f"{merged[name]}{separator}{header['value']}" if name in merged else header["value"]
+    return merged
+
+
+def _timestamp(value: Optional[str]) -> float:
+    """The unix timestamp of an ISO 8601 date (as used by HAR logs), 0 if the date is missing or invalid."""
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return 0
+
+
+def har_records(har: dict[str, Any]) -> list[ResponseRecord]:
+    """
+    The records of all requests (and their responses) of a HAR log (http archive, version 1.2), e.g. as recorded by a
+    crawler, in the order of the log.
+    """
+    records = []
+    for entry in har.get("log", {}).get("entries", []):
+        request = RequestRecord(
+            url=entry["request"]["url"],
+            method=entry["request"].get("method", "GET"),
+            resource_type=entry.get("_resourceType", "other"),
+            headers=_headers(entry["request"].get("headers", [])),
+            started=_timestamp(entry.get("startedDateTime")),
+        )
+        response = entry.get("response", {})
+        records.append(
+            ResponseRecord(
+                url=response.get("url") or request.url,
+                status=response.get("status", 0),
+                headers=_headers(response.get("headers", [])),
+                request=request,
+                elapsed=max(entry.get("time", 0), 0) / 1000,
+            )
+        )
+    return records
+
+
+def har_cookies(har: dict[str, Any]) -> list[Cookie]:
+    """All cookies set by the responses of the HAR log (later responses replace the cookies of earlier ones)."""
+    cookies: dict[tuple[str, str, str], Cookie] = {}
+    for entry in har.get("log", {}).get("entries", []):
+        for cookie in entry.get("response", {}).get("cookies", []):
+            domain = cookie.get("domain") or urlparse(entry["request"]["url"]).hostname or ""
+            path = cookie.get("path") or "/"
+            cookies[(cookie["name"], domain, path)] = Cookie(
+                name=cookie["name"],
+                value=cookie.get("value", ""),
+                domain=domain,
+                path=path,
+                expires=_timestamp(cookie["expires"]) if cookie.get("expires") else -1,
+                httpOnly=bool(cookie.get("httpOnly", False)),
+                secure=bool(cookie.get("secure", False)),
+                sameSite=cookie.get("sameSite") or "Lax",
+            )
+    return list(cookies.values())
+
+
+def main_response(url: str, records: list[ResponseRecord]) -> Optional[ResponseRecord]:
+    """
+    The response of the page among the records, i.e. the end of the redirect chain starting at given url.
+    None if the url was not requested.
+    """
+    by_url = {}
+    for record in records:
+        by_url.setdefault(record.request.url, record)
+
+    record = by_url.get(url)
+    visited = set()
+    while record is not None and record.status in _REDIRECT_STATUS and record.request.url not in visited:
+        visited.add(record.request.url)
+        location = record.headers.get("location")
+        if location is None or urljoin(record.request.url, location) not in by_url:
+            logger.debug(f"Redirect chain of {url} ends at {record.request.url} within the HAR log")
+            break
+        record = by_url[urljoin(record.request.url, location)]
+    return record
@@ -0,0 +1,61 @@
+import logging
+from typing import Iterable
+
+from playwright.async_api import Page, Route
+
+from metalookup.lib.settings import PLAYWRIGHT_INTERCEPT_MODE, PLAYWRIGHT_INTERCEPT_RESOURCE_TYPES
+
+logger = logging.getLogger(__name__)
+
+OFF = "off"
+ABORT = "abort"
+STUB = "stub"
+
+# The content types of the empty responses with which stubbed resources are answered.
+_STUB_CONTENT_TYPES = {
+    "image": "image/gif",
+    "media": "video/mp4",
+    "font": "font/woff2",
+    "stylesheet": "text/css",
+    "script": "application/javascript",
+}
+
+
+class Interceptor:
+    """
+    Skip the download of heavy sub resources (images, fonts, media, stylesheets) during rendering.
+
+    The extractors only need the URLs of those resources, not their bytes. As the request event of the page is emitted
+    before the request is routed, the requests are still recorded by the Content class. Depending on the mode, the
+    intercepted requests are then either
+     - aborted: No response is recorded for those requests, or
+     - stubbed: Answered locally with an empty 200 response, such that a response is recorded for every request, just
+                like without interception.
+    Requests of other resource types are passed on to the next route handler (or the network).
+    """
+
+    def __init__(
+        self, mode: str = PLAYWRIGHT_INTERCEPT_MODE, resource_types: Iterable[str] = PLAYWRIGHT_INTERCEPT_RESOURCE_TYPES
+    ):
+        """
+        :param mode: One of "off", "abort" or "stub".
+        :param resource_types: The playwright resource types to intercept, e.g. "image" or "font".
+        """
+        if mode not in (OFF, ABORT, STUB):
+            raise ValueError(f"Unknown interception mode {mode}. Expected one of {OFF}, {ABORT}, {STUB}.")
+        self.mode = mode
+        self.resource_types = frozenset(resource_types)
+
+    async def install(self, page: Page):
+        """Register the interception on given page. Does nothing if the interception is turned off."""
+        if self.mode != OFF and self.resource_types:
+            await page.route("**/*", self.handle)
+
+    async def handle(self, route: Route):
+        resource_type = route.request.resource_type
+        if resource_type not in self.resource_types:
+            await route.fallback()
+        elif self.mode == ABORT:
+            await route.abort("blockedbyclient")
+        else:
+            await route.fulfill(status=200, body=b"", content_type=_STUB_CONTENT_TYPES.get(resource_type, "text/plain"))
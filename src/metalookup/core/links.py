@@ -0,0 +1,80 @@
+import os
+from typing import Iterable, Iterator, NamedTuple
+from urllib.parse import urljoin, urlparse
+
+from tldextract.tldextract import TLDExtract
+
+
+class Link(NamedTuple):
+    """A single row of the LinkTable."""
+
+    raw: str
+    url: str
+    host: str
+    suffix: str
+    third_party: bool
+
+
+class LinkTable:
+    """
+    All unique links of a page, each parsed once, stored column wise (one tuple per attribute) to keep the table compact
+    and the access of single attributes (e.g. all suffixes) cheap. Only the columns read by the extractors are parsed.
+    """
+
+    __slots__ = ("raw", "url", "host", "suffix", "third_party")
+
+    def __init__(self, links: Iterable[Link] = ()):
+        columns = tuple(zip(*links)) or ((),) * len(self.__slots__)
+        # The link as it appears in the page.
+        self.raw: tuple[str, ...] = columns[0]
+        # The absolute url (resolved against the url of the page).
+        self.url: tuple[str, ...] = columns[1]
+        # The (lower-cased) host name, empty for links without host (e.g. data or mailto urls).
+        self.host: tuple[str, ...] = columns[2]
+        # The suffix of the path of the raw link (e.g. ".pdf"), empty if the path has no suffix.
+        self.suffix: tuple[str, ...] = columns[3]
+        # Whether the link points to another (registrable) domain than the page.
+        self.third_party: tuple[bool, ...] = columns[4]
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def __iter__(self) -> Iterator[Link]:
+        return map(Link._make, zip(*(getattr(self, column) for column in self.__slots__)))
+
+    def __getstate__(self):
+        return tuple(getattr(self, column) for column in self.__slots__)
+
+    def __setstate__(self, state):
+        for column, values in zip(self.__slots__, state):
+            setattr(self, column, values)
+
+
+def build_link_table(page_url: str, links: Iterable[str], tld_extractor: TLDExtract) -> LinkTable:
+    """
+    Parse the links of a page into a LinkTable.
+    :param page_url: The url of the page, against which relative links are resolved.
+    :param links: The links as they appear in the page (duplicates are dropped).
+    :param tld_extractor: Used to determine the registrable domains, i.e. whether a link is a third party link.
+    """
+    domains: dict[str, str] = {}
+
+    def registrable_domain(host: str) -> str:
+        if host not in domains:
+            domains[host] = (tld_extractor(host).registered_domain or host) if host else ""
+        return domains[host]
+
+    page_domain = registrable_domain(urlparse(page_url).hostname or "")
+
+    rows = []
+    for raw in dict.fromkeys(links):
+        try:
+            # The suffix is taken from the raw link, as e.g. the url of a fragment link ("#top") is the page itself.
+            suffix = os.path.splitext(urlparse(raw).path)[1]
+            url = urljoin(page_url, raw.strip())
+            host = urlparse(url).hostname or ""
+        except ValueError:  # e.g. invalid ipv6 addresses
+            suffix, url, host = "", raw, ""
+        third_party = bool(host) and registrable_domain(host) != page_domain
+        rows.append(Link(raw, url, host, suffix, third_party))
+    return LinkTable(rows)
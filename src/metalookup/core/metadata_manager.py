@@ -1,18 +1,25 @@
 import asyncio
 import logging
+import multiprocessing
 from concurrent.futures import ProcessPoolExecutor
-from typing import Type, Union
+from typing import Optional, Type, Union
 
 import playwright.async_api
 from aiohttp import ClientError
 from fastapi import HTTPException
 from pydantic import ValidationError
 
-from metalookup.app.models import Error, Input, MetadataTags, Output
+from metalookup.app.models import Error, Input, MetadataTags, Output, Status
+from metalookup.caching.snapshots import SnapshotStore
+from metalookup.core.asset_cache import AssetCache
+from metalookup.core.browser import BrowserBalancer
 from metalookup.core.content import Content
 from metalookup.core.extractor import Extractor
+from metalookup.core.scheduler import RenderScheduler
+from metalookup.core.static import StaticFetcher
 from metalookup.features.accessibility import Accessibility
 from metalookup.features.adblock_based import (
+    AdBlockBasedExtractor,
     Advertisement,
     AntiAdBlock,
     EasylistAdult,
@@ -31,8 +38,46 @@ from metalookup.features.javascript import Javascript
 from metalookup.features.licence import LicenceExtractor
 from metalookup.features.malicious_extensions import MaliciousExtensions
 from metalookup.features.security import Security
+from metalookup.lib.settings import CONTENT_FETCH_MODE, PLAYWRIGHT_ASSET_CACHE, SNAPSHOT_STORE
 from metalookup.lib.tools import runtime
 
+_SKIPPED_FOR_SNAPSHOT = "Skipped, as the extractor requires the live page, but the extraction is based on a snapshot."
+
+# The extractors of the manager, in the order of their results.
+EXTRACTORS: list[Type[Extractor]] = [
+    Advertisement,
+    EasyPrivacy,
+    MaliciousExtensions,
+    ExtractFromFiles,
+    FanboyAnnoyance,
+    FanboyNotification,
+    FanboySocialMedia,
+    AntiAdBlock,
+    EasylistGermany,
+    EasylistAdult,
+    Paywalls,
+    Security,
+    IFrameEmbeddable,
+    PopUp,
+    RegWall,
+    LogInOut,
+    Cookies,
+    GDPR,
+    Javascript,
+    Accessibility,
+    LicenceExtractor,
+]
+
+
+async def build_adblock_engines():
+    """
+    Download the lists of the ad-block based extractors and build their rule engines, which are stored if the engine
+    cache is enabled (see ADBLOCK_ENGINE_CACHE), such that later startups load instead of build them.
+    """
+    extractors = [extractor() for extractor in EXTRACTORS if issubclass(extractor, AdBlockBasedExtractor)]
+    await asyncio.gather(*[extractor.setup() for extractor in extractors])
+    await asyncio.get_running_loop().run_in_executor(None, Content.adblock_lists.build)
+
 
 class MetadataManager:
     def __init__(self):
@@ -40,34 +85,38 @@ class MetadataManager:
         # will be initialized in setup call - use None here so that extraction
         # fails if setup method was not called as required
         self.extractors: list[Extractor] = None  # noqa
+        self.browser: BrowserBalancer = None  # noqa
+        self.scheduler: RenderScheduler = None  # noqa
+        self.fetcher: Optional[StaticFetcher] = None
+        self.asset_cache: Optional[AssetCache] = None
+        self.snapshots: Optional[SnapshotStore] = None
+        # Keep references to the running background tasks (e.g. storing snapshots), such that they are not collected.
+        self._background: set[asyncio.Task] = set()
 
         # fixme: eventually we may want to shut down the process pool upon termination
-        self.process_pool: ProcessPoolExecutor = ProcessPoolExecutor(max_workers=4)
+        # Note: Use the spawn context, as forked workers would inherit the pipes to the playwright driver process of
+        #       the browser session which would then never see an EOF and could not be stopped anymore.
+        self.process_pool: ProcessPoolExecutor = ProcessPoolExecutor(
+            max_workers=4, mp_context=multiprocessing.get_context("spawn")
+        )
 
     async def setup(self):
-        types = [
-            Advertisement,
-            EasyPrivacy,
-            MaliciousExtensions,
-            ExtractFromFiles,
-            FanboyAnnoyance,
-            FanboyNotification,
-            FanboySocialMedia,
-            AntiAdBlock,
-            EasylistGermany,
-            EasylistAdult,
-            Paywalls,
-            Security,
-            IFrameEmbeddable,
-            PopUp,
-            RegWall,
-            LogInOut,
-            Cookies,
-            GDPR,
-            Javascript,
-            Accessibility,
-            LicenceExtractor,
-        ]
+        # The browser sessions are shared by all extractions, such that the playwright driver and the connections to
+        # the playwright containers are not re-established for every single request.
+        if self.browser is None:
+            if PLAYWRIGHT_ASSET_CACHE:
+                self.asset_cache = AssetCache()
+                self.asset_cache.load()
+            self.browser = BrowserBalancer(asset_cache=self.asset_cache)
+        await self.browser.setup()
+        # All renders pass the same admission control, such that bursts of requests are queued (or rejected) instead
+        # of overloading the playwright container.
+        if self.scheduler is None:
+            self.scheduler = RenderScheduler()
+        if CONTENT_FETCH_MODE == "static" and self.fetcher is None:
+            self.fetcher = StaticFetcher()
+        if SNAPSHOT_STORE and self.snapshots is None:
+            self.snapshots = SnapshotStore()
 
         async def create_extractor(extractor: Type[Extractor]) -> Extractor:
             instance = extractor()
@@ -76,10 +125,46 @@ class MetadataManager:
 
         logging.info("Initializing extractors")
         self.extractors: tuple[Extractor, ...] = await asyncio.gather(
-            *[create_extractor(extractor) for extractor in types]
+            *[create_extractor(extractor) for extractor in EXTRACTORS]
         )
+        # The lists of the ad-block based extractors are combined into a single engine, built once all are registered.
+        await asyncio.get_running_loop().run_in_executor(None, Content.adblock_lists.build)
         logging.info("Done initializing extractors")
 
+    async def shutdown(self):
+        if self.browser is not None:
+            await self.browser.close()
+        if self.fetcher is not None:
+            await self.fetcher.close()
+
+    def status(self) -> Status:
+        """Expose the utilization of the rendering resources, e.g. to size them appropriately."""
+        return Status(
+            browsers=self.browser.status(),
+            render_queue=self.scheduler.status(),
+            static_fetch=self.fetcher.status() if self.fetcher is not None else None,
+            asset_cache=self.asset_cache.status() if self.asset_cache is not None else None,
+        )
+
+    async def _store_snapshot(self, content: Content):
+        try:
+            snapshot = await content.to_snapshot()
+            await asyncio.get_running_loop().run_in_executor(None, self.snapshots.put, content.url, snapshot)
+        except Exception:
+            self.logger.exception(f"Failed to store the snapshot of {content.url}")
+
+    async def replay(self, message: Input, extra: bool) -> Output:
+        """
+        Extract the metadata again from the latest stored snapshot of the url, i.e. without rendering the page.
+        Raises an HTTPException (404) if there is no snapshot of the url.
+        """
+        if self.snapshots is None:
+            raise HTTPException(status_code=404, detail="The snapshot store is disabled.")
+        snapshot = await asyncio.get_running_loop().run_in_executor(None, self.snapshots.get, message.url)
+        if snapshot is None:
+            raise HTTPException(status_code=404, detail=f"There is no snapshot of {message.url}.")
+        return await self.extract(Input(url=message.url, snapshot=snapshot), extra=extra)
+
     async def extract(self, message: Input, extra: bool) -> Output:
         """
         Call the different registered extractors concurrently with given input.
@@ -88,10 +173,23 @@ class MetadataManager:
         """
         self.logger.debug("Calling extractors from manager")
 
-        content = Content(url=message.url)
+        if message.snapshot is not None:
+            content = Content.from_snapshot(url=message.url, snapshot=message.snapshot, executor=self.process_pool)
+        else:
+            content = Content(
+                url=message.url,
+                browser=self.browser,
+                scheduler=self.scheduler,
+                fetcher=self.fetcher,
+                executor=self.process_pool,
+            )
+            if any(extractor.requires_rendering for extractor in self.extractors):
+                content.require_rendering()
 
         async def run_extractor(extractor: Extractor) -> Union[MetadataTags, Error]:
             """Call the extractor and transform its result into the expected output format"""
+            if content.snapshot and extractor.requires_live_page:
+                return Error(error=_SKIPPED_FOR_SNAPSHOT)
             try:
                 with runtime() as t:
                     stars, explanation, extra_data = await extractor.extract(
@@ -100,6 +198,10 @@ class MetadataManager:
                 self.logger.info(f"Extracted {extractor.__class__.__name__} in {t():5.2f}s.")
                 return MetadataTags(stars=stars, explanation=explanation, extra=extra_data if extra else None)
 
+            except HTTPException:
+                # An expected outcome (e.g. the scheduler rejected the render) that every extractor awaiting the content
+                # fails with, hence logged once below instead of once per extractor.
+                raise
             except Exception:
                 # While we let the extractor exceptions pass upwards, we provide a uniform logging here that will
                 # allow to understand what went wrong and why.
@@ -116,14 +218,28 @@ class MetadataManager:
                 *[run_extractor(extractor=extractor) for extractor in self.extractors]
             )
             self.logger.debug("Received all extractor results.")
-
-            return Output(url=message.url, **{e.key: v for e, v in zip(self.extractors, results)})
+            if content.degraded:
+                self.logger.warning(f"Extracted {message.url} from a truncated page: {content.degraded}")
+            if self.snapshots is not None and not content.snapshot:
+                # storing is not part of the response time
+                task = asyncio.create_task(self._store_snapshot(content))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+
+            return Output(
+                url=message.url,
+                degraded=content.degraded or None,
+                **{e.key: v for e, v in zip(self.extractors, results)},
+            )
 
         # Technically, for the user the communication with the playwright or lighthouse container (which will eventually
         # happen during the extractor calls) is an implementation detail of the server. Returning a 502 (Bad Gateway)
         # should indicate to the user, that the resource (in this case the url that was transmitted to the extract
         # endpoint) is no longer available, whereas internal communication problems should not give this indication
         # to the user.
+        except HTTPException as e:
+            self.logger.debug(f"Extraction of {message.url} ended with status {e.status_code}: {e.detail}")
+            raise
         except playwright.async_api.Error as e:
             raise HTTPException(status_code=500, detail=f"Failed to communicate with playwright container: {e}")
         except ClientError as e:
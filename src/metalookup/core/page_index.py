@@ -0,0 +1,79 @@
+import re
+from collections import defaultdict
+from typing import Optional
+
+# The attributes whose values are links.
+_LINK_ATTRIBUTES = ["href", "src", "srcset", "data-src", "data-srcset"]
+# Links assigned to a src property within an inline script.
+_SOURCE_REGEX = re.compile(r"src\=[\"|\']([\w\d\:\/\.\-\?\=]+)[\"|\']")
+
+
+class PageIndex:
+    """
+    An index over the elements of a parsed page, built with a single traversal of the DOM.
+
+    Different extractors need different views of the DOM (e.g. all script sources, all anchors, all values of the
+    href attributes). Instead of every extractor walking the whole tree again (possibly multiple times), they read
+    from this index, which is built once per page by one of the parsers (see metalookup.core.parser).
+    The index only holds plain strings and counts, i.e. it does not keep the parsed tree alive and can be pickled.
+    """
+
+    def __init__(self, max_elements: Optional[int] = None):
+        # How many elements are indexed at most, further elements are dropped (see add).
+        self.max_elements = max_elements
+        # Whether elements were dropped, as the index reached max_elements.
+        self.truncated = False
+        self._size = 0
+        # The number of elements per tag name.
+        self.tag_counts: dict[str, int] = defaultdict(int)
+        # All values of the link attributes (in document order), e.g. of all href attributes.
+        self.attributes: dict[str, list[str]] = {attribute: [] for attribute in _LINK_ATTRIBUTES}
+        # The src attributes of all script elements.
+        self.script_sources: list[str] = []
+        # The links assigned to a src property within the (inline) content of the script elements.
+        self.script_links: list[str] = []
+        # The content of all style elements.
+        self.style_texts: list[str] = []
+        # The href attributes of all anchor elements.
+        self.anchor_hrefs: list[str] = []
+        # The rel attributes of all link elements.
+        self.link_rels: list[str] = []
+
+    def add(self, tag: str, attributes: dict[str, str]) -> bool:
+        """
+        Add an element, must be called in document order.
+        Returns False (and drops the element) if the index is full, i.e. the parser may stop.
+        """
+        if self.max_elements is not None and self._size >= self.max_elements:
+            self.truncated = True
+            return False
+        self._size += 1
+        self.tag_counts[tag] += 1
+        for attribute, values in self.attributes.items():
+            if attribute in attributes:
+                values.append(attributes[attribute])
+        if tag == "script" and "src" in attributes:
+            self.script_sources.append(attributes["src"])
+        elif tag == "a" and "href" in attributes:
+            self.anchor_hrefs.append(attributes["href"])
+        elif tag == "link" and "rel" in attributes:
+            self.link_rels.append(attributes["rel"])
+        return True
+
+    def add_text(self, tag: str, text: Optional[str]):
+        """Add the content of an element, only the links within scripts and the content of style elements are kept."""
+        if not text:
+            return
+        if tag == "script":
+            self.script_links += [link for link in _SOURCE_REGEX.findall(text.replace("\n", "")) if link]
+        elif tag == "style":
+            self.style_texts.append(text)
+
+    def freeze(self) -> "PageIndex":
+        """Turn the tag counts into a plain dict, such that looking up a missing key does not insert it."""
+        self.tag_counts = dict(self.tag_counts)
+        return self
+
+    def __len__(self) -> int:
+        """The number of indexed elements."""
+        return self._size
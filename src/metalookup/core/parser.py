@@ -0,0 +1,111 @@
+import abc
+import logging
+from typing import Optional
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+from metalookup.core.page_index import PageIndex
+from metalookup.lib.settings import CONTENT_MAX_ELEMENTS, CONTENT_PARSER
+
+logger = logging.getLogger(__name__)
+
+# The size (characters) of the chunks fed to the streaming parser.
+_CHUNK_SIZE = 2**16
+# The elements whose content is part of the index.
+_TEXT_TAGS = frozenset({"script", "style"})
+
+
+class Parser(abc.ABC):
+    """
+    Builds the PageIndex of a html document.
+
+    The backends differ in speed and memory consumption, but produce the same index. The index only depends on tags and
+    attributes, i.e. it does not need a (comparatively expensive) BeautifulSoup tree.
+    At most max_elements elements (the first ones in document order) are indexed, see PageIndex.truncated.
+    """
+
+    def __init__(self, max_elements: Optional[int] = CONTENT_MAX_ELEMENTS):
+        self.max_elements = max_elements
+
+    @abc.abstractmethod
+    def index(self, html: str) -> PageIndex:
+        """Build the (frozen) index of given html."""
+
+
+class SoupParser(Parser):
+    """Builds the index from a BeautifulSoup tree. The slowest backend, kept for compatibility."""
+
+    def index(self, html: str) -> PageIndex:
+        index = PageIndex(self.max_elements)
+        for element in BeautifulSoup(html, "lxml").find_all(True):
+            attributes = element.attrs.items()
+            if not index.add(element.name, {k: " ".join(v) if isinstance(v, list) else v for k, v in attributes}):
+                break
+            if element.name in _TEXT_TAGS:
+                index.add_text(element.name, element.get_text())
+        return index.freeze()
+
+
+class LxmlParser(Parser):
+    """Builds the index from a plain lxml tree, which is considerably faster and smaller than a BeautifulSoup tree."""
+
+    def index(self, html: str) -> PageIndex:
+        index = PageIndex(self.max_elements)
+        # Parse the encoded document, as lxml refuses strings that contain an encoding declaration.
+        root = etree.fromstring(html.encode("utf-8", errors="replace"), etree.HTMLParser(encoding="utf-8"))
+        if root is not None:
+            for element in root.iter():
+                if isinstance(element.tag, str):  # skip comments and processing instructions
+                    if not index.add(element.tag, dict(element.attrib)):
+                        break
+                    if element.tag in _TEXT_TAGS:
+                        index.add_text(element.tag, element.text)
+        return index.freeze()
+
+
+class StreamingParser(Parser):
+    """
+    Builds the index from the events of an incremental lxml parser. Elements are discarded as soon as they are closed,
+    i.e. the whole tree is never held in memory.
+    """
+
+    def index(self, html: str) -> PageIndex:
+        index = PageIndex(self.max_elements)
+        parser = etree.HTMLPullParser(events=("start", "end"), encoding="utf-8")
+
+        def consume():
+            for event, element in parser.read_events():
+                if not isinstance(element.tag, str):
+                    continue
+                if event == "start":
+                    if not index.add(element.tag, dict(element.attrib)):
+                        return
+                    continue
+                if element.tag in _TEXT_TAGS:
+                    index.add_text(element.tag, element.text)
+                # drop the closed element and all its (already closed) previous siblings
+                element.clear(keep_tail=True)
+                parent = element.getparent()
+                while parent is not None and element.getprevious() is not None:
+                    del parent[0]
+
+        for start in range(0, len(html), _CHUNK_SIZE):
+            parser.feed(html[start : start + _CHUNK_SIZE].encode("utf-8", errors="replace"))
+            consume()
+            if index.truncated:
+                # the remainder of the document is not needed
+                return index.freeze()
+        try:
+            parser.close()
+        except etree.XMLSyntaxError:
+            logger.debug("Failed to parse (empty) document")
+        consume()
+        return index.freeze()
+
+
+def create_parser(name: str = CONTENT_PARSER, max_elements: Optional[int] = CONTENT_MAX_ELEMENTS) -> Parser:
+    parsers = {"soup": SoupParser, "lxml": LxmlParser, "streaming": StreamingParser}
+    if name not in parsers:
+        raise ValueError(f"Unknown parser {name}. Expected one of {', '.join(parsers)}.")
+    return parsers[name](max_elements)
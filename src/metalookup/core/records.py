@@ -0,0 +1,54 @@
+import time
+from typing import NamedTuple, Optional
+
+from playwright.async_api import Request, Response
+
+
+class RequestRecord(NamedTuple):
+    """
+    The attributes of an http request that are relevant for the extraction.
+    In contrast to a playwright request, a record is not tied to a browser (i.e. remains valid after the page was
+    closed), is considerably smaller and can be pickled (e.g. to send it to a worker process).
+    """
+
+    url: str
+    method: str
+    resource_type: str
+    headers: dict[str, str]  # lower-cased names
+    started: float  # unix timestamp (seconds) when the request was issued
+
+
+class ResponseRecord(NamedTuple):
+    """The attributes of an http response that are relevant for the extraction, see RequestRecord."""
+
+    url: str
+    status: int
+    headers: dict[str, str]  # lower-cased names, without cookie related headers
+    request: RequestRecord
+    elapsed: float  # seconds between issuing the request and receiving the response headers
+
+
+def record_request(request: Request) -> RequestRecord:
+    """Capture the relevant attributes of a playwright request. Must be called while the page is still open."""
+    return RequestRecord(
+        url=request.url,
+        method=request.method,
+        resource_type=request.resource_type,
+        headers=request.headers,
+        started=time.time(),
+    )
+
+
+def record_response(response: Response, request: Optional[RequestRecord] = None) -> ResponseRecord:
+    """
+    Capture the relevant attributes of a playwright response. Must be called while the page is still open.
+    :param request: The record of the request of the response, if it was already captured.
+    """
+    request = request or record_request(response.request)
+    return ResponseRecord(
+        url=response.url,
+        status=response.status,
+        headers=response.headers,
+        request=request,
+        elapsed=max(time.time() - request.started, 0),
+    )
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import math
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+
+from metalookup.app.models import RenderQueueStatus
+from metalookup.lib.settings import PLAYWRIGHT_MAX_CONCURRENT_RENDERS, PLAYWRIGHT_RENDER_QUEUE_SIZE
+from metalookup.lib.tools import runtime
+
+logger = logging.getLogger(__name__)
+
+
+class RenderScheduler:
+    """
+    Admission control in front of the page renders.
+
+    Only a limited number of renders run concurrently, further renders wait in a bounded queue. If the queue is full,
+    renders are rejected immediately with a 503 (Service Unavailable) and a Retry-After header estimated from the
+    current queue length and the average render time. This way, a burst of requests increases the latency in a
+    predictable way, instead of starting dozens of concurrent renders that then all run into their timeouts.
+    """
+
+    def __init__(
+        self, concurrency: int = PLAYWRIGHT_MAX_CONCURRENT_RENDERS, queue_size: int = PLAYWRIGHT_RENDER_QUEUE_SIZE
+    ):
+        """
+        :param concurrency: How many renders may run concurrently.
+        :param queue_size: How many renders may wait for a free slot.
+        """
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._running = 0
+        self._queued = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._queue_time = 0.0
+        self._render_time = 0.0
+
+    def status(self) -> RenderQueueStatus:
+        return RenderQueueStatus(
+            concurrency=self.concurrency,
+            queue_size=self.queue_size,
+            running=self._running,
+            queued=self._queued,
+            admitted=self._admitted,
+            rejected=self._rejected,
+            average_queue_time=self._queue_time / self._admitted if self._admitted else 0,
+            average_render_time=self._render_time / self._completed if self._completed else 0,
+        )
+
+    def retry_after(self) -> int:
+        """Estimate in how many seconds a slot will be available for a render that would be queued now."""
+        average = self._render_time / self._completed if self._completed else 1
+        return max(1, math.ceil(average * (self._queued + 1) / self.concurrency))
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """
+        Wait for a free render slot and hold it as long as the surrounding with block is executed.
+        Provides the time (seconds) spent waiting in the queue.
+        Raises an HTTPException with status code 503 if the queue is full.
+        """
+        if self._semaphore.locked() and self._queued >= self.queue_size:
+            self._rejected += 1
+            retry_after = self.retry_after()
+            logger.warning(f"Rejecting render: {self._running} running and {self._queued} queued renders.")
+            raise HTTPException(
+                status_code=503,
+                detail=f"Too many concurrent requests. Retry in {retry_after} seconds.",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+        self._queued += 1
+        try:
+            with runtime() as t:
+                await self._semaphore.acquire()
+        finally:
+            self._queued -= 1
+
+        self._admitted += 1
+        self._queue_time += t()
+        self._running += 1
+        try:
+            with runtime() as r:
+                yield t()
+            self._completed += 1
+            self._render_time += r()
+        finally:
+            self._running -= 1
+            self._semaphore.release()
@@ -0,0 +1,133 @@
+import abc
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+from playwright.async_api import Error, Page, Request
+
+from metalookup.lib.settings import (
+    PLAYWRIGHT_SETTLE_IGNORE_AFTER,
+    PLAYWRIGHT_SETTLE_QUIET_PERIOD,
+    PLAYWRIGHT_SETTLE_STRATEGY,
+)
+
+logger = logging.getLogger(__name__)
+
+# The reasons why waiting for a page to settle ended.
+NETWORK_IDLE = "networkidle"  # playwright reported no network connections for 500ms
+QUIESCENT = "quiescent"  # neither DOM mutations nor network activity for the quiet period
+LONG_LIVED = "long-lived"  # as quiescent, but only ignoring long-lived connections
+TIMEOUT = "timeout"  # the hard upper bound was reached
+
+# Resource types that are expected to stay open as long as the page lives and hence never finish.
+_LONG_LIVED_RESOURCE_TYPES = frozenset({"websocket", "eventsource"})
+
+# Records the time of the latest DOM mutation in every document of the page.
+_MUTATION_OBSERVER = """
+window.__metalookupLastMutation = Date.now();
+new MutationObserver(() => { window.__metalookupLastMutation = Date.now(); }).observe(
+    document, {subtree: true, childList: true, attributes: true, characterData: true}
+);
+"""
+_SINCE_LAST_MUTATION = "() => Date.now() - (window.__metalookupLastMutation || 0)"
+
+Settled = Callable[[float], Awaitable[str]]
+"""Wait (at most given milliseconds) until the page is settled and return the reason why the wait ended."""
+
+
+class SettleStrategy(abc.ABC):
+    """Decides when a loaded page is stable enough to extract the DOM, requests and cookies."""
+
+    @abc.abstractmethod
+    async def watch(self, page: Page) -> Settled:
+        """
+        Start observing given page. Must be called before the navigation, such that all requests are observed.
+        Returns the function to await the settlement.
+        """
+
+
+class NetworkIdle(SettleStrategy):
+    """
+    Wait until there are no network connections for at least 500ms.
+    Pages with analytics beacons, long polling or websockets never reach this state, for them a TimeoutError is raised.
+    """
+
+    async def watch(self, page: Page) -> Settled:
+        async def settled(timeout: float) -> str:
+            await page.wait_for_load_state("networkidle", timeout=timeout)
+            return NETWORK_IDLE
+
+        return settled
+
+
+class Adaptive(SettleStrategy):
+    """
+    Consider a page as settled once neither its DOM was mutated nor a request was started or finished for a quiet
+    period. Connections that are expected to stay open (websockets, event sources) or that are already open for a long
+    time (long polling, hanging beacons) are ignored. Instead of raising an error, the wait ends once the timeout is
+    reached, i.e. such pages are extracted in whatever state they are in by then.
+    """
+
+    def __init__(
+        self,
+        quiet_period: float = PLAYWRIGHT_SETTLE_QUIET_PERIOD,
+        ignore_after: float = PLAYWRIGHT_SETTLE_IGNORE_AFTER,
+        poll_interval: float = 0.1,
+    ):
+        """
+        :param quiet_period: For how many seconds the page must be quiet.
+        :param ignore_after: After how many seconds an open request is no longer considered as pending.
+        :param poll_interval: How often (seconds) the page is checked.
+        """
+        self.quiet_period = quiet_period
+        self.ignore_after = ignore_after
+        self.poll_interval = poll_interval
+
+    async def watch(self, page: Page) -> Settled:
+        pending: dict[Request, float] = {}
+        last_activity = time.monotonic()
+
+        def on_request(request: Request):
+            nonlocal last_activity
+            if request.resource_type not in _LONG_LIVED_RESOURCE_TYPES:
+                pending[request] = last_activity = time.monotonic()
+
+        def on_finished(request: Request):
+            nonlocal last_activity
+            if pending.pop(request, None) is not None:
+                last_activity = time.monotonic()
+
+        page.on("request", on_request)
+        page.on("requestfinished", on_finished)
+        page.on("requestfailed", on_finished)
+        await page.add_init_script(script=_MUTATION_OBSERVER)
+
+        async def since_last_mutation() -> float:
+            try:
+                return await page.evaluate(_SINCE_LAST_MUTATION) / 1000
+            except Error:
+                # e.g. the execution context was destroyed by a navigation, i.e. the page is not settled.
+                return 0
+
+        async def settled(timeout: float) -> str:
+            deadline = time.monotonic() + timeout / 1000
+            while True:
+                now = time.monotonic()
+                if now - last_activity >= self.quiet_period:
+                    ignored = [r for r, start in pending.items() if now - start >= self.ignore_after]
+                    if len(ignored) == len(pending) and await since_last_mutation() >= self.quiet_period:
+                        return LONG_LIVED if ignored else QUIESCENT
+                if now >= deadline:
+                    logger.info(f"Page did not settle within {timeout / 1000:5.2f}s: {len(pending)} pending requests.")
+                    return TIMEOUT
+                await asyncio.sleep(min(self.poll_interval, max(deadline - now, 0)))
+
+        return settled
+
+
+def create_settle_strategy(name: str = PLAYWRIGHT_SETTLE_STRATEGY) -> SettleStrategy:
+    strategies = {"networkidle": NetworkIdle, "adaptive": Adaptive}
+    if name not in strategies:
+        raise ValueError(f"Unknown settle strategy {name}. Expected one of {', '.join(strategies)}.")
+    return strategies[name]()
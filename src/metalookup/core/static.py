@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import time
+from http.cookies import SimpleCookie
+from typing import NamedTuple, Optional
+from urllib.parse import urlparse
+
+import re2
+from aiohttp import ClientError, ClientResponse, ClientSession, ClientTimeout, DummyCookieJar
+from playwright.async_api import Cookie
+
+from metalookup.app.models import StaticFetchStatus
+from metalookup.core.records import RequestRecord, ResponseRecord
+from metalookup.core.text import visible_text
+from metalookup.lib.settings import CONTENT_MAX_HTML_SIZE, CONTENT_STATIC_MIN_TEXT_LENGTH, PLAYWRIGHT_PAGE_LOAD_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/104.0 Safari/537.36"
+
+# The heuristics run on the event loop for the whole document, hence re2 guarantees linear time, even for adversarial
+# input (e.g. many unclosed elements).
+# Mount points of client side rendering frameworks that are (almost) empty in the served html.
+_EMPTY_MOUNT_POINT = re2.compile(
+    r"(?i)<div\s[^>]*id=[\"'](?:root|app|__next|__nuxt|___gatsby)[\"'][^>]*>\s*</div>"
+    r"|<main\s[^>]*id=[\"'](?:root|app|__next|__nuxt|___gatsby)[\"'][^>]*>\s*</main>"
+    r"|<app-root[^>]*>\s*</app-root>"
+)
+_NOSCRIPT = re2.compile(r"(?is)<noscript[^>]*>(.*?)</noscript\s*>")
+_NOSCRIPT_HINT = re2.compile(
+    r"javascript.{0,40}(enable|aktivier|erforderlich|required|benötigt)|enable.{0,20}javascript"
+)
+
+
+class Snapshot(NamedTuple):
+    """The result of fetching a document with a plain http request."""
+
+    response: ResponseRecord
+    html: str
+    cookies: list[Cookie]
+
+
+def needs_rendering(html: str) -> Optional[str]:
+    """
+    Decide whether given html is likely rendered client side, i.e. whether a browser would produce considerably
+    different content. Returns the reason if so and None otherwise.
+    """
+    if _EMPTY_MOUNT_POINT.search(html):
+        return "empty framework mount point"
+    for noscript in _NOSCRIPT.findall(html):
+        if _NOSCRIPT_HINT.search(noscript.lower()):
+            return "noscript hint"
+    if len(visible_text(html)) < CONTENT_STATIC_MIN_TEXT_LENGTH and "<script" in html.lower():
+        return "empty body"
+    return None
+
+
+def _headers(response: ClientResponse) -> dict[str, str]:
+    """
+    Lower case and merge the headers like playwright does for Response.headers.
+    As with playwright, the cookie related headers are omitted.
+    """
+    headers: dict[str, str] = {}
+    for name, value in response.headers.items():
+        name = name.lower()
+        if name != "set-cookie":
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+    return headers
+
+
+def _cookies(responses: list[ClientResponse]) -> list[Cookie]:
+    """Convert the cookies set by the responses (including the redirects) into the format used by playwright."""
+    cookies: dict[tuple[str, str, str], Cookie] = {}
+    for response in responses:
+        for header in response.headers.getall("set-cookie", []):
+            parsed = SimpleCookie()
+            try:
+                parsed.load(header)
+            except Exception:
+                logger.debug(f"Ignoring invalid cookie {header}")
+                continue
+            for name, morsel in parsed.items():
+                domain = morsel["domain"] or urlparse(str(response.url)).hostname
+                path = morsel["path"] or "/"
+                cookies[(name, domain, path)] = Cookie(
+                    name=name,
+                    value=morsel.value,
+                    domain=domain,
+                    path=path,
+                    expires=-1,
+                    httpOnly=bool(morsel["httponly"]),
+                    secure=bool(morsel["secure"]),
+                    sameSite=(morsel["samesite"] or "Lax").capitalize(),
+                )
+    return list(cookies.values())
+
+
+class StaticFetcher:
+    """
+    Fetch documents with a plain http request instead of rendering them with the browser.
+
+    Many (educational) pages are rendered server side, i.e. a browser would not add much to the served html. For those,
+    the static fetch is orders of magnitudes cheaper than a render. The http session is shared, but cookies are never
+    stored, such that the cookies of different fetches stay isolated.
+    """
+
+    def __init__(self, timeout: float = PLAYWRIGHT_PAGE_LOAD_TIMEOUT, max_size: int = CONTENT_MAX_HTML_SIZE):
+        """
+        :param timeout: The timeout (seconds) of a single fetch.
+        :param max_size: How many bytes of the document are read at most. One more byte is read, such that the
+            Content notices (and flags) the truncation.
+        """
+        self.timeout = timeout
+        self.max_size = max_size
+        self._session: Optional[ClientSession] = None
+        self._fetched = 0
+        self._served = 0
+        self._escalated = 0
+        self._failed = 0
+
+    def status(self) -> StaticFetchStatus:
+        return StaticFetchStatus(
+            fetched=self._fetched,
+            served=self._served,
+            escalated=self._escalated,
+            failed=self._failed,
+            hit_rate=self._served / self._fetched if self._fetched else 0,
+        )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _text(self, response: ClientResponse) -> str:
+        """Read and decode the body, but only up to the size limit instead of reading a huge document as a whole."""
+        chunks, size = [], 0
+        while size <= self.max_size and (chunk := await response.content.read(self.max_size + 1 - size)):
+            chunks.append(chunk)
+            size += len(chunk)
+        return b"".join(chunks).decode(response.charset or "utf-8", errors="replace")
+
+    async def fetch(self, url: str) -> Optional[Snapshot]:
+        """
+        Fetch the document. Returns None if the document could not be fetched or needs to be rendered by a browser.
+        """
+        if self._session is None:
+            self._session = ClientSession(
+                cookie_jar=DummyCookieJar(),
+                timeout=ClientTimeout(total=self.timeout),
+                headers={"User-Agent": _USER_AGENT},
+            )
+
+        self._fetched += 1
+        started = time.time()
+        try:
+            async with self._session.get(url) as response:
+                elapsed = time.time() - started
+                if response.status != 200:
+                    # e.g. bot protection, a browser often gets the actual page
+                    self._escalated += 1
+                    logger.info(f"Static fetch of {url} returned status {response.status}: Falling back to rendering.")
+                    return None
+                content_type = response.headers.get("content-type", "text/html").lower()
+                html = await self._text(response) if "text/html" in content_type else ""
+        except (ClientError, asyncio.TimeoutError, UnicodeDecodeError, LookupError) as e:
+            self._failed += 1
+            logger.info(f"Static fetch of {url} failed ({e!r}): Falling back to rendering.")
+            return None
+
+        if reason := needs_rendering(html):
+            self._escalated += 1
+            logger.info(f"Static fetch of {url} needs rendering: {reason}.")
+            return None
+
+        self._served += 1
+        request = RequestRecord(
+            url=str(response.url),
+            method="GET",
+            resource_type="document",
+            headers={name.lower(): value for name, value in response.request_info.headers.items()},
+            started=started,
+        )
+        return Snapshot(
+            response=ResponseRecord(
+                url=str(response.url),
+                status=response.status,
+                headers=_headers(response),
+                request=request,
+                elapsed=elapsed,
+            ),
+            html=html,
+            cookies=_cookies([*response.history, response]),
+        )
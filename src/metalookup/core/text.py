@@ -0,0 +1,40 @@
+import re
+
+# Comments and elements whose content is not visible text, by their (lower-cased) opener.
+_OPENER = re.compile(r"<(?:script|style|noscript|template|head)\b", re.IGNORECASE)
+_CLOSERS = {
+    f"<{name}": re.compile(rf"</{name}\s*>", re.IGNORECASE)
+    for name in ("script", "style", "noscript", "template", "head")
+}
+_COMMENT_OPENER = re.compile(r"<!--")
+_COMMENT_CLOSERS = {"<!--": re.compile(r"-->")}
+_TAG = re.compile(r"<[^>]*>")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _remove(html: str, opener: re.Pattern, closers: dict[str, re.Pattern]) -> str:
+    """
+    Replace everything from an opener up to (and including) its closer with a space. Openers without closer are kept.
+    Linear in the size of the html, as a closer that does not exist is searched only once, instead of once per opener.
+    """
+    parts, position, start, unclosed = [], 0, 0, set()
+    while (match := opener.search(html, start)) is not None:
+        key = match.group().lower()
+        closer = None if key in unclosed else closers[key].search(html, match.end())
+        if closer is None:
+            unclosed.add(key)
+            start = match.end()
+            continue
+        parts.append(html[position : match.start()])
+        position = start = closer.end()
+    parts.append(html[position:])
+    return " ".join(parts)
+
+
+def visible_text(html: str) -> str:
+    """Strip the tags and all elements that are not displayed (e.g. scripts and styles) from given html."""
+    html = _remove(_remove(html, _COMMENT_OPENER, _COMMENT_CLOSERS), _OPENER, _CLOSERS)
+    # No tag starts after the last ">", skipping that part keeps unclosed "<" from being scanned up to the end each.
+    end = html.rfind(">") + 1
+    html = _TAG.sub(" ", html[:end]) + html[end:]
+    return _WHITESPACE.sub(" ", html).strip()
@@ -35,6 +35,8 @@ class AccessibilityScores(BaseModel):
 
 class Accessibility(Extractor[AccessibilityScores]):
     key = _ACCESSIBILITY
+    # lighthouse loads the page on its own
+    requires_live_page = True
 
     def __init__(self, lighthouse_timeout: int = LIGHTHOUSE_TIMEOUT, lighthouse_url: str = LIGHTHOUSE_URL):
         """
@@ -1,16 +1,12 @@
-import asyncio
 import logging
 from concurrent.futures import Executor
 from logging import Logger
 from typing import Optional
-from unittest import mock
-
-import adblockparser
 
 from metalookup.app.models import Explanation, StarCase
 from metalookup.core.content import Content
 from metalookup.core.extractor import Extractor, download_tag_lists
-from metalookup.lib.tools import runtime
+from metalookup.lib.adblock import AdblockLists, preprocess
 
 _FOUND_LIST_MATCHES = "Found list matches"
 _FOUND_NO_LIST_MATCHES = "Found no list matches"
@@ -18,17 +14,21 @@ _FOUND_NO_LIST_MATCHES = "Found no list matches"
 
 class AdBlockBasedExtractor(Extractor[set[str]]):
     """
-    Base class for features to be extracted with `adblockparser` package.
+    Base class for features to be extracted with ad-block rules (see AdblockEngine).
+
+    The lists of all ad-block based extractors are combined into one engine (see AdblockLists), such that the links
+    of a page are tested once (in one executor call) for all extractors. Extractors that apply their rules to something
+    else than the links of the page (e.g. cookies) use their own engine, see shared.
 
     The returned extra data corresponds to a sample of the blocked links.
     The sample size can be configured with the limit member variable.
-
-     FIXME: eventually we may want to abandon usage of the adblockparser package all-together and transition
-            to a more modern alternative (e.g. the adblock package which is a python wrapper for a native
-            rust implementation that would probably speed things up significantly)
     """
 
     urls: list[str] = []  # needs to be provided by derived class
+    # The links inserted by scripts (and the cookies set by scripts, see Cookies) are only found in the rendered page.
+    requires_rendering = True
+    # Whether the list is part of the lists applied to the links of every page (Content.adblock_lists).
+    shared: bool = True
 
     def __init__(self, logger: Optional[Logger] = None):
         self.logger = logger or logging.getLogger(__name__)
@@ -55,7 +55,9 @@ class AdBlockBasedExtractor(Extractor[set[str]]):
             "websocket": True,
             # "domain" key must be populated on use
         }
-        self.rules: AdblockRules = None  # noqa will be initialized in async setup call
+        self.lists: AdblockLists = (
+            Content.adblock_lists if self.shared else AdblockLists(Content.adblock_lists.directory)
+        )
         self.limit: Optional[int] = 2
         """
         Stop after finding a given amount of to be blocked links.
@@ -68,49 +70,29 @@ class AdBlockBasedExtractor(Extractor[set[str]]):
         """Fetch tag lists from configured urls."""
         if len(self.urls) == 0:
             raise RuntimeError("Missing url specification of tag lists")
-        if self.rules is not None:
-            raise RuntimeError("rules must be initialized in async setup call")
-
-        # patch the adblockparser python package to work with googles re2 package.
-        # re2 seems to be significantly faster than the builtin re package.
-        import re
-
-        def _combined_regex(regexes, flags=re.IGNORECASE, use_re2=False, max_mem=None):
-            joined_regexes = "|".join(r for r in regexes if r)
-            if not joined_regexes:
-                return None
-
-            if use_re2:
-                import re2
-
-                options = re2.Options()
-                options.max_mem = max_mem
-                return re2.compile(joined_regexes, options=options)
-
-            return re.compile(joined_regexes, flags=flags)
 
         rules = await download_tag_lists(urls=self.urls, logger=self.logger)
-        with mock.patch("adblockparser.parser._combined_regex", new=_combined_regex):
-            self.rules = adblockparser.AdblockRules(list(rules), skip_unsupported_rules=False, use_re2=True)
+        # only the network rules are compiled, the lists mostly consist of element hiding rules which never block a url
+        rules, stats = preprocess(rules)
+        self.logger.info(f"Preprocessed the ad-block rules of {self.key}: {stats}")
+        self.lists.register(self.key, rules, self.adblock_parser_options, self.limit)
+        if not self.shared:
+            self.lists.build()  # the shared lists are built once all extractors registered theirs, see MetadataManager
 
     def apply_rules(self, domain: str, links: list[str]) -> tuple[float, set[str]]:
         """Return the list of matches and the total computation time taken."""
-        with runtime() as t:
-            options = self.adblock_parser_options.copy()
-            options["domain"] = domain
-            values = set()
-            for url in links:
-                if self.rules.should_block(url=url, options=options):
-                    values.add(url)
-                    if self.limit is not None and len(values) > self.limit:
-                        break
-        return t(), values
+        duration, values = self.lists.apply(domain, links)
+        return duration, values[self.key]
+
+    async def match(self, executor: Executor, domain: str, links: list[str]) -> tuple[float, set[str]]:
+        """Apply the rules in the executor, see AdblockLists.match."""
+        duration, values = await self.lists.match(executor, domain, links)
+        return duration, values[self.key]
 
     async def extract(self, content: Content, executor: Executor) -> tuple[StarCase, Explanation, set[str]]:
-        loop = asyncio.get_running_loop()
-        duration, values = await loop.run_in_executor(
-            executor, self.apply_rules, await content.domain(), await content.raw_links()
-        )
+        # the links are tested once for the lists of all (shared) ad-block based extractors
+        duration, matches = await content.blocked_links()
+        values = matches[self.key]
         self.logger.info(
             f"Found {len(values)} links that should be blocked according to ad-block rules in {duration:5.2}s"
         )
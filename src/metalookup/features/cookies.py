@@ -1,4 +1,3 @@
-import asyncio
 from concurrent.futures import Executor
 
 from playwright.async_api import Cookie
@@ -17,6 +16,8 @@ class Cookies(AdBlockBasedExtractor):
     """
 
     key = "cookies"
+    # the rules are applied to the names of the cookies instead of the links of the page
+    shared = False
 
     urls = [
         "https://raw.githubusercontent.com/easylist/easylist/master/easylist_cookie/easylist_cookie_general_block.txt",
@@ -35,11 +36,9 @@ class Cookies(AdBlockBasedExtractor):
             cookie for cookie in await content.cookies() if cookie["secure"] == "false" or cookie["httpOnly"] == "false"
         ]
 
-        loop = asyncio.get_running_loop()
-
         # validate the detected insecure cookies against the above adblock rules.
-        duration, matches = await loop.run_in_executor(
-            executor, self.apply_rules, await content.domain(), [cookie["name"] for cookie in insecure_cookies]
+        duration, matches = await self.match(
+            executor, await content.domain(), [cookie["name"] for cookie in insecure_cookies]
         )
         self.logger.info(f"Found {len(matches)} potentially malicious cookies in {duration:5.2}s")
 
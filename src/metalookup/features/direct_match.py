@@ -18,14 +18,10 @@ class DirectMatch(Extractor[set[str]]):
             raise ValueError("Cannot use extractor with empty tag list")
 
     async def setup(self):
-        pass
+        Content.keywords.register(self.key, self.tag_list)
 
     async def extract(self, content: Content, executor: Executor) -> tuple[StarCase, Explanation, set[str]]:
-        # fixme: html.lower() might be expensive but we do it multiple times (once for each of the derived classes)
-        # fixme: eventually (if it turns out that below two lines regularly quite CPU heavy) move evaluation to
-        #        executor and await
-        html = (await content.html()).lower()
-        matches = {ele for ele in self.tag_list if ele in html}
+        matches = set((await content.keyword_matches())[self.key])
 
         explanation = _FOUND_LIST_MATCHES if len(matches) > 0 else _FOUND_NO_LIST_MATCHES
         stars = StarCase.ZERO if len(matches) > 0 else StarCase.FIVE
@@ -17,6 +17,7 @@ from PyPDF2.errors import PdfReadError
 from metalookup.app.models import Explanation, StarCase
 from metalookup.core.content import Content
 from metalookup.core.extractor import Extractor
+from metalookup.core.links import Link
 
 RETURN_IMAGES_IN_METADATA = False
 
@@ -205,27 +206,18 @@ class ExtractFromFiles(Extractor[set[str]]):
     @staticmethod
     async def _get_extractable_files(content: Content) -> set[str]:
         """
-        Search through the html and extract all links that end in docx or pdf.
+        Search through the anchors of the html and extract all links that end in docx or pdf.
         Filters out email, phone, javascript, or section links (see https://www.w3schools.com/tags/att_a_href.asp)
 
-        Note: Extracted links will all be absolute, i.e. relative links will be modified to be valid URLs.
+        Note: Extracted links will all be absolute, i.e. relative links are resolved against the url of the page.
         """
-        soup = await content.soup()
-
-        def filter(link: str) -> bool:
-            correct_extension = any(link.endswith(ext) for ext in (".docx", ".pdf"))
-            wrong_kind = any(link.startswith(s) for s in ("#", "javascript", "tel", "mailto"))
-            return correct_extension and not wrong_kind
-
-        def process(link: str) -> str:
-            if link.startswith("http"):
-                return link  # we are good.
-            url = urlparse(content.url)
-            link = link.strip("/")
-            if url.path == "":
-                return f"{url.scheme}://{url.netloc}/{link}"
-            # avoid multiple // in generated link...
-            path = url.path.strip("/")
-            return f"{url.scheme}://{url.netloc}/{path}/{link}"
-
-        return {process(link.get("href")) for link in soup.find_all(name="a", href=filter)}
+        index, table = await content.page_index(), await content.links()
+        anchors = set(index.anchor_hrefs)
+
+        def filter(link: Link) -> bool:
+            correct_extension = link.raw.endswith((".docx", ".pdf"))
+            # email, phone and javascript links have no host, section links point to the page itself
+            wrong_kind = not link.host or link.raw.startswith("#")
+            return correct_extension and not wrong_kind and link.raw in anchors
+
+        return {link.url for link in table if filter(link)}
@@ -1,6 +1,9 @@
+import asyncio
 import re
 from concurrent.futures import Executor
 
+import re2
+
 from metalookup.app.models import Explanation, StarCase
 from metalookup.core.content import Content
 from metalookup.core.extractor import Extractor
@@ -15,28 +18,85 @@ class GDPR(Extractor[set[str]]):
     decision_threshold = 0.3
     _MAX_AGE_REGEX = re.compile(r"max-age=(\d*)")
     _MAX_AGE_REQUIREMENT = 100 * 24 * 60 * 60  # 100 days
+    # re2 guarantees linear time, even for adversarial input (e.g. many unclosed font-face blocks)
+    _FONT_FACE_REGEX = re2.compile(r"@font-face\s*\{([^}]*)\}")
+    _URL_REGEX = re2.compile(r"url\(([^)]*)\)")
+    _INPUT_TYPES = [
+        "input",
+        "button",
+        "checkbox",
+        "color",
+        "date",
+        "datetime-local",
+        "email",
+        "file",
+        "hidden",
+        "image",
+        "month",
+        "number",
+        "password",
+        "radio",
+        "range",
+        "reset",
+        "search",
+        "submit",
+        "tel",
+        "text",
+        "time",
+        "url",
+        "week",
+        "datetime",
+    ]
 
     async def setup(self):
-        pass
+        Content.keywords.register(self.key, self.tag_list)
 
     async def extract(self, content: Content, executor: Executor) -> tuple[StarCase, Explanation, set[str]]:
-        html = (await content.html()).lower()
-        values = [ele for ele in self.tag_list if ele in html]
-
-        for func in [
-            self._check_https_in_url,
-            self._get_hsts,
-            self._get_referrer_policy,
-            self._find_fonts,
-            self._find_input_fields,
-        ]:
-            values += await func(content=content)
-
-        values = set(values)
+        index = await content.page_index()
+        keywords = list((await content.keyword_matches())[self.key])
+        # Only the (small) parts of the page that are relevant for the analysis are sent to the executor.
+        values = await asyncio.get_running_loop().run_in_executor(
+            executor,
+            self.analyze,
+            content.url,
+            await content.headers(),
+            keywords,
+            index.link_rels,
+            index.style_texts,
+            set(index.tag_counts),
+        )
 
         star_case, explanation = self.decide(values=values)
         return star_case, explanation, values
 
+    @classmethod
+    def analyze(
+        cls,
+        url: str,
+        headers: dict[str, str],
+        keywords: list[str],
+        link_rels: list[str],
+        styles: list[str],
+        tags: set[str],
+    ) -> set[str]:
+        """
+        Collect the GDPR relevant properties of a page with a single pass over the precomputed page data.
+        All steps are linear in the size of the page (i.e. there are no regular expressions that may backtrack).
+        :param keywords: The keywords of the tag list that were found in the page.
+        :param link_rels: The rel attributes of the link elements.
+        :param styles: The content of the style elements.
+        :param tags: The names of all elements of the page.
+        """
+        values = [
+            *keywords,
+            *cls._check_https_in_url(url),
+            *cls._get_hsts(headers),
+            *cls._get_referrer_policy(headers, link_rels),
+            *cls._find_fonts(styles),
+            *cls._find_input_fields(tags),
+        ]
+        return set(values)
+
     def decide(self, values: set[str]) -> tuple[StarCase, Explanation]:
         probability = 0.5
 
@@ -69,17 +129,17 @@ class GDPR(Extractor[set[str]]):
         return decision, explanation
 
     @staticmethod
-    async def _check_https_in_url(content: Content) -> list[str]:
-        value = "not" if "https" not in content.url else ""
+    def _check_https_in_url(url: str) -> list[str]:
+        value = "not" if "https" not in url else ""
         return [value + "https_in_url"]
 
-    async def _get_hsts(self, content: Content) -> list:
-        headers = await content.headers()
+    @classmethod
+    def _get_hsts(cls, headers: dict[str, str]) -> list:
         if "strict-transport-security" in headers.keys():
             sts = headers["strict-transport-security"]
             values = ["hsts"]
-            values.extend(self._extract_sts(sts.split(";")))
-            values.extend(self._extract_max_age(sts.split(";")))
+            values.extend(cls._extract_sts(sts.split(";")))
+            values.extend(cls._extract_max_age(sts.split(";")))
         else:
             values = ["no_hsts"]
         return values
@@ -98,75 +158,34 @@ class GDPR(Extractor[set[str]]):
         return [key if key in normalized else f"do_not_{key}" for key in ["includesubdomains", "preload"]]
 
     @staticmethod
-    async def _get_referrer_policy(content: Content) -> list[str]:
-        headers = await content.headers()
-        html = await content.html()
+    def _get_referrer_policy(headers: dict[str, str], link_rels: list[str]) -> list[str]:
         referrer_policy = "referrer-policy"
         if referrer_policy in headers.keys():
             values = [headers[referrer_policy]]
         else:
             values = [f"no_{referrer_policy}"]
 
-        regex = re.compile(r"<link rel=(.*?)href")
-        matches = re.findall(regex, html.lower())
-        if matches:
-            values += [match.replace('"', "").replace(" ", "") for match in matches]
+        if link_rels:
+            values += [rel.lower().replace(" ", "") for rel in link_rels]
         else:
             values += ["no_link_rel"]
         return values
 
-    @staticmethod
-    async def _find_fonts(content: Content) -> list[str]:
-        regex = re.compile(r"@font-face\s*{[\s\w\d\D\n]*?}")
-        matches = re.findall(regex, (await content.html()).lower())
-        url_regex = re.compile(r"url\((.*?)\)")
-
-        found_fonts = []
-        for match in matches:
-            found_fonts += list(re.findall(url_regex, match))
-
-        if found_fonts:
-            found_fonts = "found_fonts," + ",".join(found_fonts)
-        else:
-            found_fonts = "found_no_fonts"
-        return [found_fonts]
-
-    @staticmethod
-    async def _find_input_fields(content: Content) -> list[str]:
-        inputs = []
-        input_types = [
-            "input",
-            "button",
-            "checkbox",
-            "color",
-            "date",
-            "datetime-local",
-            "email",
-            "file",
-            "hidden",
-            "image",
-            "month",
-            "number",
-            "password",
-            "radio",
-            "range",
-            "reset",
-            "search",
-            "submit",
-            "tel",
-            "text",
-            "time",
-            "url",
-            "week",
-            "datetime",
+    @classmethod
+    def _find_fonts(cls, styles: list[str]) -> list[str]:
+        found_fonts = [
+            url
+            for style in styles
+            for font_face in cls._FONT_FACE_REGEX.findall(style.lower())
+            for url in cls._URL_REGEX.findall(font_face)
         ]
-        for input_type in input_types:
-            matches = (await content.soup()).find_all(input_type)
-            if matches:
-                inputs += [input_type]
+        if found_fonts:
+            return ["found_fonts," + ",".join(found_fonts)]
+        return ["found_no_fonts"]
 
+    @classmethod
+    def _find_input_fields(cls, tags: set[str]) -> list[str]:
+        inputs = [input_type for input_type in cls._INPUT_TYPES if input_type in tags]
         if inputs:
-            inputs = "found_inputs," + ",".join(inputs)
-        else:
-            inputs = "found_no_inputs"
-        return [inputs]
+            return ["found_inputs," + ",".join(inputs)]
+        return ["found_no_inputs"]
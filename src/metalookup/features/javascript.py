@@ -19,20 +19,16 @@ class Javascript(Extractor[set[str]]):
         pass
 
     async def extract(self, content: Content, executor: Executor) -> tuple[StarCase, Explanation, set[str]]:
-        matches = set()
-        for script in (await content.soup()).select("script"):
-            # fixme: as stated in the documentation (acceptance.md) we only consider script blocks with a
-            #        `src` attribute as "javascript". However, the script could also be embedded (instead of loaded from
-            #        somewhere). E.g.:
-            #           <body>
-            #           <p id="demo">Hi.</p>
-            #           <script>
-            #           document.getElementById("demo").innerHTML = "Hello World!";
-            #           </script>
-            #           </body>
-            attributes = script.attrs
-            if "src" in attributes.keys():
-                matches.add(attributes["src"])
+        # fixme: as stated in the documentation (acceptance.md) we only consider script blocks with a
+        #        `src` attribute as "javascript". However, the script could also be embedded (instead of loaded from
+        #        somewhere). E.g.:
+        #           <body>
+        #           <p id="demo">Hi.</p>
+        #           <script>
+        #           document.getElementById("demo").innerHTML = "Hello World!";
+        #           </script>
+        #           </body>
+        matches = set((await content.page_index()).script_sources)
 
         found_matches = len(matches) > 0
         explanation = _FOUND_NON_EMBEDDED_JAVASCRIPT if found_matches else _FOUND_NO_NON_EMBEDDED_JAVASCRIPT
@@ -1,4 +1,3 @@
-import asyncio
 from concurrent.futures import Executor
 from enum import Enum, auto
 from typing import Optional
@@ -114,13 +113,15 @@ class LicenceExtractor(Extractor[DetectedLicences]):
         """Defines the set of patterns that are taken as a match for given licence"""
 
     async def setup(self):
-        pass  # nothing to do but setup method required by interface
+        synonyms = [synonym for licence in Licence for synonym in self.synonyms[licence]]
+        Content.keywords.register(self.key, synonyms, case_sensitive=True)
 
-    def result(self, html: str) -> DetectedLicences:
+    def result(self, matches: dict[str, int]) -> DetectedLicences:
         """
-        Use regex parsing to check if any of the licence names show up in the html content.
+        Sum up the occurrences of the licence names in the html content.
+        :param matches: The number of occurrences per synonym, see KeywordMatcher.
         """
-        counts = {licence: sum(html.count(synonym) for synonym in self.synonyms[licence]) for licence in Licence}
+        counts = {licence: sum(matches.get(synonym, 0) for synonym in self.synonyms[licence]) for licence in Licence}
 
         # with the above code we double count some occurrences (e.g. "CC BY-SA" will be counted as CC-BY and CC-BY-SA)
         # hence, we here subtract all these double counts:
@@ -143,8 +144,7 @@ class LicenceExtractor(Extractor[DetectedLicences]):
         )
 
     async def extract(self, content: Content, executor: Executor) -> tuple[StarCase, Explanation, DetectedLicences]:
-        loop = asyncio.get_running_loop()
-        result = await loop.run_in_executor(executor, self.result, await content.html())
+        result = self.result((await content.keyword_matches())[self.key])
         if result.guess is None:
             return StarCase.ZERO, "Found insufficient matches of any licence strings in content", result
         return (
@@ -1,6 +1,4 @@
-import os
 from concurrent.futures import Executor
-from urllib.parse import urlparse
 
 from metalookup.app.models import Explanation, StarCase
 from metalookup.core.content import Content
@@ -206,13 +204,7 @@ class MaliciousExtensions(Extractor[set[str]]):
         pass
 
     async def extract(self, content: Content, executor: Executor) -> tuple[StarCase, Explanation, set[str]]:
-        def extract_extensions(raw_links: list[str]) -> set[str]:
-            def suffix(link: str):
-                return os.path.splitext(urlparse(link)[2])[-1]
-
-            return {suffix(link) for link in raw_links} - {""}
-
-        extensions = extract_extensions(raw_links=await content.raw_links())
+        extensions = set((await content.links()).suffix) - {""}
         malicious = {extension for extension in extensions if extension in self.malicious_extensions}
 
         if len(malicious) > 0:
@@ -0,0 +1,570 @@
+import asyncio
+import functools
+import hashlib
+import importlib.metadata
+import logging
+import mmap
+import os
+import pickle
+import re
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Collection, Iterable, Mapping, NamedTuple, Optional, Union
+
+import re2
+from adblockparser import AdblockRule
+from adblockparser.parser import _domain_variants
+
+from metalookup.lib.tools import runtime
+
+# The characters of a token, i.e. of the (maximal) runs of characters both urls and patterns are split into.
+_TOKEN = re.compile(r"[A-Za-z0-9%]+")
+# Patterns consisting only of these characters are converted to a regular expression that matches the literal
+# characters (besides the wildcards "*" and "^"), i.e. every matched url contains the bounded tokens of the pattern.
+_TOKENIZABLE = re.compile(r"[A-Za-z0-9%*^/.\-_=?&:;,~!@+'\"<>#\[\](){}\\ ]*")
+_SUPPORTED_OPTIONS = frozenset(AdblockRule.BINARY_OPTIONS + ["domain"])
+# The separators of element hiding (##, #@#) and extended element hiding or snippet rules (e.g. #?#, #$#, #@$#).
+_COSMETIC = re.compile(r"#@?[?$]?#")
+
+logger = logging.getLogger(__name__)
+
+
+class RuleStats(NamedTuple):
+    """How many of the rules of a list fall into which class, see preprocess."""
+
+    total: int
+    # Empty lines, comments and the header of the list.
+    comments: int
+    # Element hiding rules, which hide elements of a page but never block a url.
+    cosmetic: int
+    # Network rules with options the AdblockEngine does not support (e.g. "$rewrite=..." or "$csp=...").
+    unsupported: int
+    # Rules that cannot be parsed, or have neither a pattern nor options.
+    invalid: int
+    # Network rules that equal another rule of the list up to surrounding whitespace and the order of their options.
+    duplicates: int
+    # The blocking and exception rules that are kept, i.e. that affect which urls are blocked.
+    network: int
+    exceptions: int
+
+
+def preprocess(rules: Iterable[str]) -> tuple[list[str], RuleStats]:
+    """
+    Classify the rules of a list and keep only the rules that affect which urls are blocked, i.e. the (supported)
+    network rules. Ad-block lists often consist mostly of comments and element hiding rules, which need not be parsed,
+    compiled or kept in memory for url matching.
+    :return: The (normalized) network rules and the statistics of the list.
+    """
+    counts = dict.fromkeys(RuleStats._fields, 0)
+    kept: dict[str, None] = {}  # ordered, unlike a set
+    for text in rules:
+        counts["total"] += 1
+        text = text.strip()
+        if not text or text.startswith(("!", "[Adblock")):
+            counts["comments"] += 1
+            continue
+        if _COSMETIC.search(text):
+            counts["cosmetic"] += 1
+            continue
+        # Parsed like by AdblockRule, but without converting the pattern to a regular expression (done by the engine).
+        exception = text.startswith("@@")
+        pattern, _, options = text[2 if exception else 0 :].partition("$")
+        options = AdblockRule._split_options(options) if options else []
+        if not _SUPPORTED_OPTIONS.issuperset("domain" if o.startswith("domain=") else o.lstrip("~") for o in options):
+            counts["unsupported"] += 1
+            continue
+        if pattern == "/" or not (pattern or options):
+            counts["invalid"] += 1
+            continue
+        if options:
+            text = f"{'@@' if exception else ''}{pattern}${','.join(sorted(options))}"
+        if text in kept:
+            counts["duplicates"] += 1
+            continue
+        kept[text] = None
+        counts["exceptions" if exception else "network"] += 1
+    return list(kept), RuleStats(**counts)
+
+
+class Filter:
+    """A network filter, i.e. a rule that decides whether a url is blocked (or excepted from being blocked)."""
+
+    __slots__ = ("rule", "lists", "regex", "flags", "requirements", "domains", "_compiled")
+
+    def __init__(self, rule: AdblockRule, lists: int):
+        self.rule = rule.raw_rule_text
+        # The lists the rule appears in, one bit per list (see AdblockEngine.keys).
+        self.lists = lists
+        self.regex: str = rule.regex
+        # adblockparser matches the rules without options with (the combined regex of) re2, where \w is ascii only.
+        self.flags = 0 if rule.options else re.ASCII
+        # The values the (binary) options must have for the filter to apply, e.g. (("third-party", False),).
+        self.requirements: tuple[tuple[str, bool], ...] = tuple(
+            sorted((name, value) for name, value in rule.options.items() if name not in ("domain", "match-case"))
+        )
+        # The domains (of the page) the filter applies to (True) or does not apply to (False), None for all domains.
+        self.domains: Optional[dict[str, bool]] = rule.options.get("domain")
+        self._compiled: Optional[re.Pattern] = None
+
+    def applies_to(self, domain: Optional[str]) -> bool:
+        """Whether the filter applies to pages of given domain (like AdblockRule._domain_matches)."""
+        if self.domains is None:
+            return True
+        if domain is None:
+            return False
+        for variant in _domain_variants(domain):
+            if variant in self.domains:
+                return self.domains[variant]
+        return not any(self.domains.values())
+
+    def matches(self, url: str) -> bool:
+        if self._compiled is None:  # compiled on first use, as most filters are never a candidate
+            self._compiled = _compile(self.regex, self.flags)
+        return self._compiled.search(url) is not None
+
+    def __getstate__(self):
+        # the compiled expression is dropped, it is cheaper to compile (on demand) than to pickle
+        return self.rule, self.lists, self.regex, self.flags, self.requirements, self.domains
+
+    def __setstate__(self, state):
+        self.rule, self.lists, self.regex, self.flags, self.requirements, self.domains = state
+        self._compiled = None
+
+    def __repr__(self):
+        return f"Filter({self.rule!r})"
+
+
+class _Combined:
+    """The combined expression of filters (of the same lists), which matches a url if any of the filters does."""
+
+    __slots__ = ("lists", "expression", "flags", "_compiled")
+
+    def __init__(self, filters: list[Filter]):
+        self.lists = filters[0].lists
+        self.expression = "|".join(f"(?:{f.regex})" for f in filters)
+        self.flags = filters[0].flags
+        self._compiled = None
+
+    def matches(self, url: str) -> bool:
+        if self._compiled is None:
+            self._compiled = _compile(self.expression, self.flags)
+        return self._compiled.search(url) is not None
+
+    def __getstate__(self):
+        return self.lists, self.expression, self.flags
+
+    def __setstate__(self, state):
+        self.lists, self.expression, self.flags = state
+        self._compiled = None
+
+
+def _compile(expression: str, flags: int):
+    if flags == re.ASCII:
+        # like adblockparser, which matches the filters without options with re2 (where \w is ascii only)
+        try:
+            return re2.compile(expression)
+        except re2.error:
+            pass
+    return re.compile(expression, flags)
+
+
+def tokens(pattern: str) -> list[str]:
+    """
+    The (lower-cased) tokens of the pattern of a rule that every url matched by the rule contains as a whole token,
+    i.e. that are neither adjacent to a wildcard nor at an unanchored start or end of the pattern.
+    Patterns that are regular expressions (or contain unusual characters) have no tokens.
+    """
+    start = 2 if pattern.startswith("||") else 1 if pattern.startswith("|") else 0
+    end = len(pattern) - 1 if pattern.endswith("|") and len(pattern) > start else len(pattern)
+    body = pattern[start:end]
+    if (pattern.startswith("/") and pattern.endswith("/")) or not _TOKENIZABLE.fullmatch(body):
+        return []
+    result = []
+    for match in _TOKEN.finditer(body):
+        before = body[match.start() - 1] if match.start() > 0 else None
+        after = body[match.end()] if match.end() < len(body) else None
+        if before == "*" or (before is None and start == 0):
+            continue
+        if after == "*" or (after is None and end == len(pattern)):
+            continue
+        result.append(match.group().lower())
+    return result
+
+
+class _TokenIndex:
+    """The filters (with the same option requirements) indexed by one of their tokens."""
+
+    def __init__(self):
+        self.filters: dict[str, list[Filter]] = defaultdict(list)
+        # filters without any token, i.e. that are a candidate for every url
+        self.untokenized: list[Filter] = []
+        # the untokenized filters that apply to all domains, combined into one expression per flags and lists
+        self.combined: list[_Combined] = []
+
+    def add(self, filter: Filter, token: Optional[str]):
+        if token is None:
+            self.untokenized.append(filter)
+        else:
+            self.filters[token].append(filter)
+
+    def combine(self):
+        """Combine the untokenized filters that apply to all domains, such that each url is searched only once."""
+        by_flags: dict[tuple[int, int], list[Filter]] = defaultdict(list)
+        for f in self.untokenized:
+            if f.domains is None:
+                by_flags[(f.flags, f.lists)].append(f)
+        self.combined = [_Combined(filters) for filters in by_flags.values()]
+        self.untokenized = [f for f in self.untokenized if f.domains is not None]
+        self.filters = dict(self.filters)
+
+    def candidates(self, url_tokens: Iterable[str]) -> Iterable[Filter]:
+        yield from self.untokenized
+        for token in url_tokens:
+            yield from self.filters.get(token, ())
+
+
+class _FilterList:
+    """
+    The filters of one kind (blocking or exception filters), split into:
+     - The filters that only apply to some domains (of the page), indexed by domain.
+     - All other filters, grouped by the values their options require and indexed by their rarest token.
+    """
+
+    def __init__(self, filters: list[tuple[Filter, list[str]]]):
+        """:param filters: The filters and their tokens."""
+        self.domains: dict[str, list[Filter]] = defaultdict(list)
+        self.groups: dict[tuple[tuple[str, bool], ...], _TokenIndex] = defaultdict(_TokenIndex)
+
+        frequency: dict[str, int] = defaultdict(int)
+        for _, values in filters:
+            for token in set(values):
+                frequency[token] += 1
+
+        for f, values in filters:
+            if f.domains is not None and any(f.domains.values()):
+                for domain, required in f.domains.items():
+                    if required:
+                        self.domains[domain].append(f)
+                continue
+            # the rarest token (the longest among equally rare ones) yields the fewest candidates per url
+            token = min(values, key=lambda t: (frequency[t], -len(t))) if values else None
+            self.groups[f.requirements].add(f, token)
+        for index in self.groups.values():
+            index.combine()
+        self.domains = dict(self.domains)
+        self.groups = dict(self.groups)
+
+    def matches(self, url: str, url_tokens: set[str], options: dict[str, bool], lists: int) -> int:
+        """
+        The lists (among given lists, one bit per list) with a filter matching the url. Filters of lists that already
+        matched are skipped, i.e. the search stops as soon as all given lists matched.
+        """
+        domain = options.get("domain")  # None if not given, i.e. no filter with domain option applies
+        found = 0
+        for requirements, index in self.groups.items():
+            if any(options.get(name) != value for name, value in requirements):
+                continue  # e.g. a filter for third party requests while matching a first party request
+            for f in index.combined:
+                if f.lists & lists & ~found and f.matches(url):
+                    found |= f.lists & lists
+                    if found == lists:
+                        return found
+            for f in index.candidates(url_tokens):
+                if f.lists & lists & ~found and f.applies_to(domain) and f.matches(url):
+                    found |= f.lists & lists
+                    if found == lists:
+                        return found
+        if "domain" in options:
+            seen = set()
+            for variant in _domain_variants(domain):
+                for f in self.domains.get(variant, ()):
+                    if id(f) in seen or not f.lists & lists & ~found:
+                        continue
+                    seen.add(id(f))
+                    if all(options.get(name) == value for name, value in f.requirements):
+                        if f.applies_to(domain) and f.matches(url):
+                            found |= f.lists & lists
+                            if found == lists:
+                                return found
+        return found
+
+
+class AdblockEngine:
+    """
+    Decides whether urls should be blocked according to ad-block rules (e.g. easylist), with the same results as
+    adblockparser.AdblockRules (with all options supported), but without testing every url against every rule.
+
+    Like in modern ad-blockers, each network filter is indexed by the rarest of its tokens, i.e. of the alphanumeric
+    runs of its pattern that every matching url contains as a whole (e.g. "banner" for "/banner/*/img^"). A url is
+    then only tested against the filters indexed by one of its own tokens. The few filters without any token (e.g.
+    regular expressions) are combined into a single expression, like adblockparser does for all filters without options.
+    Filters that only apply to some domains are indexed by domain, filters that require option values (e.g.
+    "$~third-party") are grouped by the required values, such that whole groups are skipped for non-matching options.
+
+    Element hiding rules, comments and rules with unsupported options are ignored, as by adblockparser. Filters with
+    options are only applied if the options are given, i.e. like AdblockRules with skip_unsupported_rules=True.
+
+    The engine may hold multiple (named) lists, e.g. of different extractors. Rules that appear in several lists are
+    indexed once, tagged with all their lists. The lists are still independent, i.e. an exception rule only excepts
+    urls from the blocking rules of its own lists.
+    """
+
+    def __init__(self, rules: Union[Iterable[str], Mapping[str, Iterable[str]]]):
+        """:param rules: The rules of a single list, or the rules of multiple lists by name."""
+        if not isinstance(rules, Mapping):
+            rules = {"": rules}
+        # The bit of each list, see Filter.lists.
+        self.keys: dict[str, int] = {key: 1 << i for i, key in enumerate(rules)}
+        lists: dict[str, int] = defaultdict(int)
+        for key, values in rules.items():
+            for text in values:
+                lists[text] |= self.keys[key]
+
+        blocking, exceptions = [], []
+        for text, bits in lists.items():
+            rule = AdblockRule(text)
+            if rule.is_comment or rule.is_html_rule or not (rule.regex or rule.options):
+                continue
+            if not _SUPPORTED_OPTIONS.issuperset(rule.options):
+                continue
+            (exceptions if rule.is_exception else blocking).append((Filter(rule, bits), tokens(rule.rule_text)))
+        self.blocking = _FilterList(blocking)
+        self.exceptions = _FilterList(exceptions)
+        self.size = len(blocking) + len(exceptions)
+
+    def should_block(self, url: str, options: Optional[dict[str, bool]] = None) -> bool:
+        """Whether the url should be blocked according to (any of) the lists."""
+        return self._blocked(url, options or {}, (1 << len(self.keys)) - 1) != 0
+
+    def blocked_by(self, url: str, options: Optional[dict[str, bool]] = None, keys: Collection[str] = None) -> set[str]:
+        """The names of the lists (among given ones, all if None) according to which the url should be blocked."""
+        wanted = sum(self.keys[key] for key in keys) if keys is not None else (1 << len(self.keys)) - 1
+        blocked = self._blocked(url, options or {}, wanted)
+        return {key for key, bit in self.keys.items() if blocked & bit}
+
+    def _blocked(self, url: str, options: dict[str, bool], lists: int) -> int:
+        if not lists:
+            return 0
+        url_tokens = {token.lower() for token in _TOKEN.findall(url)}
+        lists &= ~self.exceptions.matches(url, url_tokens, options, lists)
+        return self.blocking.matches(url, url_tokens, options, lists) if lists else 0
+
+
+# The version of the AdblockEngine (and of its pickled form), part of the key of the stored engines. To be increased with
+# every change of the engine that changes its results or its attributes, such that previously stored engines are ignored.
+ENGINE_VERSION = 1
+# The first bytes of every stored engine, followed by the pickled engine.
+_MAGIC = b"metalookup-adblock-engine-%d\n" % ENGINE_VERSION
+
+# The current engine (and its version) of every AdblockLists, keyed by the name of the lists. Populated (once per
+# engine) in every process applying the rules, such that the engines need not be sent along with every call. A new
+# version replaces the previous engine of the same lists, i.e. rebuilt lists do not leave their old engines behind.
+_ENGINES: dict[str, tuple[str, AdblockEngine]] = {}
+
+
+class _MissingEngine(Exception):
+    """The rule engine is not (yet) known to the process, i.e. it must be sent along with the call."""
+
+
+def _version(lists: Mapping[str, Iterable[str]]) -> str:
+    """The key of the engine of given lists, which changes with the rules of the lists and the engine version."""
+    digest = hashlib.sha256(_MAGIC + importlib.metadata.version("adblockparser").encode())
+    for key in sorted(lists):
+        digest.update(f"\0{key}\0".encode())
+        digest.update("\n".join(sorted(lists[key])).encode())
+    return digest.hexdigest()
+
+
+def _load(path: Union[str, Path]) -> AdblockEngine:
+    """
+    Load a stored engine. The file is memory mapped, i.e. read via the page cache (shared by all processes loading
+    the engine) instead of copied into a buffer of each process first.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if data[: len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{path} is no ad-block engine of version {ENGINE_VERSION}")
+        with memoryview(data) as view:
+            return pickle.loads(view[len(_MAGIC) :])
+
+
+def _apply_rules(
+    name: str,
+    version: str,
+    options: dict[str, bool],
+    limits: dict[str, Optional[int]],
+    domain: str,
+    links: list[str],
+    third_party: Optional[list[bool]] = None,
+    engine: Union[bytes, str, None] = None,
+) -> tuple[float, dict[str, set[str]]]:
+    """
+    Return the links that should be blocked according to each list (at most its limit + 1) and the computation time.
+    :param name: The name of the lists, i.e. the key of their engine in the registry of the process.
+    :param version: The version of the engine, older engines of the lists are replaced.
+    :param limits: The lists to apply and the number of blocked links after which to stop applying the list.
+    :param third_party: Whether each link is a third party link, None to use the third-party option for all links.
+    :param engine: The pickled rule engine (or the path of the stored engine), if the process may not know it yet.
+    """
+    known, rules = _ENGINES.get(name, (None, None))
+    if known != version:
+        if engine is None:
+            raise _MissingEngine(version)
+        rules = _load(engine) if isinstance(engine, str) else pickle.loads(engine)
+        _ENGINES[name] = version, rules
+    with runtime() as t:
+        options = {**options, "domain": domain}
+        # the options of first and third party links, built once instead of once per link
+        by_party = {party: {**options, "third-party": party} for party in (False, True)}
+        values: dict[str, set[str]] = {key: set() for key in limits}
+        # the lists that did not yet reach their limit, i.e. are still applied
+        pending = set(limits)
+        for i, url in enumerate(links):
+            if not pending:
+                break
+            link_options = options if third_party is None else by_party[third_party[i]]
+            for key in rules.blocked_by(url=url, options=link_options, keys=pending):
+                values[key].add(url)
+                if limits[key] is not None and len(values[key]) > limits[key]:
+                    pending.discard(key)
+    return t(), values
+
+
+class AdblockLists:
+    """
+    The ad-block lists of multiple extractors combined into a single AdblockEngine, such that every link of a page is
+    tested once for all lists, in a single executor call, instead of once per list. The lists are registered by the
+    extractors during their setup (like the keywords of the KeywordMatcher).
+
+    The engine is built (and pickled) once. Only the domain and the links are sent to the worker processes of the
+    executor, as the workers keep the engine once they received it. Only if a worker does not know the engine yet, the
+    call is repeated with the (pre-pickled) engine.
+
+    If a directory is given, the built engines are stored there, keyed by the rules of the lists and the engine version
+    (see ENGINE_VERSION). Later builds of the same lists (e.g. after a restart of the service) load the stored engine
+    instead of compiling the rules again, and the worker processes load it from the directory instead of receiving it.
+    Once the current engine is stored (or loaded), the engines of previous rules of the same lists are removed.
+    """
+
+    def __init__(self, directory: Union[str, Path, None] = None):
+        """:param directory: Where the built engines are stored, None to not store them."""
+        self.directory = Path(directory) if directory is not None else None
+        # Identifies the engine of these lists in the registry of the worker processes.
+        self.name = uuid.uuid4().hex
+        # The options (besides the domain of the page) all lists are applied with.
+        self.options: dict[str, bool] = {}
+        self.lists: dict[str, set[str]] = {}
+        self.limits: dict[str, Optional[int]] = {}
+        self.engine: Optional[AdblockEngine] = None
+        # What is sent to worker processes that do not know the engine yet: The pickled or the stored engine.
+        self._engine: Union[bytes, str, None] = None
+        self._version: Optional[str] = None
+
+    def register(self, key: str, rules: Iterable[str], options: dict[str, bool], limit: Optional[int] = None):
+        """
+        Add (or replace) a list. The engine is rebuilt on next use.
+        :param options: The options (besides the domain of the page) the rules are applied with, the same for all lists.
+        :param limit: Stop applying the list after given number of blocked links (None to test all links).
+        """
+        if any(other != key for other in self.lists) and options != self.options:
+            raise ValueError(f"The list {key} is applied with other options than the registered lists")
+        self.options = options
+        self.lists[key] = set(rules)
+        self.limits[key] = limit
+        self.engine = None
+
+    def _prefix(self) -> str:
+        """Identifies the engines of these lists (by their keys) among those of other lists stored in the directory."""
+        return hashlib.sha256("\0".join(sorted(self.lists)).encode()).hexdigest()[:16]
+
+    def _path(self, version: str) -> Optional[Path]:
+        return self.directory / f"{self._prefix()}-{version}.engine" if self.directory is not None else None
+
+    def _remove_stale(self, path: Path):
+        """Remove the previous engines of these lists (and engines stored without prefix), but not given one."""
+        prefix = f"{self._prefix()}-"
+        for p in self.directory.glob("*.engine"):
+            if p == path or ("-" in p.name and not p.name.startswith(prefix)):
+                continue
+            try:
+                p.unlink(missing_ok=True)
+                logger.info(f"Removed the stale ad-block engine {p}")
+            except OSError:
+                logger.exception(f"Failed to remove the stale ad-block engine {p}")
+
+    def build(self) -> AdblockEngine:
+        """
+        Build the engine (if the lists changed), e.g. right after the setup instead of on first use. The engine is
+        loaded instead, if it was stored before.
+        """
+        if self.engine is not None:
+            return self.engine
+        version, path = _version(self.lists), None
+        if self.directory is not None and (path := self._path(version)).exists():
+            try:
+                with runtime() as t:
+                    self.engine = _load(path)
+                _ENGINES[self.name] = version, self.engine
+                self._engine, self._version = str(path), version
+                logger.info(f"Loaded the ad-block engine of {len(self.lists)} lists from {path} in {t():.2f}s")
+                self._remove_stale(path)
+                return self.engine
+            except Exception:  # e.g. a truncated file, the engine is built (and stored) again
+                logger.exception(f"Failed to load the ad-block engine from {path}")
+
+        with runtime() as t:
+            engine = AdblockEngine(self.lists)
+            data = pickle.dumps(engine)
+        self.engine = engine
+        _ENGINES[self.name] = version, engine
+        self._engine, self._version = data, version
+        duplicates = sum(len(rules) for rules in self.lists.values()) - len(set().union(*self.lists.values()))
+        logger.info(
+            f"Built the ad-block engine of {len(self.lists)} lists with {engine.size} rules ({duplicates} duplicates "
+            f"across the lists, {len(data) / 2**20:.1f}MiB pickled) in {t():.2f}s"
+        )
+        if path is not None:
+            try:
+                self._store(path, data)
+                self._engine = str(path)  # the workers load the stored engine, hence the pickle need not be kept
+            except OSError:
+                logger.exception(f"Failed to store the ad-block engine in {path}")
+            else:
+                self._remove_stale(path)
+        return self.engine
+
+    def _store(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f".{path.name}.{os.getpid()}.{time.monotonic_ns()}")
+        with open(temporary, "wb") as f:
+            f.write(_MAGIC)
+            f.write(data)
+        os.replace(temporary, path)  # atomic, i.e. concurrent builds never load a partial engine
+        logger.info(f"Stored the ad-block engine in {path}")
+
+    def apply(
+        self, domain: str, links: list[str], third_party: Optional[list[bool]] = None
+    ) -> tuple[float, dict[str, set[str]]]:
+        """
+        Return the blocked links of each list and the total computation time taken, computed in this process.
+        :param third_party: Whether each link is a third party link (see LinkTable), None to apply the third-party
+                            option of the lists to all links.
+        """
+        self.build()
+        return _apply_rules(self.name, self._version, self.options, self.limits, domain, links, third_party)
+
+    async def match(
+        self, executor: Optional[Executor], domain: str, links: list[str], third_party: Optional[list[bool]] = None
+    ) -> tuple[float, dict[str, set[str]]]:
+        """Like apply, but computed in given executor."""
+        self.build()
+        loop = asyncio.get_running_loop()
+        call = functools.partial(
+            _apply_rules, self.name, self._version, self.options, self.limits, domain, links, third_party
+        )
+        try:
+            return await loop.run_in_executor(executor, call)
+        except _MissingEngine:
+            return await loop.run_in_executor(executor, functools.partial(call, engine=self._engine))
@@ -0,0 +1,131 @@
+import functools
+import re
+from collections import defaultdict
+from typing import Iterable, NamedTuple, Optional
+
+import re2
+
+Matches = dict[str, dict[str, int]]
+"""The number of occurrences per group and pattern. Patterns without occurrences are omitted."""
+
+
+class _Variant(NamedTuple):
+    pattern: str  # lower-cased, unless case sensitive
+    case_sensitive: bool
+
+    @property
+    def bytes(self) -> bytes:
+        return self.pattern.encode()
+
+
+def _trie_regex(words: Iterable[str]) -> str:
+    """
+    Combine the words into a single regular expression that branches character by character (like a trie) instead of
+    trying every word at every position. As the optional suffixes are greedy, the longest word is matched.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}  # marks the end of a word
+
+    def build(node: dict) -> str:
+        alternatives = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char != ""]
+        if not alternatives:
+            return ""
+        expression = alternatives[0] if len(alternatives) == 1 else f"(?:{'|'.join(alternatives)})"
+        return f"(?:{expression})?" if "" in node else expression
+
+    return build(trie)
+
+
+@functools.lru_cache(maxsize=16)
+def _compile(expression: bytes) -> re2._Regexp:
+    """Compiled expressions cannot be pickled, hence they are compiled (once) in every process using the matcher."""
+    return re2.compile(expression)
+
+
+class KeywordMatcher:
+    """
+    Count the occurrences of the keywords of multiple groups (e.g. one group per extractor) with a single scan of a
+    document, instead of scanning the document once per keyword.
+
+    The counts are the same as if every pattern was counted on its own with str.count (on the lower-cased document for
+    case insensitive patterns), i.e. occurrences of different patterns may overlap, but occurrences of the same pattern
+    do not. Groups are registered once (e.g. in the setup of the extractors), afterwards the combined expression is
+    compiled (lazily) on first use.
+
+    The lower-cased document is scanned (as utf-8 bytes) with re2, case sensitive patterns are verified against the
+    original document at the position of the match.
+    """
+
+    def __init__(self):
+        self._groups: dict[str, tuple[list[str], bool]] = {}
+        self._expression: Optional[bytes] = None
+        # All variants whose (lower-cased) pattern is a prefix of given (lower-cased) pattern
+        self._prefixes: dict[str, list[_Variant]] = {}
+        # The groups (and the pattern as registered) a variant belongs to
+        self._owners: dict[_Variant, list[tuple[str, str]]] = {}
+
+    def register(self, group: str, patterns: Iterable[str], case_sensitive: bool = False):
+        """
+        Add (or replace) a group of patterns.
+        :param group: The name of the group, e.g. the key of the extractor.
+        :param patterns: The patterns whose occurrences are counted.
+        :param case_sensitive: If False, the patterns match independent of the case.
+        """
+        self._groups[group] = (list(patterns), case_sensitive)
+        self._expression = None
+
+    def _compile(self):
+        owners: dict[_Variant, list[tuple[str, str]]] = defaultdict(list)
+        for group, (patterns, case_sensitive) in self._groups.items():
+            for pattern in patterns:
+                variant = _Variant(pattern if case_sensitive else pattern.lower(), case_sensitive)
+                owners[variant].append((group, variant.pattern))
+        keys = {variant.pattern.lower() for variant in owners if variant.pattern}
+        self._owners = dict(owners)
+        self._prefixes = {key: [v for v in owners if v.pattern and key.startswith(v.pattern.lower())] for key in keys}
+        self._expression = _trie_regex(keys).encode()
+
+    def match(self, text: str, lower: Optional[str] = None) -> Matches:
+        """
+        Count the occurrences of all patterns in given text.
+        :param lower: The lower-cased text, if already available.
+        """
+        if self._expression is None:
+            self._compile()
+        lower = (text.lower() if lower is None else lower).encode()
+        # Case sensitive patterns can only be verified at the same position, if lower-casing did not change the length.
+        original = text.encode() if any(v.case_sensitive for v in self._owners) else lower
+        aligned = len(original) == len(lower)
+
+        counts: dict[_Variant, int] = defaultdict(int)
+        if self._expression:
+            regex = _compile(self._expression)
+            # where the last counted occurrence of every variant ends, such that occurrences do not overlap
+            ends: dict[_Variant, int] = {}
+            match = regex.search(lower)
+            while match is not None:
+                position = match.start()
+                for variant in self._prefixes.get(match.group().decode(), ()):
+                    if variant.case_sensitive and not (aligned and original.startswith(variant.bytes, position)):
+                        continue
+                    if position < ends.get(variant, 0):
+                        continue
+                    ends[variant] = position + len(variant.bytes)
+                    counts[variant] += 1
+                # Continue right after the start of the match, as other patterns may start within the match.
+                match = regex.search(lower, position + 1)
+
+        if not aligned:
+            for variant in self._owners:
+                if variant.case_sensitive and (count := text.count(variant.pattern)):
+                    counts[variant] = count
+
+        matches: Matches = {group: {} for group in self._groups}
+        for variant, count in counts.items():
+            for group, pattern in self._owners[variant]:
+                matches[group][pattern] = count
+        return matches
@@ -18,16 +18,81 @@ ENABLE_CACHE = os.environ.get("ENABLE_CACHE", "True") == "True"
 CACHE_DATABASE_URL = os.environ.get("CACHE_DATABASE_URL", None)  # should never be used when ENABLE_CACHE is False.
 ENABLE_CACHE_CONTROL_ENDPOINTS = os.environ.get("ENABLE_CACHE_CONTROL_ENDPOINTS", "True") == "True"
 CACHE_WARMUP_CONCURRENCY = int(os.environ.get("CACHE_WARMUP_CONCURRENCY", 6))
+# Whether the captured pages are stored on disk, such that they can be extracted again later without rendering.
+SNAPSHOT_STORE = os.environ.get("SNAPSHOT_STORE", "False") == "True"
+SNAPSHOT_STORE_DIRECTORY = os.environ.get("SNAPSHOT_STORE_DIRECTORY", "snapshots/")
 
 # Playwright
+# May be a comma separated list of endpoints (i.e. playwright containers) between which the renders are balanced.
 PLAYWRIGHT_WS_ENDPOINT = os.environ.get("PLAYWRIGHT_WS_ENDPOINT", "ws://playwright:3000")
+PLAYWRIGHT_WS_ENDPOINTS = [e.strip() for e in PLAYWRIGHT_WS_ENDPOINT.split(",") if e.strip()]
+# After how many consecutive connection failures an endpoint is taken out of rotation.
+PLAYWRIGHT_ENDPOINT_MAX_FAILURES = int(os.environ.get("PLAYWRIGHT_ENDPOINT_MAX_FAILURES", 3))
+# After how many seconds an endpoint that was taken out of rotation is probed again.
+PLAYWRIGHT_ENDPOINT_PROBE_INTERVAL = int(os.environ.get("PLAYWRIGHT_ENDPOINT_PROBE_INTERVAL", 30))
 PLAYWRIGHT_PAGE_LOAD_TIMEOUT = int(os.environ.get("PLAYWRIGHT_PAGE_LOAD_TIMEOUT", 15))
+# How many browser contexts are kept open (and hence at most used concurrently) per playwright container.
+PLAYWRIGHT_CONTEXT_POOL_SIZE = int(os.environ.get("PLAYWRIGHT_CONTEXT_POOL_SIZE", 8))
+# After how many fetches a browser context is closed and replaced by a fresh one.
+PLAYWRIGHT_CONTEXT_MAX_REUSE = int(os.environ.get("PLAYWRIGHT_CONTEXT_MAX_REUSE", 50))
+# After how many seconds an unused browser context is closed.
+PLAYWRIGHT_CONTEXT_IDLE_TIMEOUT = int(os.environ.get("PLAYWRIGHT_CONTEXT_IDLE_TIMEOUT", 300))
+# How many pages are rendered concurrently (over all playwright containers). Further renders are queued.
+PLAYWRIGHT_MAX_CONCURRENT_RENDERS = int(
+    os.environ.get("PLAYWRIGHT_MAX_CONCURRENT_RENDERS", PLAYWRIGHT_CONTEXT_POOL_SIZE * len(PLAYWRIGHT_WS_ENDPOINTS))
+)
+# How many renders may wait for a free slot, before requests are rejected with a 503 (Service Unavailable).
+PLAYWRIGHT_RENDER_QUEUE_SIZE = int(os.environ.get("PLAYWRIGHT_RENDER_QUEUE_SIZE", 32))
+# Whether cacheable sub resources (e.g. scripts and fonts from CDNs) are cached on disk and shared between renders.
+PLAYWRIGHT_ASSET_CACHE = os.environ.get("PLAYWRIGHT_ASSET_CACHE", "False") == "True"
+PLAYWRIGHT_ASSET_CACHE_DIRECTORY = os.environ.get("PLAYWRIGHT_ASSET_CACHE_DIRECTORY", "asset_cache/")
+# The maximum size (bytes) of all cached sub resources and of a single sub resource.
+PLAYWRIGHT_ASSET_CACHE_MAX_SIZE = int(os.environ.get("PLAYWRIGHT_ASSET_CACHE_MAX_SIZE", 512 * 2**20))
+PLAYWRIGHT_ASSET_CACHE_MAX_ENTRY_SIZE = int(os.environ.get("PLAYWRIGHT_ASSET_CACHE_MAX_ENTRY_SIZE", 5 * 2**20))
+# How to decide whether a loaded page is stable enough for the extraction:
+#  - "networkidle": Wait until there is no network traffic for 500ms. Fails if this is not reached within the timeout.
+#  - "adaptive": Wait until neither the DOM nor the network (but long-lived connections) changed for a quiet period.
+#                Continues with the current state of the page if this is not reached within the timeout.
+PLAYWRIGHT_SETTLE_STRATEGY = os.environ.get("PLAYWRIGHT_SETTLE_STRATEGY", "networkidle")
+# For how many seconds the page must be quiet to be considered as settled by the adaptive strategy.
+PLAYWRIGHT_SETTLE_QUIET_PERIOD = float(os.environ.get("PLAYWRIGHT_SETTLE_QUIET_PERIOD", 0.5))
+# After how many seconds an open request (e.g. long polling) is ignored by the adaptive strategy.
+PLAYWRIGHT_SETTLE_IGNORE_AFTER = float(os.environ.get("PLAYWRIGHT_SETTLE_IGNORE_AFTER", 3))
+# Whether heavy sub resources are downloaded during rendering ("off"), or whether their requests are recorded and then
+# aborted ("abort") or answered with an empty response ("stub").
+PLAYWRIGHT_INTERCEPT_MODE = os.environ.get("PLAYWRIGHT_INTERCEPT_MODE", "off")
+# Comma separated list of the playwright resource types which are intercepted.
+PLAYWRIGHT_INTERCEPT_RESOURCE_TYPES = [
+    t.strip() for t in os.environ.get("PLAYWRIGHT_INTERCEPT_RESOURCE_TYPES", "image,media,font,stylesheet").split(",")
+]
+
+# Content
+# Whether every document is rendered by the browser ("browser"), or first fetched with a plain http request ("static")
+# and only rendered if it looks like a client side rendered page (or an extractor requires the rendered page).
+CONTENT_FETCH_MODE = os.environ.get("CONTENT_FETCH_MODE", "browser")
+# Statically fetched documents with less visible text (but scripts) are considered as client side rendered.
+CONTENT_STATIC_MIN_TEXT_LENGTH = int(os.environ.get("CONTENT_STATIC_MIN_TEXT_LENGTH", 100))
+# How the documents are parsed to build the index used by the extractors (see metalookup.core.parser):
+#  - "lxml": A plain lxml tree, fast and reasonably small.
+#  - "streaming": An incremental lxml parser that never holds the whole tree, the smallest memory footprint.
+#  - "soup": A BeautifulSoup tree, the slowest and largest.
+CONTENT_PARSER = os.environ.get("CONTENT_PARSER", "lxml")
+# Limits of the resources spent on a single (pathologically large) page. Beyond them, the content is truncated (the
+# first bytes of the html, the first elements of the document, the first network requests and responses are kept) and
+# the result is flagged as degraded.
+CONTENT_MAX_HTML_SIZE = int(os.environ.get("CONTENT_MAX_HTML_SIZE", 8 * 2**20))  # bytes (utf-8)
+CONTENT_MAX_ELEMENTS = int(os.environ.get("CONTENT_MAX_ELEMENTS", 100_000))
+CONTENT_MAX_NETWORK_RECORDS = int(os.environ.get("CONTENT_MAX_NETWORK_RECORDS", 2_000))
 
 # Extractors
 # Online lists
 USE_LOCAL_IF_POSSIBLE = True
 # timeout in seconds for download of each of the addblock rule lists
 ADBLOCK_DOWNLOAD_TIMEOUT = int(os.environ.get("ADBLOCK_DOWNLOAD_TIMEOUT", 300))
+# Whether the compiled ad-block rule engines are stored (keyed by their rules and the engine version) and loaded at
+# startup instead of compiled again, e.g. as built ahead of time with meta-lookup-build-adblock.
+ADBLOCK_ENGINE_CACHE = os.environ.get("ADBLOCK_ENGINE_CACHE", "False") == "True"
+ADBLOCK_ENGINE_CACHE_DIRECTORY = os.environ.get("ADBLOCK_ENGINE_CACHE_DIRECTORY", "adblock_engines/")
 
 # Lighthouse
 LIGHTHOUSE_URL = os.environ.get("LIGHTHOUSE_URL", "http://lighthouse:5058")
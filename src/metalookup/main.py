@@ -7,5 +7,22 @@ def main():
     uvicorn.run("metalookup.app.api:app", host="0.0.0.0", port=API_PORT, log_level=LOG_LEVEL)
 
 
+def build_adblock():
+    """
+    Build (and store) the ad-block rule engines ahead of time, e.g. while building the docker image, such that the
+    service loads them at startup instead of compiling the rules. Requires ADBLOCK_ENGINE_CACHE to be enabled.
+    """
+    import asyncio
+    import logging
+
+    from metalookup.core.metadata_manager import build_adblock_engines
+    from metalookup.lib.settings import ADBLOCK_ENGINE_CACHE
+
+    logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    if not ADBLOCK_ENGINE_CACHE:
+        raise SystemExit("The ad-block engine cache is disabled, set ADBLOCK_ENGINE_CACHE=True to store the engines.")
+    asyncio.run(build_adblock_engines())
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,81 @@
+"""
+Compare the inter process communication of the ad-block based extractors with a (spawned) process pool like the one of
+the MetadataManager: Sending the bound apply_rules method (i.e. pickling the whole extractor including the rule engine)
+with every call, the previous behaviour, versus keeping the rule engine in the worker processes.
+
+The rule lists are synthetic (but of realistic size), such that the benchmark does not depend on downloads.
+
+```bash
+python -m tests.benchmarks.adblock_ipc_benchmark
+```
+"""
+import asyncio
+import functools
+import multiprocessing
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from metalookup.features.adblock_based import Advertisement
+from metalookup.lib.adblock import AdblockEngine, _apply_rules
+from metalookup.lib.tools import get_mean, get_std_dev, runtime
+from tests.conftest import adblock_rules_mock
+
+_LINKS = [f"https://cdn{i}.some-domain.org/assets/script{i}.js" for i in range(200)]
+
+
+def rules(size: int) -> set[str]:
+    return (
+        {f"||tracker{i}.example{i % 97}.com^$third-party" for i in range(size // 2)}
+        | {f"/banner{i}/*$script,image" for i in range(size // 4)}
+        | {f"##.ad-slot-{i}" for i in range(size // 4)}
+    )
+
+
+def apply_rules(engine: AdblockEngine, options: dict[str, bool], domain: str, links: list[str]) -> set[str]:
+    """The previous apply_rules, which was called as bound method, i.e. with the pickled extractor (and engine)."""
+    options = {**options, "domain": domain}
+    return {url for url in links if engine.should_block(url=url, options=options)}
+
+
+def previous(feature: Advertisement) -> tuple[functools.partial, functools.partial]:
+    """The first and every further call."""
+    engine = feature.lists.build()
+    call = functools.partial(apply_rules, engine, feature.adblock_parser_options, "some-domain.org", _LINKS)
+    return call, call
+
+
+def resident(feature: Advertisement) -> tuple[functools.partial, functools.partial]:
+    """The first (sending the engine to the worker) and every further call."""
+    lists = feature.lists
+    lists.build()
+    call = functools.partial(
+        _apply_rules, lists.name, lists._version, lists.options, lists.limits, "some-domain.org", _LINKS
+    )
+    return functools.partial(call, engine=lists._engine), call
+
+
+async def main(n: int):
+    loop = asyncio.get_running_loop()
+    for size in [1_000, 10_000, 50_000]:
+        feature = Advertisement()
+        with adblock_rules_mock(rules=rules(size)):
+            await feature.setup()
+        print(f"{size} rules:")
+        for name, benchmark in [("pickled extractor", previous), ("resident engine", resident)]:
+            first, call = benchmark(feature)
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                await loop.run_in_executor(executor, first)  # warm up, i.e. spawn the worker
+                durations = []
+                for _ in range(n):
+                    with runtime() as t:
+                        await loop.run_in_executor(executor, call)
+                    durations.append(t())
+            print(
+                f"{name:>20}: {get_mean(durations) * 1000:8.1f}ms +- {get_std_dev(durations) * 1000:6.1f}ms, "
+                f"{len(pickle.dumps(call)) / 1024:10.1f}KiB sent per call ({n=})"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(n=int(sys.argv[1]) if len(sys.argv) > 1 else 10))
@@ -0,0 +1,90 @@
+"""
+Compare the url throughput of the previous rule engine of the ad-block based extractors (adblockparser, i.e. one
+combined re2 expression for the rules without options and every rule with options tested one by one) with the token
+indexed AdblockEngine, using the real rule lists of the extractors. Both engines must block the same urls.
+
+The urls are the requests and links of the HAR fixtures of the tests. The rule lists are downloaded (or read from the
+local tag_lists directory, see download_tag_lists).
+
+```bash
+python -m tests.benchmarks.adblock_matching_benchmark
+```
+"""
+import asyncio
+import json
+import logging
+import re
+import sys
+from pathlib import Path
+from unittest import mock
+from urllib.parse import urljoin
+
+import adblockparser
+import lxml.html
+
+from metalookup.core.extractor import download_tag_lists
+from metalookup.core.har import har_records
+from metalookup.features.adblock_based import Advertisement, EasylistGermany, EasyPrivacy
+from metalookup.lib.adblock import AdblockEngine
+from metalookup.lib.tools import get_mean, get_std_dev, runtime
+
+_HAR_DIRECTORY = Path(__file__).parent.parent / "resources" / "har"
+
+
+def urls() -> list[tuple[str, str]]:
+    """The urls and the domains of the pages they were requested or referenced by."""
+    result = []
+    for path in sorted(_HAR_DIRECTORY.glob("*.json")):
+        with open(path, "r") as f:
+            page = json.load(f)
+        domain = re.sub(r"^www\.", "", page["url"].split("/")[2])
+        result.extend((record.request.url, domain) for record in har_records(page["har"]))
+        for _, _, link, _ in lxml.html.fromstring(page["html"]).iterlinks():
+            result.append((urljoin(page["url"], link), domain))
+    return result
+
+
+def previous(rules: set[str]) -> adblockparser.AdblockRules:
+    """The rule engine as previously built in AdBlockBasedExtractor.setup."""
+
+    def _combined_regex(regexes, flags=re.IGNORECASE, use_re2=False, max_mem=None):
+        import re2
+
+        options = re2.Options()
+        options.max_mem = max_mem
+        joined_regexes = "|".join(r for r in regexes if r)
+        return re2.compile(joined_regexes, options=options) if joined_regexes else None
+
+    with mock.patch("adblockparser.parser._combined_regex", new=_combined_regex):
+        return adblockparser.AdblockRules(list(rules), skip_unsupported_rules=False, use_re2=True)
+
+
+async def main(n: int):
+    logger = logging.getLogger(__name__)
+    links = urls()
+    for extractor in [Advertisement, EasyPrivacy, EasylistGermany]:
+        rules = await download_tag_lists(urls=extractor.urls, logger=logger)
+        options = extractor().adblock_parser_options
+        print(f"{extractor.key} ({len(rules)} rules, {len(links)} urls):")
+
+        results = []
+        for name, build in [("adblockparser", previous), ("token index", AdblockEngine)]:
+            with runtime() as t:
+                engine = build(rules)
+            print(f"{name:>20}: built in {t():.2f}s")
+            durations = []
+            for _ in range(n):
+                with runtime() as t:
+                    blocked = [engine.should_block(url, {**options, "domain": domain}) for url, domain in links]
+                durations.append(t())
+            results.append(blocked)
+            mean = get_mean(durations)
+            print(
+                f"{name:>20}: {len(links) / mean:10.0f} urls/s, {mean * 1000:8.1f}ms +- "
+                f"{get_std_dev(durations) * 1000:6.1f}ms per run, {sum(blocked)} blocked ({n=})"
+            )
+        assert results[0] == results[1], "the engines block different urls"
+
+
+if __name__ == "__main__":
+    asyncio.run(main(n=int(sys.argv[1]) if len(sys.argv) > 1 else 10))
@@ -0,0 +1,52 @@
+"""
+Compare the per-fetch overhead of starting a new playwright driver and CDP connection for every fetch (the behaviour
+of Content without a shared session) with a long-lived, shared BrowserSession.
+
+This benchmark requires a running playwright container, e.g.:
+
+```bash
+docker run -p 3000:3000 browserless/chrome
+PLAYWRIGHT_WS_ENDPOINT=ws://localhost:3000 python -m tests.benchmarks.browser_session_benchmark
+```
+"""
+import asyncio
+import sys
+
+from metalookup.core.browser import BrowserSession
+from metalookup.lib.tools import get_mean, get_std_dev, runtime
+
+_HTML = "<html><head><title>benchmark</title></head><body><p>Hello World</p></body></html>"
+
+
+async def fetch(session: BrowserSession) -> float:
+    """Open a page in an isolated context and render a trivial document, i.e. measure only the fetch overhead."""
+    with runtime() as t:
+        async with session.page() as page:
+            await page.set_content(_HTML)
+    return t()
+
+
+async def transient(n: int) -> list[float]:
+    async def single() -> float:
+        with runtime() as t:
+            async with BrowserSession() as session:
+                await fetch(session)
+        return t()
+
+    return [await single() for _ in range(n)]
+
+
+async def shared(n: int) -> list[float]:
+    async with BrowserSession() as session:
+        await fetch(session)  # establish the connection outside the measurement
+        return [await fetch(session) for _ in range(n)]
+
+
+async def main(n: int):
+    for name, benchmark in [("transient driver and connection", transient), ("shared session", shared)]:
+        durations = await benchmark(n)
+        print(f"{name:>35}: {get_mean(durations) * 1000:8.1f}ms +- {get_std_dev(durations) * 1000:6.1f}ms ({n=})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(n=int(sys.argv[1]) if len(sys.argv) > 1 else 20))
@@ -0,0 +1,81 @@
+"""
+Compare the previous regular expression based GDPR analysis of the lower-cased html with the GDPR extractor (i.e.
+GDPR.extract on a Content, including the page index, the keyword matches and the process pool) on adversarial pages,
+i.e. pages that make lazy regular expressions backtrack over the rest of the page: Many unclosed font-face blocks, many
+link elements without a href attribute, as well as many unclosed elements and comments. The time per KiB of the
+extractor should not grow with the size of the page.
+
+```bash
+python -m tests.benchmarks.gdpr_benchmark
+```
+"""
+import asyncio
+import re
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable
+
+from metalookup.features.gdpr import GDPR
+from metalookup.lib.tools import runtime
+from tests.extractors.conftest import mock_content
+
+
+def fonts_and_links(size: int) -> str:
+    fonts = "@font-face { font-family: x; src: url(x.woff); " * size
+    links = "<link rel='preload' as='font'>" * size
+    return f"<html><head><style>{fonts}</style>{links}</head><body></body></html>"
+
+
+def unclosed(opener: str) -> Callable[[int], str]:
+    return lambda size: f"<html><body>{opener * size * 10}</body></html>"
+
+
+_PAGES = {
+    "font-face and links": fonts_and_links,
+    "unclosed <style>": unclosed("<style>"),
+    "unclosed <script>": unclosed("<script>"),
+    "unclosed comments": unclosed("<!--"),
+    "unclosed tags": unclosed("<div class='"),
+}
+
+
+def previous(html: str, _: Executor):
+    html = html.lower()
+    rels = re.findall(re.compile(r"<link rel=(.*?)href"), html)
+    fonts = re.findall(re.compile(r"@font-face\s*{[\s\w\d\D\n]*?}"), html)
+    return len(rels) + len(fonts)
+
+
+async def extract(extractor: GDPR, html: str, executor: Executor):
+    content = mock_content(html=html, url="https://some-domain.org")
+    content.executor = executor
+    return await extractor.extract(content, executor=executor)
+
+
+async def main(limit: float):
+    extractor = GDPR()
+    await extractor.setup()
+    benchmarks = [
+        ("previous regular expressions", {"font-face and links": fonts_and_links}, previous),
+        ("extractor", _PAGES, lambda html, executor: extract(extractor, html, executor)),
+    ]
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        await extract(extractor, "<html></html>", executor)  # warm up, i.e. spawn the workers
+        for name, pages, benchmark in benchmarks:
+            for page, build in pages.items():
+                print(f"{name} ({page}):")
+                for size in [1_000, 2_000, 4_000, 8_000, 16_000, 32_000]:
+                    document = build(size)
+                    with runtime() as t:
+                        result = benchmark(document, executor)
+                        if asyncio.iscoroutine(result):
+                            await result
+                    kib = len(document) / 1024
+                    print(f"{kib:10.0f}KiB: {t() * 1000:10.1f}ms, {t() * 1000 / kib:6.2f}ms/KiB")
+                    if t() > limit:
+                        print(f"{'':>14}(stopping, as a single analysis took more than {limit}s)")
+                        break
+
+
+if __name__ == "__main__":
+    asyncio.run(main(limit=float(sys.argv[1]) if len(sys.argv) > 1 else 30))
@@ -0,0 +1,115 @@
+"""
+Compare render time and transferred bytes with and without the interception of heavy sub resources.
+
+The pages are replayed from the HAR fixtures of the tests: Every request recorded in the HAR is answered from a route
+handler with a body of the recorded size after the recorded duration, i.e. the measurement does not depend on the
+network, but still reflects the relative cost of the sub resources. Requests not contained in the HAR are aborted.
+
+This benchmark requires a running playwright container, e.g.:
+
+```bash
+docker run -p 3000:3000 browserless/chrome
+PLAYWRIGHT_WS_ENDPOINT=ws://localhost:3000 python -m tests.benchmarks.interception_benchmark
+```
+"""
+import asyncio
+import json
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+from playwright.async_api import Route
+
+from metalookup.core.browser import BrowserSession
+from metalookup.core.interception import Interceptor
+from metalookup.lib.settings import PLAYWRIGHT_INTERCEPT_RESOURCE_TYPES
+from metalookup.lib.tools import get_mean, get_std_dev, runtime
+
+_HAR_DIRECTORY = Path(__file__).parent.parent / "resources" / "har"
+
+
+def resource_type(mime_type: str) -> str:
+    """Approximate the playwright resource type from the mime type, as the (splash) HAR files do not contain it."""
+    mime_type = mime_type.lower()
+    if mime_type.startswith("image/"):
+        return "image"
+    if mime_type.startswith("font/") or "font" in mime_type:
+        return "font"
+    if mime_type.startswith(("video/", "audio/")):
+        return "media"
+    if mime_type.startswith("text/css"):
+        return "stylesheet"
+    if "javascript" in mime_type:
+        return "script"
+    return "other"
+
+
+def load(key: str) -> tuple[str, str, dict[str, dict]]:
+    """Load the start url, the rendered html and the recorded responses by url from given HAR fixture."""
+    with open(_HAR_DIRECTORY / f"{key}.json", "r") as f:
+        splash = json.load(f)
+    entries = {
+        entry["request"]["url"]: {
+            "status": entry["response"]["status"],
+            "size": max(entry["response"]["content"].get("size", 0), 0),
+            "mime_type": entry["response"]["content"].get("mimeType", "text/plain"),
+            "time": max(entry.get("time", 0), 0) / 1000,
+        }
+        for entry in splash["har"]["log"]["entries"]
+    }
+    return splash["requestedUrl"], splash["html"], entries
+
+
+def bytes_by_type(entries: dict[str, dict]) -> dict[str, int]:
+    result = defaultdict(int)
+    for entry in entries.values():
+        result[resource_type(entry["mime_type"])] += entry["size"]
+    return result
+
+
+async def render(
+    session: BrowserSession, url: str, html: str, entries: dict[str, dict], mode: str
+) -> tuple[float, int]:
+    """Render the replayed page with given interception mode and return the render time and the replayed bytes."""
+    transferred = 0
+
+    async def replay(route: Route):
+        nonlocal transferred
+        if route.request.url == url:
+            await route.fulfill(status=200, body=html, content_type="text/html")
+            return
+        entry = entries.get(route.request.url)
+        if entry is None:
+            await route.abort()
+            return
+        await asyncio.sleep(entry["time"])
+        transferred += entry["size"]
+        await route.fulfill(status=entry["status"], body=b" " * entry["size"], content_type=entry["mime_type"])
+
+    with runtime() as t:
+        async with session.page() as page:
+            await page.route("**/*", replay)
+            # routes registered later take precedence, i.e. the interceptor runs before the replay handler.
+            await Interceptor(mode=mode, resource_types=PLAYWRIGHT_INTERCEPT_RESOURCE_TYPES).install(page)
+            await page.goto(url, wait_until="networkidle")
+    return t(), transferred
+
+
+async def main(n: int):
+    async with BrowserSession() as session:
+        for path in sorted(_HAR_DIRECTORY.glob("*.json")):
+            url, html, entries = load(path.stem)
+            sizes = bytes_by_type(entries)
+            print(f"{path.stem}: {len(entries)} recorded requests, bytes by type: {dict(sizes)}")
+            for mode in ["off", "abort", "stub"]:
+                results = [await render(session, url, html, entries, mode) for _ in range(n)]
+                durations = [d for d, _ in results]
+                transferred = get_mean([b for _, b in results])
+                print(
+                    f"{mode:>10}: {get_mean(durations) * 1000:8.1f}ms +- {get_std_dev(durations) * 1000:6.1f}ms, "
+                    f"{transferred / 1024:8.1f}KiB replayed ({n=})"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(n=int(sys.argv[1]) if len(sys.argv) > 1 else 10))
@@ -0,0 +1,66 @@
+"""
+Compare the keyword matching of the DirectMatch, GDPR and licence extractors: One scan of the page per keyword (and one
+lower-casing of the page per extractor, the previous behaviour) versus a single scan with the shared KeywordMatcher.
+
+The pages are the html of the HAR fixtures of the tests, repeated to get large pages.
+
+```bash
+python -m tests.benchmarks.keyword_matching_benchmark
+```
+"""
+import json
+import sys
+from pathlib import Path
+
+from metalookup.features.direct_match import DirectMatch, LogInOut, Paywalls, PopUp, RegWall
+from metalookup.features.gdpr import GDPR
+from metalookup.features.licence import LicenceExtractor
+from metalookup.lib.matching import KeywordMatcher
+from metalookup.lib.tools import get_mean, get_std_dev, runtime
+
+_HAR_DIRECTORY = Path(__file__).parent.parent / "resources" / "har"
+
+_DIRECT_MATCHES: list[DirectMatch] = [Paywalls(), PopUp(), RegWall(), LogInOut()]
+_SYNONYMS = [synonym for synonyms in LicenceExtractor().synonyms.values() for synonym in synonyms]
+
+
+def separate(html: str):
+    for extractor in _DIRECT_MATCHES:
+        lower = html.lower()
+        {tag for tag in extractor.tag_list if tag in lower}
+    lower = html.lower()
+    [tag for tag in GDPR.tag_list if tag in lower]
+    {synonym: html.count(synonym) for synonym in _SYNONYMS}
+
+
+def shared(matcher: KeywordMatcher, html: str):
+    # the html is lower-cased once for all extractors
+    matcher.match(html)
+
+
+def main(n: int):
+    matcher = KeywordMatcher()
+    for extractor in _DIRECT_MATCHES:
+        matcher.register(extractor.key, extractor.tag_list)
+    matcher.register(GDPR.key, GDPR.tag_list)
+    matcher.register(LicenceExtractor.key, _SYNONYMS, case_sensitive=True)
+
+    for path in sorted(_HAR_DIRECTORY.glob("*.json")):
+        with open(path, "r") as f:
+            html = json.load(f)["html"]
+        for repetitions in [1, 10, 100]:
+            document = html * repetitions
+            print(f"{path.stem} ({len(document) / 1024:.0f}KiB):")
+            for name, benchmark in [("separate scans", separate), ("shared matcher", lambda h: shared(matcher, h))]:
+                durations = []
+                for _ in range(n):
+                    with runtime() as t:
+                        benchmark(document)
+                    durations.append(t())
+                print(
+                    f"{name:>20}: {get_mean(durations) * 1000:8.1f}ms +- {get_std_dev(durations) * 1000:6.1f}ms ({n=})"
+                )
+
+
+if __name__ == "__main__":
+    main(n=int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,97 @@
+"""
+Compare the time the DOM consuming extractors spend traversing the parsed page: Every extractor walking the tree on its
+own (the previous behaviour) versus reading from a single PageIndex.
+
+The pages are synthetic, with 1k to 100k elements of a realistic mix of tags. The parsing is part of the measurement:
+The separate traversals need a BeautifulSoup tree, whereas the index is built by the configured parser (see
+metalookup.core.parser).
+
+```bash
+python -m tests.benchmarks.page_index_benchmark
+```
+"""
+import random
+import re
+import sys
+
+from bs4 import BeautifulSoup
+
+from metalookup.core.parser import create_parser
+from metalookup.lib.tools import get_mean, get_std_dev, get_unique_list, runtime
+
+# a subset of the input types of the gdpr extractor
+_INPUT_TYPES = ["input", "button", "checkbox", "color", "date", "email", "file", "hidden", "image", "month", "number"]
+_SOURCE_REGEX = re.compile(r"src\=[\"|\']([\w\d\:\/\.\-\?\=]+)[\"|\']")
+_LINK_ATTRIBUTES = ["href", "src", "srcset", "img src", "data-src", "data-srcset"]
+
+
+def page(size: int) -> str:
+    """A synthetic page with (roughly) given number of elements."""
+    random.seed(size)
+    elements = [
+        lambda i: f"<div class='row c{i % 7}'><span>Some text {i}</span></div>",
+        lambda i: f"<p>Paragraph {i} with <b>bold</b> text.</p>",
+        lambda i: f"<a href='/page/{i}.html'>Link {i}</a>",
+        lambda i: f"<a href='/files/document-{i}.pdf'>Document {i}</a>",
+        lambda i: f"<img src='/img/{i}.png' data-src='/img/{i}-lazy.png'>",
+        lambda i: f"<script src='https://cdn{i % 10}.org/lib-{i}.js'></script>",
+        lambda i: f"<input type='text' name='field{i}'>",
+        lambda i: f"<button>Button {i}</button>",
+    ]
+    body = "".join(random.choice(elements)(i) for i in range(size // 2))
+    return f"<html><head><title>benchmark</title></head><body>{body}</body></html>"
+
+
+def separate(html: str) -> int:
+    """The traversals of the extractors without an index (raw links, javascript, files and gdpr input fields)."""
+    soup = BeautifulSoup(html, "lxml")
+    # raw links: once per distinct tag name, with quadratic deduplication of the elements
+    unique_tags = get_unique_list([tag.name for tag in soup.find_all()])
+    unique_tags.remove("script")
+    links = [
+        element.attrs.get(attribute)
+        for tag in unique_tags
+        for element in get_unique_list(soup.find_all(tag))
+        for attribute in _LINK_ATTRIBUTES
+        if element.has_attr(attribute)
+    ]
+    links += [link for element in soup.find_all("script") for link in _SOURCE_REGEX.findall(str(element)) if link]
+    # javascript
+    scripts = {script.attrs["src"] for script in soup.select("script") if "src" in script.attrs}
+    # extractable files
+    files = {a.get("href") for a in soup.find_all(name="a", href=lambda href: href and href.endswith(".pdf"))}
+    # gdpr input fields
+    inputs = [input_type for input_type in _INPUT_TYPES if soup.find_all(input_type)]
+    return len(links) + len(scripts) + len(files) + len(inputs)
+
+
+def indexed(html: str) -> int:
+    """The same views read from a single PageIndex."""
+    index = create_parser().index(html)
+    links = [value for values in index.attributes.values() for value in values] + index.script_links
+    scripts = set(index.script_sources)
+    files = {href for href in index.anchor_hrefs if href.endswith(".pdf")}
+    inputs = [input_type for input_type in _INPUT_TYPES if input_type in index.tag_counts]
+    return len(links) + len(scripts) + len(files) + len(inputs)
+
+
+def main(n: int):
+    for size in [1_000, 10_000, 100_000]:
+        html = page(size)
+        print(f"{size} elements:")
+        for name, benchmark in [("separate traversals", separate), ("page index", indexed)]:
+            # the quadratic deduplication makes the separate traversals of large pages very slow
+            repetitions = 1 if size > 10_000 and benchmark is separate else n
+            durations = []
+            for _ in range(repetitions):
+                with runtime() as t:
+                    benchmark(html)
+                durations.append(t())
+            print(
+                f"{name:>25}: {get_mean(durations) * 1000:10.1f}ms +- {get_std_dev(durations) * 1000:8.1f}ms "
+                f"(n={repetitions})"
+            )
+
+
+if __name__ == "__main__":
+    main(n=int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,54 @@
+"""
+Compare the parse time and peak memory of the parser backends on the html of the HAR fixtures of the tests.
+
+As (most of) the memory of the lxml trees is not allocated by python, the peak memory is measured as the increase of the
+maximum resident set size of a fresh process that parses the document. The time is measured in the same process.
+
+```bash
+python -m tests.benchmarks.parser_benchmark
+```
+"""
+import json
+import resource
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from metalookup.core.parser import create_parser
+from metalookup.lib.tools import get_mean, get_std_dev, runtime
+
+_HAR_DIRECTORY = Path(__file__).parent.parent / "resources" / "har"
+_PARSERS = ["soup", "lxml", "streaming"]
+
+
+def measure(parser: str, html: str, n: int) -> tuple[list[float], int]:
+    """Parse the html n times and return the durations and the peak memory increase (KiB) of the (fresh) process."""
+    backend = create_parser(parser)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    durations = []
+    for _ in range(n):
+        with runtime() as t:
+            backend.index(html)
+        durations.append(t())
+    return durations, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+
+
+def main(n: int):
+    for path in sorted(_HAR_DIRECTORY.glob("*.json")):
+        with open(path, "r") as f:
+            html = json.load(f)["html"]
+        # repeat the document to also see how the backends scale with the size of the document
+        for repetitions in [1, 20]:
+            document = html * repetitions
+            print(f"{path.stem} ({len(document) / 1024:.0f}KiB):")
+            for parser in _PARSERS:
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    durations, memory = executor.submit(measure, parser, document, n).result()
+                print(
+                    f"{parser:>12}: {get_mean(durations) * 1000:8.1f}ms +- {get_std_dev(durations) * 1000:6.1f}ms, "
+                    f"peak memory +{memory / 1024:6.1f}MiB ({n=})"
+                )
+
+
+if __name__ == "__main__":
+    main(n=int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -8,9 +8,9 @@ from unittest import mock
 from unittest.mock import Mock
 
 import pytest
-from playwright.async_api import Request, Response
 
-from metalookup.core.content import Content
+from metalookup.app.models import PageSnapshot
+from metalookup.core.content import Content, Stage
 
 
 @contextlib.contextmanager
@@ -53,43 +53,17 @@ def playwright_mock(key: str = None):
     Mock the communication with playwright by replacing the _fetch call of the Content class.
     This allows running unittests without a dependency on a running playwright container.
 
-    This function loads the data from a HAR file from the test resources and directly assigns
-    to the private variables of the Content class.
+    This function loads the html and the HAR log from the test resources and builds the features of the Content from
+    them, like for a snapshot given by a client (see Content.from_snapshot).
     """
 
-    async def fetch(self: Content):
+    async def fetch(self: Content, stage: Stage = Stage.SETTLED, rendered: bool = False):
         with open(Path(__file__).parent / "resources" / "har" / f"{key}.json", "r") as f:
             splash = json.load(f)
 
-        def convert_headers(headers) -> dict[str, str]:
-            return {h["name"]: h["value"] for h in headers}
-
-        def convert_entry(entry) -> tuple[Request, Response]:
-            request = Mock(
-                # add other fields here on demand.
-                url=entry["request"]["url"],
-                method=entry["response"]["status"],
-                headers=convert_headers(entry["request"]["headers"]),
-            )
-            return (
-                request,
-                Mock(
-                    status=entry["response"]["status"],
-                    text=Mock(side_effect=splash["html"]),
-                    headers=convert_headers(entry["response"]["headers"]),
-                    request=request,
-                ),
-            )
-
-        entries = splash["har"]["log"]["entries"]
-        self._html = splash["html"]
-        if len(entries) > 0:
-            self._headers = convert_headers(entries[-1]["response"]["headers"])
-            # need to convert to string values!
-            self._cookies = [{k: str(v) for k, v in c.dict()} for c in entries[-1]["response"]["cookies"]]
-            _, self._response = convert_entry(entries[-1])
-            self._requests = [convert_entry(entry)[0] for entry in entries]
-            self._responses = [convert_entry(entry)[1] for entry in entries]
+        snapshot = Content.from_snapshot(self.url, PageSnapshot(html=splash["html"], har=splash["har"]))
+        self._html, self._response, self._cookies = snapshot._html, snapshot._response, snapshot._cookies
+        self._requests, self._responses = snapshot._requests, snapshot._responses
 
     with mock.patch("metalookup.core.content.Content._fetch", new=fetch):
         yield
@@ -1,6 +1,13 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
 import pytest
 
-from metalookup.features.adblock_based import Advertisement
+from metalookup.core.content import Content
+from metalookup.features.adblock_based import Advertisement, AntiAdBlock, EasyPrivacy
+from metalookup.lib.adblock import AdblockLists, _apply_rules
 from metalookup.lib.tools import runtime
 from tests.conftest import adblock_rules_mock
 from tests.extractors.conftest import mock_content
@@ -30,3 +37,77 @@ async def test_adblock_based(executor):
         stars, explanation, matches = await feature.extract(content, executor=executor)
     assert t() < 10
     assert matches == expected
+
+
+@pytest.mark.asyncio
+async def test_rule_engine_stays_in_worker():
+    feature = Advertisement()
+    with adblock_rules_mock(rules={"/ads/*$script"}):
+        await feature.setup()
+    links = ["https://some-domain.com/ads/123.json", "https://some-domain.com/index.html"]
+
+    loop = asyncio.get_running_loop()
+    # spawned (instead of forked) workers do not inherit the engines of this process, like the workers of the manager
+    spawn = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool, mock.patch.object(
+        loop, "run_in_executor", wraps=loop.run_in_executor
+    ) as run_in_executor:
+        for _ in range(3):
+            _, matches = await feature.match(pool, "some-domain.com", links)
+            assert matches == {"https://some-domain.com/ads/123.json"}
+    # the engine is only sent along with the first call (the second run_in_executor call), which the worker missed
+    engines = [call.args[1].keywords.get("engine") for call in run_in_executor.call_args_list]
+    assert len(engines) == 4 and engines[0] is None and engines[1] is not None and engines[2:] == [None, None]
+
+
+@pytest.mark.asyncio
+async def test_resolved_links():
+    with mock.patch.object(Content, "adblock_lists", AdblockLists()), adblock_rules_mock(
+        rules={"||cnn.com/ads/", "/pixel.$third-party"}
+    ):
+        feature = Advertisement()
+        feature.limit = None
+        await feature.setup()
+        Content.adblock_lists.build()
+
+        html = "<img src='/ads/1.png'><img src='/pixel.gif'><img src='https://tracker.org/pixel.gif'>"
+        content = mock_content(html=html, url="https://www.cnn.com/index.html")
+        _, _, matches = await feature.extract(content, executor=None)
+
+    # relative links are resolved against the page, the third-party option is derived from the domain of each link
+    assert matches == {"https://www.cnn.com/ads/1.png", "https://tracker.org/pixel.gif"}
+
+
+@pytest.mark.asyncio
+async def test_single_pass_for_all_extractors():
+    lists = {
+        Advertisement.urls[0]: {"/ads/*$script", "||tracker.org^"},
+        EasyPrivacy.urls[0]: {"||tracker.org^", "/pixel."},
+    }
+
+    async def download_tag_lists(urls, logger):
+        return lists.get(urls[0], set())
+
+    with mock.patch.object(Content, "adblock_lists", AdblockLists()), mock.patch(
+        "metalookup.features.adblock_based.download_tag_lists", download_tag_lists
+    ):
+        extractors = [Advertisement(), EasyPrivacy(), AntiAdBlock()]
+        extractors[1].limit = None
+        for extractor in extractors:
+            await extractor.setup()
+        Content.adblock_lists.build()
+
+        links = [f"https://tracker.org/{i}.js" for i in range(5)] + ["https://cdn.org/pixel.gif"]
+        content = mock_content(html="".join(f"<script src='{link}'></script>" for link in links))
+        loop = asyncio.get_running_loop()
+        with mock.patch.object(loop, "run_in_executor", wraps=loop.run_in_executor) as run_in_executor:
+            results = await asyncio.gather(*[extractor.extract(content, executor=None) for extractor in extractors])
+
+    # the links are tested once for all extractors, in a single executor call
+    calls = [getattr(call.args[1], "func", call.args[1]) for call in run_in_executor.call_args_list]
+    assert calls.count(_apply_rules) == 1
+    advertisement, privacy, anti_adblock = [matches for _, _, matches in results]
+    # the limit of each extractor is honoured, i.e. the links are only tested until it is exceeded
+    assert len(advertisement) == 3 and advertisement <= set(links[:5])
+    assert privacy == set(links)
+    assert anti_adblock == set()
@@ -86,8 +86,9 @@ async def test_relative_url_download(executor: Executor):
     )
 
     extractable = await ExtractFromFiles._get_extractable_files(content)
+    # the links are resolved like the browser does, i.e. relative to the directory of the page
     assert extractable == {
-        "https://dummy.wirlernenonline.de/some/path/link1.pdf",
-        "https://dummy.wirlernenonline.de/some/path/foo/bar/link2.pdf",
-        "https://dummy.wirlernenonline.de/some/path/link3.pdf",
+        "https://dummy.wirlernenonline.de/link1.pdf",
+        "https://dummy.wirlernenonline.de/foo/bar/link2.pdf",
+        "https://dummy.wirlernenonline.de/some/link3.pdf",
     }
@@ -12,9 +12,11 @@ async def test_gdpr(executor):
 
     html = """
             <link rel=\"preload\" href=\"/mediathek/podcast/dist/runtime.2e1c836.js\" as=\"script\">
+            <style>
             @font-face {font-family: "Astra";
             src: url(https://canyoublockit.com/wp-content/themes/astra/assets/fonts/astra.svg#astra)
             format("svg");font-weight: normal;font-style: normal;font-display: fallback;}
+            </style>
             <button type='button' class='menu-toggle main-header-menu-toggle  ast-mobile-menu-buttons-fill '
                     aria-controls='primary-menu' aria-expanded='false'>
             <datetime type='datetime'>
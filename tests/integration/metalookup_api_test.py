@@ -2,12 +2,15 @@ import json
 import os
 import pprint
 from pathlib import Path
+from unittest import mock
 
 import pytest
 from httpx import AsyncClient
 
 from metalookup.app.api import Input, app, cache_backend, manager
 from metalookup.app.models import LRMISuggestions, MetadataTags, Output
+from metalookup.core.content import Content
+from metalookup.core.parser import create_parser
 from metalookup.features.licence import DetectedLicences
 from tests.conftest import adblock_rules_mock, lighthouse_mock, playwright_mock
 
@@ -44,6 +47,14 @@ async def test_ping_endpoint(client):
     assert response.json() == {"status": "ok"}
 
 
+@pytest.mark.asyncio
+async def test_status_endpoint(client):
+    response = await client.get("/_status")
+    assert response.status_code == 200
+    assert response.json()["browsers"][0]["pool"]["leased"] == 0
+    assert response.json()["render_queue"]["running"] == 0
+
+
 @pytest.mark.asyncio
 async def test_extract_endpoint(client):
     """
@@ -159,3 +170,14 @@ async def test_extract_endpoint_cache(client):
             assert isinstance(
                 output.accessibility, MetadataTags
             ), "received accessibility result but container should not be running"
+
+
+@pytest.mark.asyncio
+async def test_extract_endpoint_degraded(client):
+    parser = create_parser(max_elements=10)
+    with playwright_mock(key="google.com"), lighthouse_mock(), mock.patch.object(Content, "parser", parser):
+        response = await client.post("/extract", json=Input(url="https://www.google.com/degraded").dict(), timeout=10)
+    assert response.status_code == 200
+    assert "elements" in Output.parse_obj(json.loads(response.text)).degraded
+    # results extracted from a truncated page are not cached
+    assert "no-store" in response.headers.get_list("cache-control")
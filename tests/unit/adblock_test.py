@@ -0,0 +1,253 @@
+import pickle
+import re
+from unittest import mock
+
+import adblockparser
+import pytest
+
+from metalookup.lib.adblock import (
+    _ENGINES,
+    AdblockEngine,
+    AdblockLists,
+    RuleStats,
+    _apply_rules,
+    _MissingEngine,
+    preprocess,
+    tokens,
+)
+
+_RULES = [
+    "! a comment",
+    "[Adblock Plus 2.0]",
+    "##.ad-banner",
+    "example.com##.sidebar-ad",
+    "/banner/*/img^",
+    "/ads/",
+    "-ad-300x250.",
+    "&adtype=",
+    "||ads.example.com^",
+    "||tracker.org^$third-party",
+    "||cdn.net/pixel.gif|",
+    "|https://exact.com/script.js|",
+    "|http://*.adserver.",
+    "swf|",
+    "://ad.$script,~stylesheet",
+    "adframe$subdocument,~third-party",
+    "/promo/*$image,domain=news.com|~sport.news.com",
+    "/sponsored.$domain=~blog.org",
+    "||widgets.com^$domain=shop.de|shop.at",
+    "/^https?:\\/\\/[a-z]+\\.banners?\\.[a-z]+\\//",
+    "/track[0-9]+\\.js/$script",
+    "Tracking.JS",
+    "beacon",
+    "a|b",
+    "$third-party,domain=popups.com",
+    "@@||ads.example.com/allowed/",
+    "@@/ads/whitelisted^$image",
+    "@@||widgets.com^$domain=shop.at",
+    "@@|https://exact.com/script.js|$script",
+    "/ads^$match-case",
+    "||unsupported.com^$rewrite=abp-resource:blank-js",
+]
+
+_URLS = [
+    "https://example.org/banner/123/img/ad.png",
+    "https://example.org/banner/123/imgs/ad.png",
+    "https://example.org/ads/",
+    "https://example.org/ads",
+    "https://example.org/foo-ad-300x250.jpg",
+    "https://example.org/?a=1&adtype=video",
+    "https://ads.example.com/x.js",
+    "https://sub.ads.example.com/x.js",
+    "https://ads.example.com.evil.org/x.js",
+    "https://myads.example.com/x.js",
+    "https://ads.example.com/allowed/x.js",
+    "https://tracker.org/t.js",
+    "http://www.tracker.org/",
+    "https://cdn.net/pixel.gif",
+    "https://cdn.net/pixel.gif?x=1",
+    "https://exact.com/script.js",
+    "https://exact.com/script.jsx",
+    "http://foo.adserver.com/",
+    "https://foo.adserver.com/",
+    "https://example.org/movie.swf",
+    "https://example.org/movie.swf?x",
+    "https://ad.example.org/s.js",
+    "https://example.org/adframe.html",
+    "https://example.org/promo/1.png",
+    "https://example.org/sponsored.js",
+    "https://widgets.com/w.js",
+    "https://x.banner.io/foo",
+    "https://x.banners.io/foo",
+    "https://example.org/track12.js",
+    "https://example.org/Tracking.JS",
+    "https://example.org/tracking.js",
+    "https://example.org/beacons",
+    "https://example.org/a|b",
+    "https://example.org/ab",
+    "https://example.org/ADS/x",
+    "https://example.org/ads/whitelisted/",
+    "https://unsupported.com/x.js",
+    "https://example.org/%20banner/1/img",
+    "https://example.org/bänner/ads^x",
+    "https://example.org/äds/ü",
+    "data:image/png;base64,AAAA",
+    "",
+]
+
+_DOMAINS = ["example.org", "news.com", "sport.news.com", "blog.org", "shop.de", "shop.at", "popups.com"]
+
+_OPTIONS = [
+    {"script": True, "image": False, "stylesheet": False, "subdocument": False, "third-party": True},
+    {"script": False, "image": True, "stylesheet": False, "subdocument": True, "third-party": False},
+    {"script": True, "image": True, "stylesheet": True, "subdocument": True, "third-party": True},
+]
+
+
+def _reference(rules: list[str]) -> adblockparser.AdblockRules:
+    """The rule engine as previously used by the ad-block based extractors (i.e. with re2)."""
+
+    def _combined_regex(regexes, flags=re.IGNORECASE, use_re2=False, max_mem=None):
+        import re2
+
+        joined_regexes = "|".join(r for r in regexes if r)
+        return re2.compile(joined_regexes) if joined_regexes else None
+
+    with mock.patch("adblockparser.parser._combined_regex", new=_combined_regex):
+        return adblockparser.AdblockRules(rules, use_re2=True)
+
+
+@pytest.mark.parametrize("options", _OPTIONS)
+def test_matches_like_adblockparser(options):
+    engine = AdblockEngine(_RULES)
+    reference = _reference(_RULES)
+
+    for domain in _DOMAINS:
+        for url in _URLS:
+            values = {**options, "match-case": True, "domain": domain}
+            assert engine.should_block(url, values) == reference.should_block(url, values), (url, values)
+
+
+def test_missing_options():
+    engine = AdblockEngine(_RULES)
+    reference = _reference(_RULES)
+
+    # rules with options are not applied if the options are not given
+    for url in _URLS:
+        assert engine.should_block(url) == reference.should_block(url), url
+    assert engine.should_block("https://tracker.org/t.js") is False
+    assert engine.should_block("https://ads.example.com/x.js") is True
+
+
+@pytest.mark.parametrize(
+    "pattern,expected",
+    [
+        ("/banner/*/img^", ["banner", "img"]),
+        ("||ads.example.com^", ["ads", "example", "com"]),
+        ("|https://exact.com/script.js|", ["https", "exact", "com", "script", "js"]),
+        ("ads.example", []),  # neither end is bounded
+        ("-ad-300x250.", ["ad", "300x250"]),
+        ("swf|", []),  # the start is not bounded
+        ("/movie.swf|", ["movie", "swf"]),
+        ("/Tracking.JS", ["tracking"]),
+        ("/^https?:\\/\\/banner\\./", []),
+        ("a|b", []),
+        ("", []),
+    ],
+)
+def test_tokens(pattern, expected):
+    assert tokens(pattern) == expected
+
+
+def test_pickle():
+    engine = AdblockEngine(_RULES)
+    assert engine.should_block("https://example.org/ads/")
+    # the compiled expressions are not pickled, but compiled again on demand in the receiving process
+    engine = pickle.loads(pickle.dumps(engine))
+    assert engine.should_block("https://example.org/ads/")
+    assert not engine.should_block("https://example.org/content/")
+
+
+def test_multiple_lists():
+    engine = AdblockEngine(
+        {
+            "ads": ["/ads/", "||tracker.org^", "@@/ads/allowed/"],
+            "privacy": ["||tracker.org^", "/pixel.", "/ads/"],
+        }
+    )
+    # the rules that appear in both lists are indexed once
+    assert engine.size == 4
+    assert engine.blocked_by("https://tracker.org/t.js") == {"ads", "privacy"}
+    assert engine.blocked_by("https://example.org/pixel.gif") == {"privacy"}
+    # exceptions only apply to the rules of their own list
+    assert engine.blocked_by("https://example.org/ads/allowed/1.png") == {"privacy"}
+    assert engine.blocked_by("https://example.org/ads/allowed/1.png", keys=["ads"]) == set()
+    assert engine.should_block("https://example.org/ads/allowed/1.png")
+    assert not engine.should_block("https://example.org/content/")
+
+
+def test_preprocess():
+    rules, stats = preprocess(_RULES + ["", "  /ads/  ", "||x.com^$script,third-party", "||x.com^$third-party,script"])
+
+    assert stats == RuleStats(
+        total=35, comments=3, cosmetic=2, unsupported=1, invalid=0, duplicates=2, network=23, exceptions=4
+    )
+    assert len(rules) == stats.network + stats.exceptions
+    assert "||x.com^$script,third-party" in rules and "##.ad-banner" not in rules
+    # only the network rules are kept, hence the engine blocks the same urls
+    engine, reference = AdblockEngine(rules), AdblockEngine(_RULES)
+    for url in _URLS:
+        for options in _OPTIONS:
+            values = {**options, "domain": "example.org"}
+            assert engine.should_block(url, values) == reference.should_block(url, values), url
+
+
+def test_stored_engine(tmp_path):
+    lists = AdblockLists(tmp_path)
+    lists.register("ads", ["/ads/", "||tracker.org^"], options={})
+    lists.build()
+    (path,) = tmp_path.glob("*.engine")
+    # the workers load the stored engine instead of receiving it
+    assert lists._engine == str(path)
+
+    # the same rules (in any order) are loaded instead of built again
+    lists = AdblockLists(tmp_path)
+    lists.register("ads", ["||tracker.org^", "/ads/"], options={})
+    with mock.patch.object(AdblockEngine, "__init__", side_effect=AssertionError("engine was built")):
+        engine = lists.build()
+    assert engine.blocked_by("https://tracker.org/1.js") == {"ads"}
+    with mock.patch.dict(_ENGINES, clear=True):  # like a worker process that does not know the engine yet
+        call = (lists.name, lists._version, {}, {"ads": None}, "example.org", ["https://x.org/ads/"])
+        _, values = _apply_rules(*call, engine=str(path))
+    assert values == {"ads": {"https://x.org/ads/"}}
+
+    # other rules, or a corrupt file, are built (and stored) again, replacing the previous engine of the lists ...
+    others = AdblockLists(tmp_path)
+    others.register("cookies", ["_ga"], options={})
+    others.build()
+    lists.register("ads", ["/ads/"], options={})
+    lists.build()
+    assert not path.exists() and len(list(tmp_path.glob("*.engine"))) == 2
+    # ... but not the engines of other lists
+    assert others._path(others._version).exists()
+    path.write_bytes(b"garbage")
+    lists.register("ads", ["/ads/", "||tracker.org^"], options={})
+    assert lists.build().blocked_by("https://tracker.org/1.js") == {"ads"}
+    assert path.read_bytes() != b"garbage"
+
+
+def test_engine_registry():
+    first, second = AdblockLists(), AdblockLists()
+    with mock.patch.dict(_ENGINES, clear=True):
+        for lists, rules in [(first, ["/ads/"]), (second, ["||tracker.org^"])]:
+            lists.register("ads", rules, options={})
+            lists.build()
+            engine = pickle.dumps(lists.engine)
+            _apply_rules(lists.name, lists._version, {}, {"ads": None}, "example.org", [], engine=engine)
+        # a rebuilt engine replaces the previous one of the same lists, but not the engines of other lists
+        previous = first._version
+        first.register("ads", ["/ads/", "/banner/"], options={})
+        first.build()
+        assert len(_ENGINES) == 2 and _ENGINES[first.name][0] != previous
+        with pytest.raises(_MissingEngine):
+            _apply_rules(first.name, previous, {}, {"ads": None}, "example.org", [])
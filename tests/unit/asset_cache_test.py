@@ -0,0 +1,95 @@
+from unittest import mock
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from metalookup.core.asset_cache import AssetCache, max_age
+
+
+@pytest.mark.parametrize(
+    "headers,expected",
+    [
+        ({"cache-control": "public, max-age=3600"}, 3600),
+        ({"cache-control": "max-age=0"}, None),
+        ({"cache-control": "private, max-age=3600"}, None),
+        ({"cache-control": "no-store"}, None),
+        ({"cache-control": "max-age=3600", "set-cookie": "id=1"}, None),
+        ({"cache-control": "max-age=3600", "vary": "Accept-Encoding, Cookie"}, None),
+        ({}, None),
+    ],
+)
+def test_max_age(headers, expected):
+    assert max_age(headers) == expected
+
+
+def route_mock(request: Mock) -> Mock:
+    return Mock(request=request, fallback=AsyncMock(), fulfill=AsyncMock())
+
+
+def response_mock(request: Mock, headers: dict[str, str], body: bytes) -> Mock:
+    return Mock(
+        request=request, status=200, all_headers=AsyncMock(return_value=headers), body=AsyncMock(return_value=body)
+    )
+
+
+@pytest.mark.asyncio
+async def test_asset_cache(tmp_path):
+    cache = AssetCache(directory=str(tmp_path), max_size=10, max_entry_size=10)
+    cache.load()
+    script = Mock(url="https://cdn.org/lib.js", method="GET", resource_type="script")
+    cacheable = {"cache-control": "max-age=60", "content-type": "application/javascript", "content-encoding": "gzip"}
+
+    # the first request is a miss, its response is stored ...
+    route = route_mock(script)
+    await cache.handle(route)
+    route.fallback.assert_awaited_once()
+    await cache.store(response_mock(script, cacheable, b"12345"))
+
+    # ... and answered from the cache for subsequent requests
+    route = route_mock(script)
+    await cache.handle(route)
+    route.fulfill.assert_awaited_once()
+    assert route.fulfill.await_args.kwargs["body"] == b"12345"
+    assert "content-encoding" not in route.fulfill.await_args.kwargs["headers"]
+    # the response of a request answered from the cache is not stored again
+    await cache.store(response_mock(script, cacheable, b"12345"))
+    assert cache.status().stored == 1
+    assert cache.status().hits == 1 and cache.status().misses == 1
+
+    # responses that set cookies are never stored
+    tracker = Mock(url="https://tracker.org/pixel.gif", method="GET", resource_type="image")
+    await cache.store(response_mock(tracker, {**cacheable, "set-cookie": "id=1"}, b"1"))
+    assert cache.status().entries == 1
+
+    # neither are responses that announce a too large or an invalid content length
+    await cache.store(response_mock(tracker, {**cacheable, "content-length": "11"}, b"1"))
+    await cache.store(response_mock(tracker, {**cacheable, "content-length": "1, 1"}, b"1"))
+    assert cache.status().entries == 1
+
+    # the least recently used entries are evicted once the cache is full
+    style = Mock(url="https://cdn.org/style.css", method="GET", resource_type="stylesheet")
+    await cache.store(response_mock(style, cacheable, b"1234567"))
+    assert cache.status().entries == 1
+    assert cache.status().size == 7
+
+    # the cache survives restarts
+    restarted = AssetCache(directory=str(tmp_path), max_size=10, max_entry_size=10)
+    restarted.load()
+    route = route_mock(style)
+    await restarted.handle(route)
+    route.fulfill.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_asset_cache_served_requests(tmp_path):
+    cache = AssetCache(directory=str(tmp_path))
+    cache.load()
+    cacheable = {"cache-control": "max-age=60"}
+    script = Mock(url="https://cdn.org/lib.js", method="GET", resource_type="script")
+    await cache.store(response_mock(script, cacheable, b"12345"))
+
+    # requests whose response never arrives (e.g. aborted ones) are not remembered forever
+    with mock.patch("metalookup.core.asset_cache._MAX_SERVED", 3):
+        for _ in range(5):
+            await cache.handle(route_mock(Mock(url=script.url, method="GET", resource_type="script")))
+    assert cache.status().hits == 5 and len(cache._served) == 3
@@ -0,0 +1,147 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from playwright.async_api import Error
+
+from metalookup.core.browser import BrowserBalancer, BrowserContextPool, BrowserSession
+
+
+def browser_mock() -> Mock:
+    """A browser whose contexts and pages are mocks, such that the pool can be tested without playwright."""
+
+    def new_context():
+        context = Mock(new_page=AsyncMock(side_effect=lambda: Mock(close=AsyncMock())))
+        context.clear_cookies = AsyncMock()
+        context.clear_permissions = AsyncMock()
+        context.close = AsyncMock()
+        return context
+
+    return Mock(is_connected=Mock(return_value=True), new_context=AsyncMock(side_effect=new_context))
+
+
+@pytest.mark.asyncio
+async def test_context_reuse():
+    pool = BrowserContextPool(size=2, max_reuse=2, idle_timeout=100)
+    browser = browser_mock()
+
+    page = await pool.acquire(browser)
+    assert pool.status().leased == 1
+    await pool.release(page)
+    page.close.assert_awaited_once()
+    assert pool.status().idle == 1
+
+    # the context is reset and reused ...
+    page = await pool.acquire(browser)
+    await pool.release(page)
+    assert pool.status().created == 1
+    assert browser.new_context.await_count == 1
+
+    # ... until it was used max_reuse times
+    assert pool.status().discarded == 1
+    assert pool.status().idle == 0
+
+
+@pytest.mark.asyncio
+async def test_context_idle_eviction():
+    pool = BrowserContextPool(size=2, max_reuse=10, idle_timeout=0)
+    browser = browser_mock()
+
+    await pool.release(await pool.acquire(browser))
+    await asyncio.sleep(0.01)
+    await pool.release(await pool.acquire(browser))
+    assert pool.status().created == 2
+    assert pool.status().discarded == 1
+
+
+@pytest.mark.asyncio
+async def test_context_reset_failure():
+    pool = BrowserContextPool(size=1, max_reuse=10, idle_timeout=100)
+    browser = browser_mock()
+
+    # any failure of the reset closes the context instead of returning it to the pool ...
+    page = await pool.acquire(browser)
+    page.close.side_effect = RuntimeError("unexpected")
+    await pool.release(page)
+    assert pool.status().discarded == 1 and pool.status().idle == 0
+
+    # ... and releases its slot, i.e. the next acquire creates a new context instead of waiting forever
+    page = await asyncio.wait_for(pool.acquire(browser), timeout=1)
+    page.close.side_effect = asyncio.CancelledError()
+    with pytest.raises(asyncio.CancelledError):
+        await pool.release(page)
+    await asyncio.wait_for(pool.release(await pool.acquire(browser)), timeout=1)
+    assert pool.status().created == 3 and pool.status().discarded == 2
+
+
+@pytest.mark.asyncio
+async def test_pool_saturation():
+    pool = BrowserContextPool(size=1, max_reuse=10, idle_timeout=100)
+    browser = browser_mock()
+
+    page = await pool.acquire(browser)
+    waiting = asyncio.create_task(pool.acquire(browser))
+    await asyncio.sleep(0.01)
+    assert pool.status().waiting == 1
+    assert pool.status().waited == 1
+
+    await pool.release(page)
+    await pool.release(await waiting)
+    assert pool.status().waiting == 0
+    assert pool.status().acquired == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("prewarm,created", [(True, 3), (False, 1)])
+async def test_session_prewarm(prewarm, created):
+    session = BrowserSession(pool=BrowserContextPool(size=3), prewarm=prewarm)
+    session._playwright = Mock(chromium=Mock(connect_over_cdp=AsyncMock(return_value=browser_mock())))
+
+    # a session serving a single fetch only creates the context it needs
+    async with session.page():
+        pass
+    assert session.pool.status().created == created
+
+
+@pytest.mark.asyncio
+async def test_balancer():
+    balancer = BrowserBalancer(endpoints=["ws://a:3000", "ws://b:3000?token=secret"], max_failures=1, probe_interval=0)
+    a, b = balancer.sessions
+    healthy = {a: True, b: True}
+
+    def page_mock(session):
+        @asynccontextmanager
+        async def page():
+            if not healthy[session]:
+                raise Error("connection refused")
+            yield session
+
+        return page
+
+    for session in balancer.sessions:
+        session.page = page_mock(session)
+        session.connect = AsyncMock(side_effect=lambda: None)
+
+    # the renders are distributed to the endpoint with the fewest outstanding renders
+    async with balancer.page() as first:
+        async with balancer.page() as second:
+            assert {first, second} == {a, b}
+            assert [s.outstanding for s in balancer.status()] == [1, 1]
+
+    # failing endpoints are skipped and taken out of rotation ...
+    healthy[a] = False
+    async with balancer.page() as page:
+        assert page is b
+    status = balancer.status()
+    assert not status[0].healthy and status[0].connection_errors == 1
+    assert status[1].endpoint == "ws://b:3000"
+    async with balancer.page() as page:
+        assert page is b
+    assert balancer.status()[0].connection_errors == 1
+
+    # ... until they are probed back in
+    healthy[a] = True
+    await asyncio.sleep(0.01)
+    assert balancer.status()[0].healthy
+    assert balancer.status()[1].renders == 3
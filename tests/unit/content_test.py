@@ -1,7 +1,23 @@
+import asyncio
+import json
+import pickle
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from unittest import mock
+from unittest.mock import AsyncMock, Mock
+
 import pytest
 from fastapi import HTTPException
+from playwright.async_api import TimeoutError
 
+from metalookup.app.models import PageSnapshot, SnapshotCookie, SnapshotRequest
 from metalookup.core.content import Content
+from metalookup.core.parser import create_parser
+from metalookup.core.settle import QUIESCENT, TIMEOUT, Adaptive, NetworkIdle
+from metalookup.core.text import visible_text
+from metalookup.lib.matching import KeywordMatcher
+from tests.extractors.conftest import mock_content
 
 
 @pytest.mark.asyncio
@@ -39,3 +55,229 @@ async def test_non_html_content():
     with pytest.raises(HTTPException) as exception:
         await content.html()
         assert exception.value.status_code == 400
+
+
+def browser_mock(page: Mock) -> Mock:
+    @asynccontextmanager
+    async def new_page():
+        yield page
+
+    return Mock(page=new_page)
+
+
+@pytest.mark.asyncio
+async def test_staged_readiness():
+    idle = asyncio.Event()
+
+    async def wait_for_load_state(state, timeout):
+        if state == "networkidle":
+            await idle.wait()
+
+    page = Mock(
+        goto=AsyncMock(return_value=Mock(status=200, headers={"content-type": "text/html"})),
+        wait_for_load_state=wait_for_load_state,
+        content=AsyncMock(return_value="<html></html>"),
+        context=Mock(cookies=AsyncMock(return_value=[])),
+    )
+    content = Content(url="https://some-domain.org", browser=browser_mock(page))  # noqa
+
+    # the headers are available before the page reaches the network idle state ...
+    assert await asyncio.wait_for(content.headers(), timeout=1) == {"content-type": "text/html"}
+    html = asyncio.create_task(content.html())
+    await asyncio.sleep(0.1)
+    assert not html.done()
+
+    # ... whereas the html is not.
+    idle.set()
+    assert await html == "<html></html>"
+    page.goto.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_staged_readiness_failure():
+    page = Mock(goto=AsyncMock(side_effect=TimeoutError("timeout")))
+    content = Content(url="https://some-domain.org", browser=browser_mock(page))  # noqa
+
+    with pytest.raises(TimeoutError):
+        await content.headers()
+    with pytest.raises(TimeoutError):
+        await content.html()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "strategy,since_last_mutation,reason",
+    [(Adaptive(quiet_period=0.1, poll_interval=0.01), 10_000, QUIESCENT), (Adaptive(poll_interval=0.01), 0, TIMEOUT)],
+)
+async def test_load_never_fires(strategy, since_last_mutation, reason):
+    async def wait_for_load_state(state, timeout):
+        if state != "domcontentloaded":  # e.g. a hanging third party sub resource
+            await asyncio.sleep(timeout / 1000)
+            raise TimeoutError("load")
+
+    page = Mock(
+        goto=AsyncMock(return_value=Mock(status=200, headers={"content-type": "text/html"})),
+        wait_for_load_state=wait_for_load_state,
+        content=AsyncMock(return_value="<html></html>"),
+        context=Mock(cookies=AsyncMock(return_value=[])),
+        add_init_script=AsyncMock(),
+        evaluate=AsyncMock(return_value=since_last_mutation),
+    )
+    content = Content(url="https://some-domain.org", browser=browser_mock(page))  # noqa
+    content.settle = strategy
+
+    # the adaptive strategy settles the page (at the latest at the deadline) instead of failing
+    with mock.patch("metalookup.core.content.PLAYWRIGHT_PAGE_LOAD_TIMEOUT", 0.5):
+        assert await content.html() == "<html></html>"
+    assert content.settle_reason == reason
+
+    # whereas waiting for the network idle state fails
+    content = Content(url="https://some-domain.org", browser=browser_mock(page))  # noqa
+    content.settle = NetworkIdle()
+    with mock.patch("metalookup.core.content.PLAYWRIGHT_PAGE_LOAD_TIMEOUT", 0.2), pytest.raises(TimeoutError):
+        await content.html()
+
+
+@pytest.mark.asyncio
+async def test_request_records():
+    handlers = {}
+    request = Mock(url="https://some-domain.org/", method="GET", resource_type="document", headers={"accept": "*/*"})
+    response = Mock(url=request.url, status=200, headers={"content-type": "text/html"}, request=request)
+
+    async def goto(url, **kwargs):
+        for handler in handlers["request"]:
+            handler(request)
+        for handler in handlers["response"]:
+            handler(response)
+        return response
+
+    page = Mock(
+        goto=goto,
+        wait_for_load_state=AsyncMock(),
+        content=AsyncMock(return_value="<html></html>"),
+        context=Mock(cookies=AsyncMock(return_value=[])),
+    )
+    page.on = lambda event, handler: handlers.setdefault(event, []).append(handler)
+    content = Content(url="https://some-domain.org/", browser=browser_mock(page))  # noqa
+
+    # the requests and responses are captured as plain records that do not refer to the page ...
+    [record] = await content.responses()
+    assert record.status == 200 and record.headers == {"content-type": "text/html"}
+    assert record.request == (await content.requests())[0] == await content.request()
+    assert record.request.resource_type == "document"
+    # ... and hence can be sent to other processes.
+    assert pickle.loads(pickle.dumps(record)) == record
+
+
+@pytest.mark.asyncio
+async def test_index_in_executor(executor):
+    html = "<html><body><a href='a.html'>a</a><script>load({src='b.js'})</script><img src='c.png'></body></html>"
+    content = mock_content(html=html)
+    content.executor = executor
+
+    # concurrent accesses share the same (single) parse in the process pool
+    first, second, links = await asyncio.gather(content.page_index(), content.page_index(), content.raw_links())
+    assert first is second
+    assert first.anchor_hrefs == ["a.html"]
+    assert links == ["a.html", "c.png", "b.js"]
+
+
+@pytest.mark.asyncio
+async def test_link_table(executor):
+    html = """<html><head><link href='https://cdn.example.org/style.css'></head><body>
+        <a href='/docs/file.pdf#page=2'>a</a><a href='mailto:someone@news.cnn.com'>b</a><a href='#top'>c</a>
+        <img src='//images.cnn.com/x.png' srcset='x.png 2x'><script>load({src='https://1.2.3.4/c.js'})</script>
+    </body></html>"""
+    content = mock_content(html=html, url="https://www.cnn.com/news/index.html")
+    content.executor = executor
+
+    table = await content.links()
+    assert len(table) == 7 and list(table.raw) == await content.raw_links()
+    rows = {link.raw: link for link in table}
+
+    assert rows["/docs/file.pdf#page=2"].url == "https://www.cnn.com/docs/file.pdf#page=2"
+    assert rows["/docs/file.pdf#page=2"].suffix == ".pdf"
+    assert rows["#top"].url == "https://www.cnn.com/news/index.html#top" and rows["#top"].suffix == ""
+    assert rows["mailto:someone@news.cnn.com"].host == "" and rows["mailto:someone@news.cnn.com"].suffix == ".com"
+    assert rows["//images.cnn.com/x.png"].host == "images.cnn.com" and rows["//images.cnn.com/x.png"].suffix == ".png"
+    assert {link.raw for link in table if link.third_party} == {
+        "https://cdn.example.org/style.css",
+        "https://1.2.3.4/c.js",
+    }
+    # the table is sent from the process pool, i.e. can be pickled
+    assert list(pickle.loads(pickle.dumps(table))) == list(table)
+
+
+@pytest.mark.asyncio
+async def test_limits():
+    content = mock_content(html="<html><body>" + "<p>Straße</p>" * 10 + "</body></html>")
+    content.parser = create_parser("lxml", max_elements=5)
+    content.max_html_size = 14
+
+    assert content._limit("<p>ok</p>") == "<p>ok</p>" and not content.degraded
+    # the truncated html ends before the "ß" that is cut in half by the limit
+    assert content._limit("<html><p>Straßen</p></html>") == "<html><p>Stra"
+    assert "28 bytes" in content.degraded["html_size"]
+
+    index = await content.page_index()
+    assert len(index) == 5 and set(content.degraded) == {"html_size", "elements"}
+
+
+@pytest.mark.asyncio
+async def test_content_from_har_snapshot():
+    with open(Path(__file__).parent.parent / "resources" / "har" / "google.com.json", "r") as f:
+        splash = json.load(f)
+    content = Content.from_snapshot("https://google.com/", PageSnapshot(html=splash["html"], har=splash["har"]))
+
+    # the main response is the end of the redirect chain, all features are available without fetching the page
+    response = await content.response()
+    assert response.url == "https://www.google.com/" and response.status == 200
+    assert response.headers["content-type"] == "text/html; charset=UTF-8"
+    assert await content.html() == splash["html"]
+    assert len(await content.requests()) == len(await content.responses()) == 7
+    assert {cookie["name"] for cookie in await content.cookies()} >= {"CONSENT"}
+    assert all(cookie["domain"] for cookie in await content.cookies())
+
+
+@pytest.mark.asyncio
+async def test_content_from_snapshot():
+    snapshot = PageSnapshot(
+        html="<html><body><a href='https://ads.example.org/'>ad</a></body></html>",
+        headers={"Content-Type": "text/html", "X-Frame-Options": "DENY"},
+        cookies=[SnapshotCookie(name="session", value="1", httpOnly=True)],
+        requests=[SnapshotRequest(url="https://ads.example.org/", resource_type="script", status=204)],
+    )
+    content = Content.from_snapshot("https://www.example.org/page", snapshot)
+
+    assert (await content.response()).status == 200
+    assert await content.headers() == {"content-type": "text/html", "x-frame-options": "DENY"}
+    assert (await content.raw_links()) == ["https://ads.example.org/"]
+    [cookie] = await content.cookies()
+    assert cookie["domain"] == "www.example.org" and cookie["httpOnly"] and not cookie["secure"]
+    [response] = await content.responses()
+    assert response.status == 204 and response.request.resource_type == "script"
+
+
+@pytest.mark.asyncio
+async def test_keyword_matches(executor):
+    matcher = KeywordMatcher()
+    matcher.register("paywall", ["paywall"])
+    content = mock_content(html="<p>Paywall</p><p>PAYWALL</p>")
+    content.executor = executor
+
+    with mock.patch.object(Content, "keywords", matcher):
+        first, second = await asyncio.gather(content.keyword_matches(), content.keyword_matches())
+    assert first == second == {"paywall": {"paywall": 2}}
+
+
+def test_visible_text():
+    html = "<html><head><style>p {}</style></head><body><P>Straße <script>var x;</script><!-- x --> Paywall</P></body>"
+    assert visible_text(html) == "Straße Paywall"
+    # unclosed elements and comments are not removed
+    assert visible_text("<p>a <script>b</p> <!-- c") == "a b <!-- c"
+
+    # unclosed openers do not cost a scan of the rest of the page each (which took seconds for pages of 100KB)
+    for opener in ["<script>", "<style>", "<!--", "<"]:
+        start = time.process_time()
+        visible_text(opener * 50_000 + "text")
+        assert time.process_time() - start < 1, opener
@@ -0,0 +1,41 @@
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from metalookup.core.interception import Interceptor
+
+
+def route_mock(resource_type: str) -> Mock:
+    return Mock(request=Mock(resource_type=resource_type), fallback=AsyncMock(), abort=AsyncMock(), fulfill=AsyncMock())
+
+
+@pytest.mark.asyncio
+async def test_interception_modes():
+    abort = Interceptor(mode="abort", resource_types=["image"])
+    route = route_mock("image")
+    await abort.handle(route)
+    route.abort.assert_awaited_once()
+    route.fallback.assert_not_awaited()
+
+    # other resource types are passed on
+    route = route_mock("document")
+    await abort.handle(route)
+    route.fallback.assert_awaited_once()
+    route.abort.assert_not_awaited()
+
+    stub = Interceptor(mode="stub", resource_types=["image"])
+    route = route_mock("image")
+    await stub.handle(route)
+    route.fulfill.assert_awaited_once()
+    assert route.fulfill.await_args.kwargs["status"] == 200
+    assert route.fulfill.await_args.kwargs["body"] == b""
+
+    # no route is installed if the interception is turned off
+    page = Mock(route=AsyncMock())
+    await Interceptor(mode="off").install(page)
+    page.route.assert_not_awaited()
+    await stub.install(page)
+    page.route.assert_awaited_once()
+
+    with pytest.raises(ValueError):
+        Interceptor(mode="something")
@@ -0,0 +1,38 @@
+import pickle
+
+import pytest
+
+from metalookup.lib.matching import KeywordMatcher
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Lorem ipsum Creative Commons Zero ... CC BY-SA ... CC BY ... CC0 ... cc by PayWall paywalluser",
+        "<div class='modal fade'><div class='modal-dialog'>Popup popup POPUP</div></div>",
+        "aaaa İ CC BY",  # lower-casing changes the length of the text
+        "",
+    ],
+)
+def test_matches_like_separate_counts(text):
+    matcher = KeywordMatcher()
+    groups = {"paywall": ["paywall", "paywalluser"], "pop_up": ["popup", "modal", "modal fade", "modal-dialog", "aa"]}
+    licences = ["CC0", "CC BY", "CC BY-SA", "Creative Commons Zero", "Creative Commons Attribution"]
+    for group, patterns in groups.items():
+        matcher.register(group, patterns)
+    matcher.register("licence", licences, case_sensitive=True)
+
+    matches = matcher.match(text)
+
+    lower = text.lower()
+    for group, patterns in groups.items():
+        assert matches[group] == {p: lower.count(p) for p in patterns if lower.count(p)}
+    assert matches["licence"] == {p: text.count(p) for p in licences if text.count(p)}
+
+
+def test_pickle():
+    matcher = KeywordMatcher()
+    matcher.register("group", ["keyword"])
+    assert matcher.match("A Keyword") == {"group": {"keyword": 1}}
+    # the compiled expression is not pickled, but compiled again in the receiving process
+    assert pickle.loads(pickle.dumps(matcher)).match("keyword, keyword") == {"group": {"keyword": 2}}
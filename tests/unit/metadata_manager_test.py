@@ -1,10 +1,14 @@
+import json
+import logging
 import pprint
+from pathlib import Path
 from unittest import mock
 
 import pytest
 from fastapi import HTTPException
 
-from metalookup.app.models import Input, MetadataTags
+from metalookup.app.models import Error, Input, MetadataTags, PageSnapshot
+from metalookup.core.content import Content
 from metalookup.core.metadata_manager import MetadataManager
 from tests.conftest import adblock_rules_mock, lighthouse_mock, playwright_mock
 
@@ -14,7 +18,8 @@ async def manager() -> MetadataManager:
     manager = MetadataManager()
     with adblock_rules_mock(rules=set()):
         await manager.setup()
-    return manager
+    yield manager
+    await manager.shutdown()
 
 
 @pytest.mark.asyncio
@@ -43,9 +48,10 @@ async def test_extract_for_404_410(manager: MetadataManager):
 
 @pytest.mark.asyncio
 async def test_extract_playwright_unavailable(manager: MetadataManager):
-    with pytest.raises(HTTPException) as exception, lighthouse_mock(), mock.patch(
+    with pytest.raises(HTTPException) as exception, lighthouse_mock(), mock.patch.object(
         # make sure we trigger an exception by changing the configured value to something nonsensical
-        "metalookup.core.content.PLAYWRIGHT_WS_ENDPOINT",
+        manager.browser.sessions[0],
+        "endpoint",
         "ws://invalid-name:3001",
     ):
         # as playwright is not reachable, we should get some Connection exception
@@ -63,6 +69,15 @@ async def test_extract_lighthouse_unavailable(manager: MetadataManager):
     assert exception.value.status_code == 500
 
 
+@pytest.mark.asyncio
+async def test_extract_rejected(manager: MetadataManager, caplog):
+    rejected = HTTPException(status_code=503, detail="The render queue is full.")
+    with lighthouse_mock(), mock.patch.object(Content, "_fetch", side_effect=rejected), pytest.raises(HTTPException):
+        await manager.extract(Input(url="https://www.google.com"), extra=True)
+    # the rejection is expected, hence not logged as failure by every extractor awaiting the content
+    assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
+
+
 @pytest.mark.asyncio
 async def test_extract_non_html_content(manager: MetadataManager):
     # intercept the request to the non-running lighthouse container and pretend that lighthouse would give an
@@ -73,3 +88,19 @@ async def test_extract_non_html_content(manager: MetadataManager):
             extra=True,
         )
     assert exception.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_extract_snapshot(manager: MetadataManager):
+    with open(Path(__file__).parent.parent / "resources" / "har" / "google.com.json", "r") as f:
+        splash = json.load(f)
+    snapshot = PageSnapshot(html=splash["html"], har=splash["har"])
+
+    # neither playwright nor lighthouse are mocked (or running): the extraction must rely on the snapshot alone
+    output = await manager.extract(Input(url="https://google.com/", snapshot=snapshot), extra=True)
+
+    for e in manager.extractors:
+        if e.requires_live_page:
+            assert isinstance(getattr(output, e.key), Error), e.key
+        else:
+            assert isinstance(getattr(output, e.key), MetadataTags), f"Unexpected output for extractor {e}"
@@ -0,0 +1,74 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from metalookup.core.parser import create_parser
+
+_HTML = """
+<html>
+<head>
+  <script src="https://cdn.org/lib.js"></script>
+  <script>load({src="lazy.js"});</script>
+  <link rel="stylesheet" href="style.css">
+  <style>@font-face {src: url(font.woff)}</style>
+</head>
+<body>
+  <a href="document.pdf" class="download primary">PDF</a>
+  <a name="anchor">no link</a>
+  <img src="image.png" data-src="lazy.png">
+  <button>Submit</button>
+</body>
+</html>
+"""
+
+
+@pytest.mark.parametrize("parser", ["soup", "lxml", "streaming"])
+def test_page_index(parser):
+    index = create_parser(parser).index(_HTML)
+
+    assert index.tag_counts["script"] == 2
+    assert "button" in index.tag_counts and "input" not in index.tag_counts
+    assert index.attributes["href"] == ["style.css", "document.pdf"]
+    # only the link attributes are collected
+    assert "class" not in index.attributes and "name" not in index.attributes
+    assert index.attributes["data-src"] == ["lazy.png"]
+    assert index.script_sources == ["https://cdn.org/lib.js"]
+    assert index.anchor_hrefs == ["document.pdf"]
+    assert index.script_links == ["lazy.js"]
+    assert index.style_texts == ["@font-face {src: url(font.woff)}"]
+    assert index.link_rels == ["stylesheet"]
+    assert len(index) == 11
+
+
+@pytest.mark.parametrize("parser", ["lxml", "streaming"])
+def test_parsers_are_equivalent(parser):
+    for path in (Path(__file__).parent.parent / "resources" / "har").glob("*.json"):
+        with open(path, "r") as f:
+            html = json.load(f)["html"]
+        expected = create_parser("soup").index(html)
+        index = create_parser(parser).index(html)
+        assert index.tag_counts == expected.tag_counts, path.stem
+        assert index.attributes == expected.attributes, path.stem
+        assert index.script_sources == expected.script_sources, path.stem
+        assert index.anchor_hrefs == expected.anchor_hrefs, path.stem
+        assert index.script_links == expected.script_links, path.stem
+        assert index.style_texts == expected.style_texts, path.stem
+        assert index.link_rels == expected.link_rels, path.stem
+
+
+@pytest.mark.parametrize("parser", ["soup", "lxml", "streaming"])
+def test_empty_document(parser):
+    assert len(create_parser(parser).index("")) == 0
+
+
+@pytest.mark.parametrize("parser", ["soup", "lxml", "streaming"])
+def test_element_limit(parser):
+    index = create_parser(parser, max_elements=5).index(_HTML)
+
+    # only the first elements (in document order) are indexed
+    assert index.truncated and len(index) == 5
+    assert index.tag_counts == {"html": 1, "head": 1, "script": 2, "link": 1}
+    assert index.script_sources == ["https://cdn.org/lib.js"] and index.script_links == ["lazy.js"]
+    assert index.anchor_hrefs == [] and index.style_texts == []
+    assert not create_parser(parser, max_elements=11).index(_HTML).truncated
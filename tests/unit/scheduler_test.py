@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from metalookup.core.scheduler import RenderScheduler
+
+
+@pytest.mark.asyncio
+async def test_queue_and_reject():
+    scheduler = RenderScheduler(concurrency=1, queue_size=1)
+    release = asyncio.Event()
+    queue_times = []
+
+    async def render():
+        async with scheduler.slot() as queue_time:
+            queue_times.append(queue_time)
+            await release.wait()
+
+    running = asyncio.create_task(render())
+    queued = asyncio.create_task(render())
+    await asyncio.sleep(0.1)
+    assert scheduler.status().running == 1
+    assert scheduler.status().queued == 1
+
+    # the queue is full, hence further renders are rejected immediately
+    with pytest.raises(HTTPException) as e:
+        async with scheduler.slot():
+            pass
+    assert e.value.status_code == 503
+    assert int(e.value.headers["Retry-After"]) >= 1
+    assert scheduler.status().rejected == 1
+
+    release.set()
+    await asyncio.gather(running, queued)
+
+    status = scheduler.status()
+    assert status.admitted == 2
+    assert status.running == 0 and status.queued == 0
+    assert queue_times[0] < 0.1 <= queue_times[1]
+    assert status.average_queue_time > 0
@@ -0,0 +1,42 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from metalookup.core.settle import LONG_LIVED, QUIESCENT, TIMEOUT, Adaptive
+
+
+def page_mock(since_last_mutation: float = 10000) -> Mock:
+    """A page that dispatches the events emitted via page.emit to the handlers registered via page.on."""
+    handlers = {}
+    page = Mock(add_init_script=AsyncMock(), evaluate=AsyncMock(return_value=since_last_mutation))
+    page.on = lambda event, handler: handlers.setdefault(event, []).append(handler)
+    page.emit = lambda event, request: [handler(request) for handler in handlers.get(event, [])]
+    return page
+
+
+@pytest.mark.asyncio
+async def test_adaptive_settle():
+    strategy = Adaptive(quiet_period=0.1, ignore_after=1, poll_interval=0.01)
+
+    page = page_mock()
+    settled = await strategy.watch(page)
+    request = Mock(resource_type="xhr")
+    page.emit("request", request)
+    page.emit("request", Mock(resource_type="websocket"))  # long-lived connections are ignored right away
+    wait = asyncio.create_task(settled(5000))
+    await asyncio.sleep(0.3)
+    assert not wait.done()
+    page.emit("requestfinished", request)
+    assert await wait == QUIESCENT
+
+    # requests that are open for a long time are ignored eventually
+    page = page_mock()
+    settled = await strategy.watch(page)
+    page.emit("request", Mock(resource_type="xhr"))
+    assert await settled(5000) == LONG_LIVED
+
+    # a DOM that keeps changing never settles
+    page = page_mock(since_last_mutation=0)
+    settled = await strategy.watch(page)
+    assert await settled(300) == TIMEOUT
@@ -0,0 +1,74 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from metalookup.app.models import Input, MetadataTags, PageSnapshot, SnapshotCookie, SnapshotRequest
+from metalookup.caching.snapshots import SnapshotStore
+from metalookup.core.content import Content
+from metalookup.core.metadata_manager import MetadataManager
+from tests.conftest import adblock_rules_mock, lighthouse_mock, playwright_mock
+
+
+def test_snapshot_store(tmp_path):
+    store = SnapshotStore(directory=tmp_path)
+    first = PageSnapshot(html="<html>first</html>", status=200, headers={"content-type": "text/html"})
+    second = PageSnapshot(html="<html>second</html>", status=200, headers={"content-type": "text/html"})
+
+    assert store.get("https://some-domain.org/") is None
+    digest = store.put("https://some-domain.org/", first)
+    # the same page is stored only once, no matter under how many urls
+    assert store.put("https://www.some-domain.org/", first) == digest
+    assert len(list((tmp_path / "objects").iterdir())) == 1
+    assert store.get("https://some-domain.org/") == first
+
+    # a url refers to its latest snapshot, while the previous snapshot remains addressable
+    store.put("https://some-domain.org/", second)
+    assert store.get("https://some-domain.org/") == second
+    assert store.load(digest) == first
+    assert store.get("https://www.some-domain.org/") == first
+
+
+@pytest.mark.asyncio
+async def test_content_snapshot_roundtrip():
+    snapshot = PageSnapshot(
+        html="<html><body>content</body></html>",
+        status=200,
+        headers={"content-type": "text/html"},
+        cookies=[SnapshotCookie(name="session", value="1", domain="some-domain.org", secure=True)],
+        requests=[
+            SnapshotRequest(url="https://some-domain.org/", resource_type="document", status=200),
+            SnapshotRequest(url="https://cdn.org/lib.js", resource_type="script"),
+        ],
+    )
+    content = Content.from_snapshot("https://some-domain.org/", snapshot)
+    assert await content.to_snapshot() == snapshot
+
+
+@pytest.fixture
+async def manager(tmp_path) -> MetadataManager:
+    manager = MetadataManager()
+    manager.snapshots = SnapshotStore(directory=tmp_path)
+    with adblock_rules_mock(rules=set()):
+        await manager.setup()
+    yield manager
+    await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_replay(manager: MetadataManager):
+    url = "https://www.google.com/"
+    with playwright_mock(key="google.com"), lighthouse_mock():
+        output = await manager.extract(Input(url=url), extra=False)
+    await asyncio.gather(*manager._background)
+
+    with open(Path(__file__).parent.parent / "resources" / "har" / "google.com.json", "r") as f:
+        assert manager.snapshots.get(url).html == json.load(f)["html"]
+
+    # neither playwright nor lighthouse are mocked (or running): the replay relies on the stored snapshot alone
+    replayed = await manager.replay(Input(url=url), extra=False)
+    for e in manager.extractors:
+        if not e.requires_live_page:
+            assert isinstance(getattr(replayed, e.key), MetadataTags), e.key
+            assert getattr(replayed, e.key).stars == getattr(output, e.key).stars, e.key
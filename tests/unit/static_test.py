@@ -0,0 +1,117 @@
+import time
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from metalookup.core.content import Content
+from metalookup.core.records import RequestRecord, ResponseRecord
+from metalookup.core.static import Snapshot, StaticFetcher, needs_rendering
+
+_TEXT = "<p>" + "Some server side rendered text. " * 10 + "</p>"
+
+
+@pytest.mark.parametrize(
+    "html,reason",
+    [
+        (f"<html><head><script src='app.js'></script></head><body>{_TEXT}</body></html>", None),
+        ("<html><body><p>Short, but no scripts.</p></body></html>", None),
+        ("<html><head><script src='app.js'></script></head><body><p>Loading...</p></body></html>", "empty body"),
+        (f"<html><body><div id='root'></div>{_TEXT}</body></html>", "empty framework mount point"),
+        (f"<html><body><app-root></app-root>{_TEXT}</body></html>", "empty framework mount point"),
+        (
+            f"<html><body><noscript>Please enable JavaScript to use this site.</noscript>{_TEXT}</body></html>",
+            "noscript hint",
+        ),
+        (f"<html><body><noscript><img src='pixel.gif'></noscript>{_TEXT}</body></html>", None),
+    ],
+)
+def test_needs_rendering(html, reason):
+    assert needs_rendering(html) == reason
+
+
+@pytest.mark.parametrize("opener", ["<noscript>", "<div id='root'", "<script>", "<style>", "<!--", "<"])
+def test_needs_rendering_unclosed(opener):
+    # unclosed elements do not cost a scan of the rest of the page each
+    start = time.process_time()
+    needs_rendering(opener * 50_000 + _TEXT)
+    assert time.process_time() - start < 1
+
+
+@pytest.mark.asyncio
+async def test_static_fetch_status_and_size():
+    page = f"<html><body>{_TEXT}</body></html>"
+
+    def respond(text: str, status: int = 200):
+        async def handler(_):
+            return web.Response(text=text, status=status, content_type="text/html")
+
+        return handler
+
+    app = web.Application()
+    app.router.add_get("/", respond(page))
+    app.router.add_get("/large", respond(page * 1000))
+    app.router.add_get("/blocked", respond(page, status=403))
+    app.router.add_get("/partial", respond(page, status=203))
+
+    async with TestServer(app) as server:
+        fetcher = StaticFetcher(max_size=1000)
+        try:
+            snapshot = await fetcher.fetch(str(server.make_url("/")))
+            assert snapshot.html == page and snapshot.response.status == 200
+            # only one byte more than the limit is read, such that the Content flags the truncation
+            snapshot = await fetcher.fetch(str(server.make_url("/large")))
+            assert snapshot.html == (page * 1000)[:1001]
+            # error responses are rendered, a browser often gets the actual page
+            assert await fetcher.fetch(str(server.make_url("/blocked"))) is None
+            # as are other successful responses, the Content raises an error for them unless they are rendered
+            assert await fetcher.fetch(str(server.make_url("/partial"))) is None
+        finally:
+            await fetcher.close()
+    status = fetcher.status()
+    assert (status.fetched, status.served, status.escalated, status.failed) == (4, 2, 2, 0)
+
+
+@pytest.mark.asyncio
+async def test_static_fetch_and_escalation():
+    url = "https://some-domain.org/"
+    request = RequestRecord(url=url, method="GET", resource_type="document", headers={}, started=0)
+    snapshot = Snapshot(
+        response=ResponseRecord(url=url, status=200, headers={"content-type": "text/html"}, request=request, elapsed=0),
+        html=f"<html><body>{_TEXT}</body></html>",
+        cookies=[],
+    )
+    fetcher = Mock(fetch=AsyncMock(return_value=snapshot))
+
+    page = Mock(
+        goto=AsyncMock(return_value=Mock(status=200, headers={"content-type": "text/html"})),
+        wait_for_load_state=AsyncMock(),
+        content=AsyncMock(return_value="<html>rendered</html>"),
+        context=Mock(cookies=AsyncMock(return_value=[])),
+    )
+
+    @asynccontextmanager
+    async def new_page():
+        yield page
+
+    content = Content(url=url, browser=Mock(page=new_page), fetcher=fetcher)  # noqa
+
+    # the html and headers are served from the static fetch ...
+    assert await content.html() == snapshot.html
+    assert await content.headers() == {"content-type": "text/html"}
+    assert content.static
+    page.goto.assert_not_awaited()
+
+    # ... but the requests issued by the page are only known after rendering
+    assert await content.requests() == []
+    assert not content.static
+    page.goto.assert_awaited_once()
+    assert await content.html() == "<html>rendered</html>"
+
+    # if rendering is required up front, the static fetch is skipped
+    content = Content(url=url, browser=Mock(page=new_page), fetcher=fetcher)  # noqa
+    content.require_rendering()
+    assert await content.html() == "<html>rendered</html>"
+    fetcher.fetch.assert_awaited_once()